@@ -0,0 +1,400 @@
+import sys
+
+import numpy as np
+
+from frota import calcular_indicadores_frota
+
+# Indicadores por caminhão acumulados nos agregados da frota
+INDICADORES_AGREGADOS = ("df", "utilizacao", "horas_trabalhadas", "horas_disponiveis")
+
+# Indicadores com média ponderada pelas horas trabalhadas
+INDICADORES_PONDERADOS = ("df", "utilizacao")
+
+
+class _Acumulador:
+    """Somas, contagem e extremos de um grupo de caminhões."""
+
+    def __init__(self):
+        self.quantidade = 0
+        self.somas = dict.fromkeys(INDICADORES_AGREGADOS, 0.0)
+        self.somas_ponderadas = dict.fromkeys(INDICADORES_PONDERADOS, 0.0)
+        self.minimos = {}
+        self.maximos = {}
+        self.membros = set()
+        # Falso quando um caminhão que era o extremo piorou ou saiu do grupo;
+        # recalculado na leitura
+        self.extremos_validos = True
+
+    def somar(self, valores, sinal=1):
+        """Soma (sinal 1) ou subtrai (sinal -1) um caminhão da contagem e das somas."""
+        self.quantidade += sinal
+        for indicador, valor in valores.items():
+            self.somas[indicador] += sinal * valor
+        for indicador in INDICADORES_PONDERADOS:
+            self.somas_ponderadas[indicador] += sinal * valores[indicador] * valores["horas_trabalhadas"]
+
+    def adicionar(self, i, valores):
+        self.somar(valores)
+        self.membros.add(i)
+        if self.extremos_validos:
+            for indicador, valor in valores.items():
+                self.minimos[indicador] = min(self.minimos.get(indicador, valor), valor)
+                self.maximos[indicador] = max(self.maximos.get(indicador, valor), valor)
+
+    def remover(self, i, valores):
+        self.somar(valores, -1)
+        self.membros.discard(i)
+        for indicador, valor in valores.items():
+            if valor == self.minimos.get(indicador) or valor == self.maximos.get(indicador):
+                self.extremos_validos = False
+
+    def substituir(self, anteriores, valores):
+        """Troca os valores de um caminhão que continua no grupo."""
+        self.somar(anteriores, -1)
+        self.somar(valores)
+        if not self.extremos_validos:
+            return
+        for indicador, valor in valores.items():
+            anterior = anteriores[indicador]
+            if (anterior == self.minimos[indicador] and valor > anterior) or (
+                anterior == self.maximos[indicador] and valor < anterior
+            ):
+                self.extremos_validos = False
+                return
+            self.minimos[indicador] = min(self.minimos[indicador], valor)
+            self.maximos[indicador] = max(self.maximos[indicador], valor)
+
+
+def _resumir(acumulador):
+    """Resumo de um acumulador com os extremos válidos (ver AgregadosFrota.resumo)."""
+    quantidade = acumulador.quantidade
+    horas_trabalhadas = acumulador.somas["horas_trabalhadas"]
+    return {
+        "quantidade": quantidade,
+        "soma": dict(acumulador.somas),
+        "media": {
+            indicador: soma / quantidade if quantidade else 0.0
+            for indicador, soma in acumulador.somas.items()
+        },
+        "minimo": dict(acumulador.minimos),
+        "maximo": dict(acumulador.maximos),
+        "media_ponderada": {
+            indicador: soma / horas_trabalhadas if horas_trabalhadas else 0.0
+            for indicador, soma in acumulador.somas_ponderadas.items()
+        },
+    }
+
+
+class AgregadosFrota:
+    """
+    Agregados da frota (soma, contagem, mínimo, máximo e médias ponderadas
+    pelas horas trabalhadas) mantidos de forma incremental, no total e por
+    modelo de caminhão.
+
+    A alteração de um caminhão atualiza apenas a contribuição dele, em tempo
+    constante; a leitura do resumo não percorre a frota. Os mínimos e máximos
+    só são recalculados, sobre os caminhões do grupo, quando o caminhão que
+    detinha o extremo muda para um valor pior ou sai do grupo.
+    """
+
+    def __init__(self, frota=None, indicadores=None):
+        self._frota = None
+        self._copia = True
+        self._valores = []
+        self._grupos = []
+        self._total = _Acumulador()
+        self._por_grupo = {}
+        if frota is not None:
+            self.sincronizar(frota, indicadores)
+
+    def __len__(self):
+        return len(self._valores)
+
+    def _acumulador(self, grupo):
+        if grupo not in self._por_grupo:
+            self._por_grupo[grupo] = _Acumulador()
+        return self._por_grupo[grupo]
+
+    def _incluir(self, i, grupo, valores):
+        self._valores[i] = valores
+        self._grupos[i] = grupo
+        self._total.adicionar(i, valores)
+        self._acumulador(grupo).adicionar(i, valores)
+
+    def _trocar(self, i, grupo, valores):
+        """Troca os valores e o grupo do caminhão i."""
+        if self._grupos[i] != grupo:
+            self._excluir(i)
+            self._incluir(i, grupo, valores)
+            return
+        anteriores = self._valores[i]
+        self._valores[i] = valores
+        self._total.substituir(anteriores, valores)
+        self._por_grupo[grupo].substituir(anteriores, valores)
+
+    def _excluir(self, i):
+        grupo = self._grupos[i]
+        valores = self._valores[i]
+        self._total.remover(i, valores)
+        acumulador = self._por_grupo[grupo]
+        acumulador.remover(i, valores)
+        if acumulador.quantidade == 0:
+            del self._por_grupo[grupo]
+
+    @staticmethod
+    def _valores_caminhoes(indicadores, indices):
+        colunas = {indicador: indicadores[indicador] for indicador in INDICADORES_AGREGADOS}
+        return [
+            {indicador: float(colunas[indicador][j]) for indicador in INDICADORES_AGREGADOS}
+            for j in indices
+        ]
+
+    def sincronizar(self, frota, indicadores=None, copiar=True):
+        """
+        Alinha os agregados com a frota informada.
+
+        Se a quantidade de caminhões for a mesma, apenas os caminhões cujos
+        dados mudaram são atualizados (a comparação é vetorizada); caso
+        contrário os agregados são reconstruídos.
+
+        Args:
+          frota: Array estruturado da frota.
+          indicadores: Resultado de calcular_indicadores_frota para a frota
+            inteira, se já calculado; do contrário, só os caminhões alterados
+            são calculados.
+          copiar: Se False, os agregados são reconstruídos sobre o próprio
+            array informado, sem copiá-lo. Quem o compartilha (ver
+            frota_compartilhada.DerivadosFrota) não deve alterá-lo.
+        """
+        if copiar and self._copia and self._frota is not None and len(self._frota) == len(frota):
+            alterados = np.flatnonzero(self._frota != frota)
+            if len(alterados) == 0:
+                return
+            if indicadores is None:
+                indicadores, posicoes = calcular_indicadores_frota(frota[alterados]), range(len(alterados))
+            else:
+                posicoes = alterados
+            valores = self._valores_caminhoes(indicadores, posicoes)
+            grupos = frota["modelo"][alterados].tolist()
+            for i, grupo, valores_caminhao in zip(alterados.tolist(), grupos, valores):
+                self._trocar(i, grupo, valores_caminhao)
+            self._frota[alterados] = frota[alterados]
+            return
+
+        if indicadores is None:
+            indicadores = calcular_indicadores_frota(frota)
+        self._frota = frota.copy() if copiar else frota
+        self._copia = copiar
+        self._valores = [None] * len(frota)
+        self._grupos = [None] * len(frota)
+        self._total = _Acumulador()
+        self._por_grupo = {}
+        valores = self._valores_caminhoes(indicadores, range(len(frota)))
+        for i, (grupo, valores_caminhao) in enumerate(zip(frota["modelo"].tolist(), valores)):
+            self._incluir(i, grupo, valores_caminhao)
+
+    def atualizar(self, i, registro, indicadores=None):
+        """
+        Atualiza um único caminhão em tempo constante.
+
+        Args:
+          i: Posição do caminhão na frota.
+          registro: Registro do caminhão (uma linha do array da frota).
+          indicadores: Indicadores escalares do caminhão (ver
+            ResultadosFrota.__getitem__); calculados se omitidos.
+
+        Returns:
+          True se os dados do caminhão mudaram desde a última atualização.
+        """
+        if self._frota[i] == registro:
+            return False
+        if indicadores is None:
+            calculados = calcular_indicadores_frota(np.atleast_1d(registro))
+            valores = self._valores_caminhoes(calculados, [0])[0]
+        else:
+            valores = {indicador: float(indicadores[indicador]) for indicador in INDICADORES_AGREGADOS}
+        self._trocar(i, str(registro["modelo"]), valores)
+        self._frota[i] = registro
+        return True
+
+    def _recalcular_extremos(self, acumulador):
+        acumulador.minimos = {}
+        acumulador.maximos = {}
+        for i in acumulador.membros:
+            for indicador, valor in self._valores[i].items():
+                acumulador.minimos[indicador] = min(acumulador.minimos.get(indicador, valor), valor)
+                acumulador.maximos[indicador] = max(acumulador.maximos.get(indicador, valor), valor)
+        acumulador.extremos_validos = True
+
+    def _resumir(self, acumulador):
+        if not acumulador.extremos_validos:
+            self._recalcular_extremos(acumulador)
+        return _resumir(acumulador)
+
+    def resumo(self, grupo=None):
+        """
+        Retorna o resumo da frota inteira ou de um modelo.
+
+        Returns:
+          Dicionário com "quantidade" e, para cada indicador, "soma", "media",
+          "minimo" e "maximo"; "media_ponderada" traz DF e utilização
+          ponderadas pelas horas trabalhadas.
+        """
+        if grupo is None:
+            return self._resumir(self._total)
+        return self._resumir(self._por_grupo[grupo])
+
+    def por_grupo(self):
+        """Retorna o resumo de cada modelo de caminhão presente na frota."""
+        return {grupo: self._resumir(acumulador) for grupo, acumulador in self._por_grupo.items()}
+
+    def memoria(self):
+        """Bytes aproximados da cópia da frota e dos valores guardados por caminhão."""
+        if self._frota is None:
+            return 0
+        valores = sum(sys.getsizeof(valores) for valores in self._valores)
+        return (
+            (self._frota.nbytes if self._copia else 0)
+            + valores
+            + sys.getsizeof(self._valores)
+            + sys.getsizeof(self._grupos)
+        )
+
+
+class AgregadosAlterados:
+    """
+    Agregados de uma frota com alguns caminhões alterados, sobre os
+    AgregadosFrota da frota original, que só são lidos e podem ser
+    compartilhados.
+
+    Guarda apenas o modelo e os valores dos caminhões alterados e, no total e
+    por modelo, a diferença que eles fazem na contagem e nas somas: a memória
+    cresce com as alterações, não com a frota. Os extremos combinam os da
+    frota original com os dos alterados; só são recalculados sobre os demais
+    caminhões da frota original, de forma vetorizada, quando um caminhão
+    alterado tinha o valor de um extremo dela.
+
+    Args:
+      base: AgregadosFrota da frota original.
+      indicadores: Resultado de calcular_indicadores_frota da frota original.
+    """
+
+    def __init__(self, base, indicadores):
+        self.base = base
+        self._indicadores_base = indicadores
+        self._valores = {}
+        self._grupos = {}
+        self._diferencas = {}
+        # Extremos dos caminhões não alterados da frota original, por grupo
+        # (None é a frota inteira); descartados quando um caminhão novo é alterado
+        self._extremos_base = {}
+
+    def __len__(self):
+        return len(self.base)
+
+    def _diferenca(self, grupo):
+        if grupo not in self._diferencas:
+            self._diferencas[grupo] = _Acumulador()
+        return self._diferencas[grupo]
+
+    def atualizar(self, i, grupo, valores):
+        """
+        Troca a contribuição do caminhão i pela dos valores informados.
+
+        Args:
+          i: Posição do caminhão na frota.
+          grupo: Modelo do caminhão.
+          valores: Dicionário com os INDICADORES_AGREGADOS do caminhão.
+        """
+        if i in self._valores:
+            grupo_anterior, anteriores = self._grupos[i], self._valores[i]
+        else:
+            grupo_anterior, anteriores = self.base._grupos[i], self.base._valores[i]
+            self._extremos_base.pop(None, None)
+            self._extremos_base.pop(grupo_anterior, None)
+        for chave in (None, grupo_anterior):
+            self._diferenca(chave).somar(anteriores, -1)
+        for chave in (None, grupo):
+            self._diferenca(chave).somar(valores)
+        self._grupos[i] = grupo
+        self._valores[i] = dict(valores)
+
+    def _extremos_originais(self, grupo):
+        """Mínimos e máximos dos caminhões não alterados da frota original no grupo."""
+        if grupo in self._extremos_base:
+            return self._extremos_base[grupo]
+        original = self.base._total if grupo is None else self.base._por_grupo.get(grupo)
+        minimos, maximos = {}, {}
+        if original is not None:
+            if not original.extremos_validos:
+                self.base._recalcular_extremos(original)
+            alterados = [
+                i for i in self._valores if grupo is None or self.base._grupos[i] == grupo
+            ]
+            detinham = any(
+                valor in (original.minimos[indicador], original.maximos[indicador])
+                for i in alterados
+                for indicador, valor in self.base._valores[i].items()
+            )
+            if not detinham:
+                minimos, maximos = original.minimos, original.maximos
+            else:
+                if grupo is None:
+                    demais = np.ones(len(self.base), dtype=bool)
+                else:
+                    demais = self.base._frota["modelo"] == grupo
+                demais[alterados] = False
+                if demais.any():
+                    for indicador in INDICADORES_AGREGADOS:
+                        valores = self._indicadores_base[indicador][demais]
+                        minimos[indicador] = float(valores.min())
+                        maximos[indicador] = float(valores.max())
+        self._extremos_base[grupo] = (minimos, maximos)
+        return minimos, maximos
+
+    def _combinar(self, grupo):
+        acumulador = _Acumulador()
+        original = self.base._total if grupo is None else self.base._por_grupo.get(grupo)
+        for parcela in (original, self._diferencas.get(grupo)):
+            if parcela is not None:
+                acumulador.quantidade += parcela.quantidade
+                for indicador, soma in parcela.somas.items():
+                    acumulador.somas[indicador] += soma
+                for indicador, soma in parcela.somas_ponderadas.items():
+                    acumulador.somas_ponderadas[indicador] += soma
+        minimos, maximos = self._extremos_originais(grupo)
+        acumulador.minimos, acumulador.maximos = dict(minimos), dict(maximos)
+        for i, valores in self._valores.items():
+            if grupo is None or self._grupos[i] == grupo:
+                for indicador, valor in valores.items():
+                    acumulador.minimos[indicador] = min(acumulador.minimos.get(indicador, valor), valor)
+                    acumulador.maximos[indicador] = max(acumulador.maximos.get(indicador, valor), valor)
+        return acumulador
+
+    def resumo(self, grupo=None):
+        """Retorna o resumo da frota inteira ou de um modelo (ver AgregadosFrota.resumo)."""
+        acumulador = self._combinar(grupo)
+        if grupo is not None and acumulador.quantidade == 0:
+            raise KeyError(grupo)
+        return _resumir(acumulador)
+
+    def por_grupo(self):
+        """Retorna o resumo de cada modelo de caminhão presente na frota."""
+        grupos = list(self.base._por_grupo)
+        grupos += [grupo for grupo in self._diferencas if grupo is not None and grupo not in grupos]
+        acumuladores = {grupo: self._combinar(grupo) for grupo in grupos}
+        return {
+            grupo: _resumir(acumulador)
+            for grupo, acumulador in acumuladores.items()
+            if acumulador.quantidade > 0
+        }
+
+    def memoria(self):
+        """Bytes aproximados dos valores dos caminhões alterados e das diferenças."""
+        return (
+            sys.getsizeof(self._valores)
+            + sum(sys.getsizeof(valores) for valores in self._valores.values())
+            + sys.getsizeof(self._grupos)
+            + sys.getsizeof(self._diferencas)
+            + sum(sys.getsizeof(diferenca.somas) for diferenca in self._diferencas.values())
+        )
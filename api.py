@@ -0,0 +1,389 @@
+"""
+Serviço HTTP com os cálculos do dimensionamento em lote, sem Streamlit, para
+outros sistemas (despacho, planejamento).
+
+Endpoints:
+  GET  /saude            estado do serviço
+  POST /indicadores      frota -> DF, utilização, HNU, horas e perdas por caminhão
+  POST /rotas            segmentos e caminhão -> ciclo e produtividade por rota
+  POST /produtividade    lotes de parâmetros de ciclo -> tempo de ciclo e Ton/h
+
+Os corpos são JSON com tabelas colunares (coluna -> lista de valores) ou listas
+de registros. /indicadores e /produtividade também aceitam a tabela em Arrow
+(Content-Type: application/vnd.apache.arrow.stream), e todos os POST respondem
+em Arrow com Accept: application/vnd.apache.arrow.stream. Arrow requer o
+pacote pyarrow. O parâmetro ?colunas=df,utilizacao limita as colunas da resposta.
+
+Exemplos:
+  python api.py --porta 8000
+  curl -X POST localhost:8000/indicadores \\
+    -d '{"frota": {"qtd_250h": [35], "qtd_500h": [18], "qtd_1000h": [9],
+         "qtd_16000h": [0], "taxa_corretiva": [0.25]}}'
+"""
+import argparse
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from calculos import calcular_capacidade_liquida
+from frota import calcular_indicadores_frota
+from importacao import COLUNAS_RESULTADOS, ErroImportacao, ler_frota_colunas, ler_rotas_colunas
+from rotas import calcular_produtividade_rotas
+from sensibilidade import PARAMETROS_PRODUTIVIDADE, avaliar_produtividade
+
+TIPO_JSON = "application/json"
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+
+# Conexões atendidas ao mesmo tempo; cada conexão mantida aberta (keep-alive)
+# ocupa um trabalhador enquanto durar
+TRABALHADORES = 32
+
+# Segundos sem receber dados até uma conexão ser fechada, para que clientes
+# ociosos ou lentos não prendam os trabalhadores do pool
+TEMPO_LIMITE_CONEXAO = 5
+
+# Maior corpo aceito, suficiente para frotas de um milhão de caminhões em JSON
+TAMANHO_MAXIMO_CORPO = 256 * 1024 * 1024
+
+
+class ErroRequisicao(ValueError):
+    """Requisição inválida, respondida com o status e a lista de erros."""
+
+    def __init__(self, erros, status=400):
+        self.erros = erros
+        self.status = status
+        super().__init__("; ".join(erros))
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as erro:
+        raise ErroRequisicao(
+            ["O formato Arrow requer o pacote pyarrow no servidor."], status=415
+        ) from erro
+    return pa
+
+
+def _tabela(valor, nome):
+    """Converte uma tabela colunar ou uma lista de registros em dicionário de colunas."""
+    if isinstance(valor, dict):
+        if not all(isinstance(coluna, list) for coluna in valor.values()):
+            raise ErroRequisicao([f"{nome}: cada coluna deve ser uma lista de valores"])
+        return valor
+    if isinstance(valor, list) and all(isinstance(registro, dict) for registro in valor):
+        chaves = dict.fromkeys(chave for registro in valor for chave in registro)
+        return {chave: [registro.get(chave) for registro in valor] for chave in chaves}
+    raise ErroRequisicao([f"{nome}: informe uma tabela colunar ou uma lista de registros"])
+
+
+def _ler_corpo(corpo, tipo, campo):
+    """
+    Lê o corpo da requisição.
+
+    Returns:
+      Tupla (tabela colunar do campo, demais chaves do JSON). Em Arrow o corpo
+      inteiro é a tabela.
+    """
+    if tipo == TIPO_ARROW:
+        pa = _importar_pyarrow()
+        try:
+            tabela = pa.ipc.open_stream(corpo).read_all()
+        except pa.ArrowInvalid as erro:
+            raise ErroRequisicao([f"Corpo Arrow inválido: {erro}"]) from erro
+        return {
+            nome: tabela.column(nome).to_numpy(zero_copy_only=False) for nome in tabela.column_names
+        }, {}
+    try:
+        dados = json.loads(corpo)
+    except (UnicodeDecodeError, json.JSONDecodeError) as erro:
+        raise ErroRequisicao([f"JSON inválido: {erro}"]) from erro
+    if not isinstance(dados, dict) or campo not in dados:
+        raise ErroRequisicao([f"O corpo deve ser um objeto com a chave \"{campo}\""])
+    return _tabela(dados[campo], campo), dados
+
+
+def _numero(dados, chave, padrao=None):
+    valor = dados.get(chave, padrao)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not 0 <= valor < np.inf:
+        raise ErroRequisicao([f"{chave}: informe um número não negativo"])
+    return float(valor)
+
+
+def indicadores(corpo, tipo):
+    """
+    DF, utilização, horas e perdas de cada caminhão (calcular_indicadores_frota).
+
+    Corpo: {"frota": tabela no esquema de dados_caminhao}, como nos arquivos
+    de importação; "caminhao" e "modelo" são opcionais.
+    """
+    colunas, _ = _ler_corpo(corpo, tipo, "frota")
+    try:
+        frota = ler_frota_colunas(colunas)
+    except ErroImportacao as erro:
+        raise ErroRequisicao(erro.erros) from erro
+
+    valores = calcular_indicadores_frota(frota)
+    tabela = {"caminhao": frota["caminhao"]}
+    for coluna in COLUNAS_RESULTADOS:
+        tabela[coluna] = valores[coluna]
+    for perda, horas in valores["tempo_perdido"].items():
+        tabela[f"tempo_perdido.{perda}"] = horas
+    return tabela
+
+
+def rotas(corpo, tipo):
+    """
+    Tempo de ciclo e produtividade de cada rota (calcular_produtividade_rotas).
+
+    Corpo: {"segmentos": tabela com rota, distancia, velocidade_carregado e
+    velocidade_vazio, "capacidade_caminhao": t, "fator_enchimento": %}.
+    Rotas inválidas ("valida" falso) têm tempos e produtividade zero.
+    """
+    if tipo == TIPO_ARROW:
+        raise ErroRequisicao(["/rotas aceita apenas JSON"], status=415)
+    colunas, dados = _ler_corpo(corpo, tipo, "segmentos")
+    capacidade_liquida = calcular_capacidade_liquida(
+        _numero(dados, "capacidade_caminhao"), _numero(dados, "fator_enchimento", 100.0)
+    )
+    try:
+        segmentos = ler_rotas_colunas(colunas)
+    except ErroImportacao as erro:
+        raise ErroRequisicao(erro.erros) from erro
+
+    resultado = calcular_produtividade_rotas(segmentos, capacidade_liquida)
+    return {
+        "rota": resultado["rotas"],
+        "tempo_carregado": resultado["tempo_carregado"],
+        "tempo_vazio": resultado["tempo_vazio"],
+        "tempo_ciclo": resultado["tempo_ciclo"],
+        "produtividade": resultado["produtividade"],
+        "valida": resultado["valida"],
+    }
+
+
+def produtividade(corpo, tipo):
+    """
+    Tempo de ciclo e produtividade horária de um lote de combinações dos
+    parâmetros de PARAMETROS_PRODUTIVIDADE (avaliar_produtividade).
+
+    Corpo: {"parametros": tabela com um ou mais parâmetros, "base": valores
+    dos demais parâmetros, opcional}. Combinações inválidas ("valida" falso,
+    com alguma seção de distância positiva e velocidade zero) têm tempo de
+    ciclo e produtividade zero.
+    """
+    colunas, dados = _ler_corpo(corpo, tipo, "parametros")
+    base = dict(PARAMETROS_PRODUTIVIDADE)
+    if not isinstance(dados.get("base", {}), dict):
+        raise ErroRequisicao(["base: informe um objeto parâmetro -> valor"])
+    for nome in dados.get("base", {}):
+        base[nome] = _numero(dados["base"], nome)
+
+    erros = [
+        f"Parâmetro desconhecido: {nome}"
+        for nome in {**colunas, **base}
+        if nome not in PARAMETROS_PRODUTIVIDADE
+    ]
+    if len({len(valores) for valores in colunas.values()}) > 1:
+        erros.append("As colunas precisam ter o mesmo número de valores")
+    parametros = {}
+    for nome, valores in colunas.items():
+        try:
+            parametros[nome] = np.asarray(valores, dtype=np.float64)
+        except (TypeError, ValueError):
+            erros.append(f"Coluna {nome}: valores não numéricos")
+            continue
+        if parametros[nome].ndim != 1:
+            erros.append(f"Coluna {nome}: informe uma lista de números, sem listas aninhadas")
+            continue
+        if (~np.isfinite(parametros[nome]) | (parametros[nome] < 0)).any():
+            erros.append(f"Coluna {nome}: valores inválidos")
+    if erros:
+        raise ErroRequisicao(erros)
+    if not parametros:
+        raise ErroRequisicao(["parametros: informe ao menos uma coluna"])
+
+    resultado = avaliar_produtividade(parametros, base)
+    return {
+        "tempo_ciclo": resultado["tempo_ciclo"],
+        "produtividade": resultado["produtividade"],
+        "valida": resultado["valida"],
+    }
+
+
+ROTAS_POST = {
+    "/indicadores": indicadores,
+    "/rotas": rotas,
+    "/produtividade": produtividade,
+}
+
+
+def serializar(tabela, formato):
+    """
+    Serializa uma tabela colunar (nome -> array) em JSON compacto ou Arrow.
+
+    Returns:
+      Tupla (tipo de conteúdo, bytes).
+    """
+    if formato == TIPO_ARROW:
+        pa = _importar_pyarrow()
+        tabela_arrow = pa.table({nome: np.asarray(valores) for nome, valores in tabela.items()})
+        destino = io.BytesIO()
+        with pa.ipc.new_stream(destino, tabela_arrow.schema) as escritor:
+            escritor.write_table(tabela_arrow)
+        return TIPO_ARROW, destino.getvalue()
+    dados = {nome: np.asarray(valores).tolist() for nome, valores in tabela.items()}
+    return TIPO_JSON, json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def atender(metodo, caminho, corpo=b"", tipo=TIPO_JSON, aceita=TIPO_JSON):
+    """
+    Atende uma requisição sem depender do servidor HTTP, o que permite usar e
+    testar o serviço localmente.
+
+    Args:
+      metodo: "GET" ou "POST".
+      caminho: Caminho com a query string, por exemplo "/indicadores?colunas=df".
+      corpo: Corpo da requisição em bytes.
+      tipo: Content-Type do corpo.
+      aceita: Cabeçalho Accept; com TIPO_ARROW a resposta é em Arrow.
+
+    Returns:
+      Tupla (status HTTP, tipo de conteúdo, bytes da resposta).
+    """
+    url = urlsplit(caminho)
+    try:
+        if metodo == "GET" and url.path == "/saude":
+            return 200, TIPO_JSON, b'{"status":"ok"}'
+        if url.path not in ROTAS_POST:
+            raise ErroRequisicao([f"Caminho desconhecido: {url.path}"], status=404)
+        if metodo != "POST":
+            raise ErroRequisicao([f"{url.path} aceita apenas POST"], status=405)
+
+        tabela = ROTAS_POST[url.path](corpo, (tipo or TIPO_JSON).split(";")[0].strip())
+        selecao = parse_qs(url.query).get("colunas")
+        if selecao:
+            nomes = selecao[0].split(",")
+            desconhecidas = [nome for nome in nomes if nome not in tabela]
+            if desconhecidas:
+                raise ErroRequisicao([f"Colunas desconhecidas: {', '.join(desconhecidas)}"])
+            tabela = {nome: tabela[nome] for nome in nomes}
+        formato = TIPO_ARROW if aceita and TIPO_ARROW in aceita else TIPO_JSON
+        return (200, *serializar(tabela, formato))
+    except ErroRequisicao as erro:
+        conteudo = json.dumps({"erros": erro.erros}, ensure_ascii=False).encode()
+        return erro.status, TIPO_JSON, conteudo
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    # HTTP/1.1 mantém a conexão aberta entre as requisições de um cliente
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em escritas separadas; sem TCP_NODELAY o Nagle
+    # somado ao ACK atrasado do cliente segura cada resposta por ~40 ms
+    disable_nagle_algorithm = True
+    timeout = TEMPO_LIMITE_CONEXAO
+    registrar = False
+
+    def _responder(self, status, tipo, conteudo):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def _recusar(self, status, erro):
+        # Sem saber onde o corpo termina, a conexão não pode ser reaproveitada
+        self.close_connection = True
+        self._responder(status, TIPO_JSON, json.dumps({"erros": [erro]}).encode())
+
+    def _atender(self, metodo):
+        try:
+            tamanho = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            tamanho = -1
+        if tamanho < 0:
+            self._recusar(400, "Content-Length inválido")
+            return
+        if tamanho > TAMANHO_MAXIMO_CORPO:
+            self._recusar(413, "Corpo da requisição muito grande")
+            return
+        corpo = self.rfile.read(tamanho) if tamanho else b""
+        self._responder(
+            *atender(
+                metodo,
+                self.path,
+                corpo,
+                self.headers.get("Content-Type"),
+                self.headers.get("Accept"),
+            )
+        )
+
+    def do_GET(self):
+        self._atender("GET")
+
+    def do_POST(self):
+        self._atender("POST")
+
+    def log_message(self, formato, *args):
+        if self.registrar:
+            super().log_message(formato, *args)
+
+
+class ServidorAPI(ThreadingHTTPServer):
+    """
+    Servidor HTTP que atende as conexões em um pool de threads fixo, em vez de
+    uma thread nova por conexão.
+
+    Args:
+      endereco: Tupla (host, porta); porta 0 escolhe uma porta livre.
+      trabalhadores: Tamanho do pool de threads.
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, endereco, trabalhadores=TRABALHADORES):
+        super().__init__(endereco, ManipuladorAPI)
+        self.executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="api")
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Serviço HTTP com DF, utilização e produtividade em lote."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8000)
+    parser.add_argument("--trabalhadores", type=int, default=TRABALHADORES)
+    parser.add_argument("--registrar", action="store_true", help="Registra cada requisição.")
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    ManipuladorAPI.registrar = args.registrar
+    servidor = ServidorAPI((args.host, args.porta), args.trabalhadores)
+    host, porta = servidor.server_address[:2]
+    sys.stderr.write(f"Servindo em http://{host}:{porta}\n")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
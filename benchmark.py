@@ -0,0 +1,496 @@
+"""
+Benchmarks dos cálculos e da execução completa do dashboard.
+
+Três partes:
+  - micro: cada função de calculos.py, na forma escalar (um caminhão por
+    chamada, como em main.py antes do cálculo em lote) e na forma em lote
+    (frota.py e rotas.py), para 1, 100, 10 mil e 1 milhão de caminhões;
+  - app: execução headless de main.py com o AppTest do Streamlit, com a
+    frota já carregada na session_state;
+  - partida: primeira execução de cada página num processo novo, sem e com
+    o aquecimento de partida.py, conferida contra ORCAMENTO_PARTIDA.
+
+Para cada caso são medidos o tempo (melhor de N repetições), os blocos de
+memória alocados e o pico de memória (tracemalloc), comparados com a linha de
+base salva em benchmark_baseline.json.
+
+Exemplos:
+  python benchmark.py
+  python benchmark.py --grupo micro --tamanhos 1 100 10000
+  python benchmark.py --salvar-baseline
+  python benchmark.py --grupo partida
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+
+import calculos
+from frota import (
+    DTYPE_FROTA,
+    calcular_df_frota,
+    calcular_indicadores_frota,
+    calcular_tempo_parado_frota,
+    calcular_tempo_perdido_frota,
+    frota_para_dicionarios,
+)
+from frota_compartilhada import DerivadosSessao, FrotaBase, FrotaSessao
+from partida import ORCAMENTO_PARTIDA
+from rotas import DTYPE_SEGMENTO, calcular_produtividade_rotas, calcular_tempo_segmentos
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_BASELINE = os.path.join(DIRETORIO, "benchmark_baseline.json")
+
+TAMANHOS_MICRO = [1, 100, 10_000, 1_000_000]
+TAMANHOS_APP = [8, 100, 1_000]
+
+# Valor do seletor de página de main.py para cada página do orçamento de partida
+PAGINAS_PARTIDA = {
+    "dimensionamento": "Dimensionamento da Frota",
+    "produtividade": "Produtividade Horária",
+}
+
+# Razão atual / linha de base a partir da qual um resultado é uma regressão
+TOLERANCIA_TEMPO = 1.5
+TOLERANCIA_MEMORIA = 1.2
+
+
+def gerar_frota(n, semente=0):
+    """Gera uma frota aleatória de n caminhões com valores plausíveis."""
+    rng = np.random.default_rng(semente)
+    frota = np.zeros(n, dtype=DTYPE_FROTA)
+    frota["caminhao"] = [f"CM-{i+1:03}" for i in range(n)]
+    frota["qtd_250h"] = rng.integers(20, 40, n)
+    frota["qtd_500h"] = rng.integers(10, 20, n)
+    frota["qtd_1000h"] = rng.integers(4, 10, n)
+    frota["qtd_16000h"] = rng.integers(0, 2, n)
+    frota["taxa_corretiva"] = rng.uniform(0.1, 0.4, n)
+    frota["qtd_sem_operador"] = rng.integers(0, 50, n)
+    frota["qtd_parada_desmonte"] = rng.integers(0, 50, n)
+    frota["qtd_parada_climatica"] = rng.integers(0, 50, n)
+    frota["qtd_almoco"] = rng.integers(0, 2, n)
+    frota["qtd_troca_turno"] = rng.integers(0, 3, n)
+    frota["perc_absenteismo"] = rng.uniform(0, 5, n)
+    frota["perc_treinamento"] = rng.uniform(0, 3, n)
+    return frota
+
+
+def gerar_segmentos(n, semente=0):
+    """Gera n rotas de um segmento cada, com velocidades positivas."""
+    rng = np.random.default_rng(semente)
+    segmentos = np.zeros(n, dtype=DTYPE_SEGMENTO)
+    segmentos["rota"] = [f"Rota {i+1}" for i in range(n)]
+    segmentos["distancia"] = rng.uniform(500, 5000, n)
+    segmentos["velocidade_carregado"] = rng.uniform(10, 30, n)
+    segmentos["velocidade_vazio"] = rng.uniform(20, 50, n)
+    return segmentos
+
+
+def _casos_micro(n):
+    """
+    Monta os casos micro para n caminhões (ou n seções/rotas nas funções de ciclo).
+
+    Returns:
+      Lista de tuplas (função de calculos.py, chamada escalar, chamada em lote).
+    """
+    frota = gerar_frota(n)
+    dados = frota_para_dicionarios(frota)
+    tempo_parado = calcular_tempo_parado_frota(frota)
+    tempos_parados = tempo_parado.tolist()
+    quantidades = frota["qtd_250h"]
+    quantidades_lista = quantidades.tolist()
+
+    segmentos = gerar_segmentos(n)
+    distancias = segmentos["distancia"].tolist()
+    velocidades = segmentos["velocidade_carregado"].tolist()
+    tempo_ciclo = calcular_tempo_segmentos(segmentos["distancia"], segmentos["velocidade_carregado"])
+    tempos_ciclo = tempo_ciclo.tolist()
+    capacidades = np.full(n, 240.0)
+
+    return [
+        (
+            "calcular_tempo_total",
+            lambda: [calculos.calcular_tempo_total(q, 8) for q in quantidades_lista],
+            lambda: calculos.calcular_tempo_total(quantidades, 8),
+        ),
+        (
+            "calcular_tempo_parado",
+            lambda: [calculos.calcular_tempo_parado(d) for d in dados],
+            lambda: calcular_tempo_parado_frota(frota),
+        ),
+        (
+            "calcular_df",
+            lambda: [calculos.calcular_df(t) for t in tempos_parados],
+            lambda: calcular_df_frota(tempo_parado),
+        ),
+        (
+            "calcular_utilizacao",
+            lambda: [calculos.calcular_utilizacao(d) for d in dados],
+            lambda: calcular_indicadores_frota(frota),
+        ),
+        (
+            "calcular_tempo_perdido",
+            lambda: [calculos.calcular_tempo_perdido(d) for d in dados],
+            lambda: calcular_tempo_perdido_frota(frota),
+        ),
+        (
+            "calcular_tempo_ciclo",
+            lambda: [calculos.calcular_tempo_ciclo(d, v) for d, v in zip(distancias, velocidades)],
+            lambda: calcular_tempo_segmentos(segmentos["distancia"], segmentos["velocidade_carregado"]),
+        ),
+        (
+            "calcular_tempo_ciclo_total",
+            lambda: [calculos.calcular_tempo_ciclo_total(t, t, t) for t in tempos_ciclo],
+            lambda: calculos.calcular_tempo_ciclo_total(tempo_ciclo, tempo_ciclo, tempo_ciclo),
+        ),
+        (
+            "calcular_capacidade_liquida",
+            lambda: [calculos.calcular_capacidade_liquida(240.0, 90.0) for _ in range(n)],
+            lambda: calculos.calcular_capacidade_liquida(capacidades, 90.0),
+        ),
+        (
+            "calcular_produtividade_horaria",
+            lambda: [calculos.calcular_produtividade_horaria(216.0, t) for t in tempos_ciclo],
+            lambda: calcular_produtividade_rotas(segmentos, 216.0),
+        ),
+    ]
+
+
+def medir(funcao, repeticoes=3):
+    """
+    Mede o tempo e a memória de uma chamada.
+
+    O tempo é o melhor de 'repeticoes' medições sem o tracemalloc, que
+    desacelera as alocações; como no timeit, chamadas rápidas são repetidas
+    em laço até somar ao menos 0,2 s por medição. A memória vem de uma
+    execução extra rastreada.
+
+    Returns:
+      Dicionário com "tempo" (segundos), "blocos" (blocos de memória alocados
+      e ainda vivos ao fim da chamada, incluindo o resultado) e "pico" (bytes
+      acima do início da chamada).
+    """
+    temporizador = timeit.Timer(funcao)
+    numero, _ = temporizador.autorange()
+    tempo = min(temporizador.repeat(repeticoes, numero)) / numero
+
+    tracemalloc.start()
+    try:
+        antes = tracemalloc.take_snapshot()
+        atual_antes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        resultado = funcao()
+        _, pico = tracemalloc.get_traced_memory()
+        depois = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocos = sum(
+        max(estatistica.count_diff, 0)
+        for estatistica in depois.compare_to(antes, "filename")
+    )
+    del resultado
+    return {"tempo": tempo, "blocos": int(blocos), "pico": int(pico - atual_antes)}
+
+
+def executar_micro(tamanhos=TAMANHOS_MICRO, limite_escalar=None, repeticoes=3):
+    """
+    Executa os micro-benchmarks de calculos.py.
+
+    Args:
+      tamanhos: Quantidades de caminhões avaliadas.
+      limite_escalar: Maior quantidade avaliada na forma escalar; acima dela
+        apenas o lote é medido. Padrão: sem limite.
+      repeticoes: Repetições de cada medição de tempo.
+
+    Returns:
+      Dicionário "micro/<função>/<escalar|lote>/<n>" -> medição (ver medir).
+    """
+    resultados = {}
+    for n in tamanhos:
+        # Os casos grandes são caros; uma repetição já domina o ruído
+        repeticoes_n = repeticoes if n <= 10_000 else 1
+        for nome, escalar, lote in _casos_micro(n):
+            if limite_escalar is None or n <= limite_escalar:
+                resultados[f"micro/{nome}/escalar/{n}"] = medir(escalar, repeticoes_n)
+            resultados[f"micro/{nome}/lote/{n}"] = medir(lote, repeticoes_n)
+    return resultados
+
+
+def executar_app(tamanhos=TAMANHOS_APP, tempo_limite=120):
+    """
+    Executa main.py de forma headless com o AppTest do Streamlit.
+
+    Mede a primeira execução da sessão, que inclui o cálculo de todos os
+    caminhões, e uma reexecução sem alterações, que aproveita o cache. A
+    primeira execução só acontece uma vez por sessão: é cronometrada numa
+    única chamada, sem repetições e sem o tracemalloc, e fica sem medição de
+    memória, como no grupo "partida". As importações do processo ficam de
+    fora, com o aquecimento de partida.py antes das medições: o custo delas
+    é o do grupo "partida", e assim as quantidades são comparáveis entre si.
+
+    Returns:
+      Dicionário "app/<primeira_execucao|reexecucao>/<n>" -> medição (ver medir).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    import partida
+
+    partida.aquecer().aguardar()
+    resultados = {}
+    for n in tamanhos:
+        app = AppTest.from_file(os.path.join(DIRETORIO, "main.py"), default_timeout=tempo_limite)
+        app.session_state["frota"] = FrotaSessao(FrotaBase(gerar_frota(n), f"benchmark:{n}"))
+        app.session_state["derivados_frota"] = DerivadosSessao()
+        app.session_state["versao_frota"] = 0
+        app.session_state["num_caminhoes"] = n
+
+        def executar():
+            app.run()
+            if app.exception:
+                raise RuntimeError(f"main.py falhou com {n} caminhões: {app.exception[0].message}")
+
+        inicio = time.perf_counter()
+        executar()
+        tempo = time.perf_counter() - inicio
+        resultados[f"app/primeira_execucao/{n}"] = {"tempo": tempo, "blocos": 0, "pico": 0}
+        resultados[f"app/reexecucao/{n}"] = medir(executar, repeticoes=3)
+    return resultados
+
+
+def primeira_execucao(pagina, aquecido=False, tempo_limite=120):
+    """
+    Mede a primeira execução de uma página de main.py neste processo, que
+    deve ser novo. O Streamlit é importado antes e fica fora da medição, como
+    no servidor, que já o tem importado quando a primeira sessão chega; o
+    NumPy e os módulos de cálculo também, pelas importações deste script.
+
+    Args:
+      pagina: Chave de PAGINAS_PARTIDA.
+      aquecido: Aguarda o aquecimento de partida.py antes, como num servidor
+        iniciado por ele.
+
+    Returns:
+      Duração em segundos: as importações de main.py e a execução completa.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    if aquecido:
+        import partida
+
+        partida.aquecer().aguardar()
+    app = AppTest.from_file(os.path.join(DIRETORIO, "main.py"), default_timeout=tempo_limite)
+    app.session_state["pagina"] = PAGINAS_PARTIDA[pagina]
+    inicio = time.perf_counter()
+    app.run()
+    duracao = time.perf_counter() - inicio
+    if app.exception:
+        raise RuntimeError(f"main.py falhou na página {pagina}: {app.exception[0].message}")
+    return duracao
+
+
+def executar_partida(repeticoes=3):
+    """
+    Mede a primeira execução de cada página, cada uma num processo novo.
+
+    Returns:
+      Dicionário "partida/<página>/<frio|aquecido>" -> medição (ver medir),
+      com o melhor tempo das repetições e sem medição de memória.
+    """
+    resultados = {}
+    for pagina in PAGINAS_PARTIDA:
+        for estado in ("frio", "aquecido"):
+            comando = [sys.executable, os.path.abspath(__file__), "--primeira-execucao", pagina]
+            if estado == "aquecido":
+                comando.append("--aquecido")
+            tempos = [
+                float(
+                    subprocess.run(
+                        comando, capture_output=True, text=True, check=True, cwd=DIRETORIO
+                    ).stdout.split()[-1]
+                )
+                for _ in range(repeticoes)
+            ]
+            resultados[f"partida/{pagina}/{estado}"] = {"tempo": min(tempos), "blocos": 0, "pico": 0}
+    return resultados
+
+
+def conferir_orcamento(resultados, orcamento=ORCAMENTO_PARTIDA):
+    """
+    Confere a partida aquecida, a de um servidor iniciado por partida.py,
+    contra o orçamento de cada página.
+
+    Returns:
+      Lista de tuplas (página, tempo, orçamento) das páginas acima do orçamento.
+    """
+    return [
+        (pagina, resultados[chave]["tempo"], limite)
+        for pagina, limite in orcamento.items()
+        if (chave := f"partida/{pagina}/aquecido") in resultados
+        and resultados[chave]["tempo"] > limite
+    ]
+
+
+def comparar(resultados, baseline, tolerancia_tempo=TOLERANCIA_TEMPO, tolerancia_memoria=TOLERANCIA_MEMORIA):
+    """
+    Compara os resultados com a linha de base.
+
+    Returns:
+      Lista de tuplas (chave, medição, medição da linha de base ou None,
+      razão de tempo, razão de pico, regressão).
+    """
+    linhas = []
+    for chave, medicao in resultados.items():
+        referencia = baseline.get(chave)
+        if referencia is None:
+            linhas.append((chave, medicao, None, None, None, False))
+            continue
+        razao_tempo = medicao["tempo"] / referencia["tempo"] if referencia["tempo"] > 0 else None
+        razao_pico = medicao["pico"] / referencia["pico"] if referencia["pico"] > 0 else None
+        regressao = (razao_tempo is not None and razao_tempo > tolerancia_tempo) or (
+            razao_pico is not None and razao_pico > tolerancia_memoria
+        )
+        linhas.append((chave, medicao, referencia, razao_tempo, razao_pico, regressao))
+    return linhas
+
+
+def _formatar_bytes(valor):
+    for unidade in ["B", "KiB", "MiB"]:
+        if abs(valor) < 1024:
+            return f"{valor:.0f} {unidade}"
+        valor /= 1024
+    return f"{valor:.1f} GiB"
+
+
+def _formatar_razao(razao):
+    return "-" if razao is None else f"{razao:.2f}x"
+
+
+def imprimir(linhas, destino=sys.stdout):
+    destino.write(
+        f"{'caso':<58} {'tempo':>12} {'blocos':>9} {'pico':>11} {'Δtempo':>8} {'Δpico':>8}\n"
+    )
+    for chave, medicao, _, razao_tempo, razao_pico, regressao in linhas:
+        destino.write(
+            f"{chave:<58} {medicao['tempo'] * 1000:>9.3f} ms {medicao['blocos']:>9} "
+            f"{_formatar_bytes(medicao['pico']):>11} {_formatar_razao(razao_tempo):>8} "
+            f"{_formatar_razao(razao_pico):>8}{'  REGRESSÃO' if regressao else ''}\n"
+        )
+
+
+def ambiente():
+    """Descreve o ambiente da medição, gravado junto à linha de base."""
+    import streamlit
+
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "streamlit": streamlit.__version__,
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def carregar_baseline(caminho=ARQUIVO_BASELINE):
+    """Lê a linha de base; devolve (ambiente, resultados), vazios se o arquivo não existir."""
+    if not os.path.exists(caminho):
+        return {}, {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        dados = json.load(arquivo)
+    return dados["ambiente"], dados["resultados"]
+
+
+def salvar_baseline(resultados, caminho=ARQUIVO_BASELINE):
+    """Grava os resultados como linha de base, preservando as chaves não medidas."""
+    combinados = {**carregar_baseline(caminho)[1], **resultados}
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(
+            {"ambiente": ambiente(), "resultados": dict(sorted(combinados.items()))},
+            arquivo,
+            ensure_ascii=False,
+            indent=1,
+        )
+        arquivo.write("\n")
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Mede tempo e memória dos cálculos e da execução do dashboard."
+    )
+    parser.add_argument("--grupo", choices=["micro", "app", "partida", "todos"], default="todos")
+    parser.add_argument(
+        "--tamanhos", type=int, nargs="+", help="Quantidades de caminhões (padrão: por grupo)."
+    )
+    parser.add_argument(
+        "--limite-escalar",
+        type=int,
+        help="Maior quantidade de caminhões medida na forma escalar.",
+    )
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--baseline", default=ARQUIVO_BASELINE, help="Arquivo da linha de base.")
+    parser.add_argument(
+        "--salvar-baseline", action="store_true", help="Grava os resultados como nova linha de base."
+    )
+    parser.add_argument("--saida", help="Arquivo JSON para os resultados desta execução.")
+    parser.add_argument("--tolerancia-tempo", type=float, default=TOLERANCIA_TEMPO)
+    parser.add_argument("--tolerancia-memoria", type=float, default=TOLERANCIA_MEMORIA)
+    # Uso interno do grupo "partida": uma medição por processo novo
+    parser.add_argument("--primeira-execucao", choices=list(PAGINAS_PARTIDA), help=argparse.SUPPRESS)
+    parser.add_argument("--aquecido", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if args.primeira_execucao:
+        print(primeira_execucao(args.primeira_execucao, args.aquecido))
+        return 0
+
+    resultados = {}
+    if args.grupo in ("micro", "todos"):
+        resultados.update(
+            executar_micro(args.tamanhos or TAMANHOS_MICRO, args.limite_escalar, args.repeticoes)
+        )
+    if args.grupo in ("app", "todos"):
+        resultados.update(executar_app(args.tamanhos or TAMANHOS_APP))
+    if args.grupo in ("partida", "todos"):
+        resultados.update(executar_partida(args.repeticoes))
+
+    ambiente_baseline, baseline = carregar_baseline(args.baseline)
+    linhas = comparar(resultados, baseline, args.tolerancia_tempo, args.tolerancia_memoria)
+    imprimir(linhas)
+    if ambiente_baseline and ambiente_baseline != ambiente():
+        # Tempos só são comparáveis na mesma máquina e com as mesmas versões
+        sys.stderr.write(
+            "Aviso: a linha de base foi gravada em outro ambiente: "
+            + json.dumps(ambiente_baseline, ensure_ascii=False)
+            + "\n"
+        )
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            json.dump({"ambiente": ambiente(), "resultados": resultados}, arquivo, ensure_ascii=False, indent=1)
+    if args.salvar_baseline:
+        salvar_baseline(resultados, args.baseline)
+        return 0
+
+    acima = conferir_orcamento(resultados)
+    for pagina, tempo, limite in acima:
+        sys.stdout.write(
+            f"ACIMA DO ORÇAMENTO: partida da página {pagina} em {tempo:.2f} s (orçamento {limite:.2f} s)\n"
+        )
+
+    # Código de saída 1 quando há regressões ou partida acima do orçamento,
+    # para uso em integração contínua
+    return int(any(linha[5] for linha in linhas) or bool(acima))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from frota import calcular_indicadores_frota
+from instrumentacao import registrar_cache
+
+# Cache em memória dos indicadores de cada caminhão. Não depende do Streamlit:
+# em main.py uma instância fica em st.session_state, mas o mesmo objeto pode ser
+# usado em scripts ou guardado com st.cache_resource.
+
+
+class CacheIndicadores:
+    """
+    Cache LRU de indicadores por caminhão, chaveado pelo conteúdo dos dados de
+    entrada de cada caminhão.
+
+    Quando os dados de um caminhão mudam, apenas esse caminhão é recalculado e a
+    entrada antiga dele é descartada; os demais são servidos do cache. Um
+    cache compartilhado por várias sessões deve manter as entradas antigas
+    (descartar_substituidos=False), que outras sessões continuam usando; o
+    LRU as descarta quando deixam de ser consultadas.
+    """
+
+    def __init__(self, tamanho_maximo=10_000, descartar_substituidos=True):
+        self.tamanho_maximo = tamanho_maximo
+        self.descartar_substituidos = descartar_substituidos
+        self.acertos = 0
+        self.falhas = 0
+        self.descartes = 0
+        self._entradas = OrderedDict()
+        self._chave_por_caminhao = {}
+        self._colunas = None
+        self._trava = threading.Lock()
+
+    def calcular(self, frota):
+        """
+        Calcula os indicadores da frota reaproveitando os caminhões em cache.
+
+        Args:
+          frota: Array estruturado com dtype DTYPE_FROTA (ver frota.criar_frota).
+
+        Returns:
+          Dicionário no mesmo formato de calcular_indicadores_frota.
+        """
+        with self._trava:
+            chaves = [registro.tobytes() for registro in frota]
+            linhas = [None] * len(chaves)
+            faltantes = []
+
+            for i, (caminhao, chave) in enumerate(zip(frota["caminhao"].tolist(), chaves)):
+                # Dados alterados: a entrada anterior deste caminhão fica obsoleta
+                if self.descartar_substituidos:
+                    anterior = self._chave_por_caminhao.get(caminhao)
+                    if anterior is not None and anterior != chave:
+                        self._entradas.pop(anterior, None)
+                    self._chave_por_caminhao[caminhao] = chave
+
+                linha = self._entradas.get(chave)
+                if linha is None:
+                    faltantes.append(i)
+                    self.falhas += 1
+                else:
+                    self._entradas.move_to_end(chave)
+                    linhas[i] = linha
+                    self.acertos += 1
+
+            if faltantes or self._colunas is None:
+                novos = _empacotar(calcular_indicadores_frota(frota[faltantes]))
+                self._colunas = novos[0]
+                for i, linha in zip(faltantes, novos[1]):
+                    linha = linha.copy()
+                    linhas[i] = linha
+                    self._entradas[chaves[i]] = linha
+
+            registrar_cache("Indicadores por caminhão", len(chaves), len(faltantes))
+            while len(self._entradas) > self.tamanho_maximo:
+                self._entradas.popitem(last=False)
+                self.descartes += 1
+
+            if linhas:
+                matriz = np.stack(linhas)
+            else:
+                matriz = np.empty((0, len(self._colunas)))
+            return _desempacotar(self._colunas, matriz)
+
+    def invalidar(self, caminhao=None):
+        """Descarta as entradas de um caminhão ou, sem argumento, de toda a frota."""
+        with self._trava:
+            if caminhao is None:
+                self._entradas.clear()
+                self._chave_por_caminhao.clear()
+                return
+            chave = self._chave_por_caminhao.pop(caminhao, None)
+            if chave is not None:
+                self._entradas.pop(chave, None)
+
+    def estatisticas(self):
+        """Retorna os contadores de acertos, falhas e descartes do cache."""
+        consultas = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "descartes": self.descartes,
+            "tamanho": len(self._entradas),
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+        }
+
+
+def _empacotar(indicadores):
+    """Converte o dicionário de indicadores em (nomes das colunas, matriz)."""
+    colunas = []
+    valores = []
+    for chave, valor in indicadores.items():
+        if chave == "tempo_perdido":
+            for operacao, tempos in valor.items():
+                colunas.append(("tempo_perdido", operacao))
+                valores.append(tempos)
+        else:
+            colunas.append((chave, None))
+            valores.append(valor)
+    return colunas, np.column_stack(valores)
+
+
+def _desempacotar(colunas, matriz):
+    """Operação inversa de _empacotar."""
+    indicadores = {"tempo_perdido": {}}
+    for j, (chave, operacao) in enumerate(colunas):
+        if operacao is None:
+            indicadores[chave] = matriz[:, j]
+        else:
+            indicadores[chave][operacao] = matriz[:, j]
+    # Mantém "tempo_perdido" como última chave, como em calcular_indicadores_frota
+    indicadores["tempo_perdido"] = indicadores.pop("tempo_perdido")
+    return indicadores
@@ -0,0 +1,279 @@
+import os
+import tomllib
+
+import numpy as np
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+ARQUIVO_CATALOGO = os.path.join(DIRETORIO, "paradas.toml")
+
+# Calendário fixo da planilha, o mesmo de calcular_df
+DIAS_PROGRAMADOS = 365
+HORAS_DIA = 24
+
+GRUPOS = ("manutencao", "perda")
+
+# Horas por ano de cada unidade de quantidade, por hora de duração da parada
+# (o percentual já é das horas programadas e ignora a duração)
+UNIDADES = {
+    "ano": 1,
+    "dia": DIAS_PROGRAMADOS,
+    "percentual": DIAS_PROGRAMADOS * HORAS_DIA / 100,
+}
+
+# Caminhões avaliados por produto de matrizes: o bloco das colunas da frota
+# convertidas para ponto flutuante cabe no cache e é reaproveitado
+CAMINHOES_POR_BLOCO = 4_096
+
+
+class ErroCatalogo(ValueError):
+    """Erro de validação do catálogo de paradas, com a lista de problemas encontrados."""
+
+    def __init__(self, erros):
+        self.erros = erros
+        super().__init__("; ".join(erros))
+
+
+def _normalizar(parada, posicao):
+    """
+    Valida uma parada do catálogo e calcula seu coeficiente (horas por ano por
+    unidade do campo) ou sua constante (horas por ano), conforme tenha campo.
+
+    Returns:
+      Tupla (parada normalizada, lista de erros).
+    """
+    nome = parada.get("nome") or f"parada {posicao}"
+    erros = []
+    normalizada = {
+        "nome": nome,
+        "grupo": parada.get("grupo"),
+        "campo": parada.get("campo"),
+        "horas": parada.get("horas", 1),
+        "unidade": parada.get("unidade", "ano"),
+        "quantidade": parada.get("quantidade"),
+        "intervalo": parada.get("intervalo"),
+        "padrao": parada.get("padrao", 0),
+    }
+
+    if normalizada["grupo"] not in GRUPOS:
+        erros.append(f"{nome}: grupo deve ser um de {', '.join(GRUPOS)}")
+    if normalizada["unidade"] not in UNIDADES:
+        erros.append(f"{nome}: unidade deve ser uma de {', '.join(UNIDADES)}")
+    if not isinstance(normalizada["horas"], (int, float)) or normalizada["horas"] < 0:
+        erros.append(f"{nome}: horas deve ser um número não negativo")
+    if (normalizada["campo"] is None) == (normalizada["quantidade"] is None):
+        erros.append(f"{nome}: informe campo ou quantidade (um dos dois)")
+    if normalizada["grupo"] == "manutencao" and (
+        normalizada["campo"] is None
+        or normalizada["unidade"] != "ano"
+        or not isinstance(normalizada["intervalo"], (int, float))
+        or normalizada["intervalo"] <= 0
+    ):
+        erros.append(f"{nome}: manutenções precisam de campo, unidade \"ano\" e intervalo positivo")
+    if erros:
+        return normalizada, erros
+
+    if normalizada["unidade"] == "percentual":
+        coeficiente = UNIDADES["percentual"]
+    else:
+        coeficiente = normalizada["horas"] * UNIDADES[normalizada["unidade"]]
+    if normalizada["campo"] is None:
+        normalizada["coeficiente"] = 0.0
+        normalizada["constante"] = normalizada["quantidade"] * coeficiente
+    else:
+        normalizada["coeficiente"] = coeficiente
+        normalizada["constante"] = 0.0
+    return normalizada, erros
+
+
+class CatalogoParadas:
+    """
+    Catálogo de paradas compilado em uma matriz de coeficientes.
+
+    Cada linha da matriz é um total de horas por ano e cada coluna um campo da
+    frota: a linha 0 é o tempo de manutenção (antes da taxa corretiva), a
+    linha 1 a soma das perdas (HNU) e as seguintes cada perda do catálogo.
+    Assim o tempo parado e as perdas de toda a frota saem de um único produto
+    da matriz pelas colunas da frota, e uma parada nova é só mais uma linha ou
+    coluna, sem outra passada pelos caminhões.
+    """
+
+    def __init__(self, paradas, campo_corretiva="taxa_corretiva"):
+        normalizadas = []
+        erros = []
+        for posicao, parada in enumerate(paradas, start=1):
+            normalizada, erros_parada = _normalizar(parada, posicao)
+            normalizadas.append(normalizada)
+            erros.extend(erros_parada)
+        nomes = [parada["nome"] for parada in normalizadas]
+        repetidos = sorted({nome for nome in nomes if nomes.count(nome) > 1})
+        if repetidos:
+            erros.append(f"Nomes repetidos: {', '.join(repetidos)}")
+        if erros:
+            raise ErroCatalogo(erros)
+
+        self.paradas = normalizadas
+        self.campo_corretiva = campo_corretiva
+        self.manutencoes = [p for p in normalizadas if p["grupo"] == "manutencao"]
+        self.perdas = [p for p in normalizadas if p["grupo"] == "perda"]
+        self.campos = tuple(dict.fromkeys(p["campo"] for p in normalizadas if p["campo"]))
+
+        linhas = [self.manutencoes, self.perdas] + [[perda] for perda in self.perdas]
+        colunas = {campo: j for j, campo in enumerate(self.campos)}
+        self.coeficientes = np.zeros((len(linhas), len(self.campos)))
+        self.constantes = np.zeros(len(linhas))
+        for linha, grupo in enumerate(linhas):
+            for parada in grupo:
+                if parada["campo"] is None:
+                    self.constantes[linha] += parada["constante"]
+                else:
+                    self.coeficientes[linha, colunas[parada["campo"]]] += parada["coeficiente"]
+
+        # Submatrizes usadas por avaliar e pelas avaliações parciais, só com os
+        # campos de coeficiente não nulo, que são os lidos da frota
+        self._submatrizes = {}
+        for nome, selecao in (
+            ("tudo", slice(None)),
+            ("tempo_parado", slice(0, 1)),
+            ("tempo_perdido", slice(2, None)),
+        ):
+            usados = np.flatnonzero(self.coeficientes[selecao].any(axis=0))
+            self._submatrizes[nome] = (
+                np.ascontiguousarray(self.coeficientes[selecao][:, usados]),
+                self.constantes[selecao, None],
+                [self.campos[j] for j in usados],
+            )
+
+        # Mesmas linhas em tuplas Python, para avaliar um caminhão sem o NumPy
+        self._termos = [
+            (
+                tuple(
+                    (campo, float(self.coeficientes[linha, j]))
+                    for j, campo in enumerate(self.campos)
+                    if self.coeficientes[linha, j]
+                ),
+                float(self.constantes[linha]),
+            )
+            for linha in range(len(linhas))
+        ]
+
+    def _produto(self, frota, submatriz):
+        """
+        Multiplica uma submatriz (ver __init__) pelas colunas da frota, em
+        blocos de CAMINHOES_POR_BLOCO caminhões.
+
+        Returns:
+          Tupla (array (linhas, *forma das colunas), fator corretivo 1 + taxa
+          ou None sem campo_corretiva).
+        """
+        coeficientes, constantes, campos = self._submatrizes[submatriz]
+        # Sem conversão aqui: cada bloco é convertido ao ser copiado
+        colunas = [np.asarray(frota[campo]) for campo in campos]
+        formas = {coluna.shape for coluna in colunas}
+        fator_corretiva = None
+        if self.campo_corretiva:
+            fator_corretiva = 1 + np.asarray(frota[self.campo_corretiva], dtype=np.float64)
+            formas.add(fator_corretiva.shape)
+        forma = formas.pop() if len(formas) == 1 else np.broadcast_shapes(*formas)
+        colunas = [
+            coluna.reshape(-1) if coluna.shape == forma else np.broadcast_to(coluna, forma).reshape(-1)
+            for coluna in colunas
+        ]
+        total = int(np.prod(forma))
+
+        resultado = np.empty((len(constantes), total))
+        bloco = np.empty((len(colunas), min(total, CAMINHOES_POR_BLOCO)))
+        for inicio in range(0, total, CAMINHOES_POR_BLOCO):
+            fim = min(inicio + CAMINHOES_POR_BLOCO, total)
+            for j, coluna in enumerate(colunas):
+                bloco[j, : fim - inicio] = coluna[inicio:fim]
+            np.matmul(coeficientes, bloco[:, : fim - inicio], out=resultado[:, inicio:fim])
+        resultado += constantes
+        return resultado.reshape((len(constantes),) + forma), fator_corretiva
+
+    def avaliar(self, frota):
+        """
+        Calcula o tempo parado e as perdas de toda a frota.
+
+        Args:
+          frota: Array estruturado, dicionário de arrays ou DataFrame com os
+            campos do catálogo. As colunas podem ter qualquer forma comum, por
+            exemplo (caminhões, simulações).
+
+        Returns:
+          Dicionário com "tempo_manutencao" (sem corretivas), "tempo_parado"
+          (com corretivas), "horas_nao_utilizadas" e "tempo_perdido" (nome da
+          perda -> horas), com arrays na forma das colunas.
+        """
+        resultado, fator_corretiva = self._produto(frota, "tudo")
+        tempo_manutencao = resultado[0]
+        return {
+            "tempo_manutencao": tempo_manutencao,
+            "tempo_parado": (
+                tempo_manutencao * fator_corretiva if fator_corretiva is not None else tempo_manutencao.copy()
+            ),
+            "horas_nao_utilizadas": resultado[1],
+            "tempo_perdido": {
+                perda["nome"]: resultado[2 + k] for k, perda in enumerate(self.perdas)
+            },
+        }
+
+    def avaliar_tempo_parado(self, frota):
+        """Só o tempo parado da frota (com corretivas), de "avaliar"."""
+        resultado, fator_corretiva = self._produto(frota, "tempo_parado")
+        tempo_parado = resultado[0]
+        if fator_corretiva is not None:
+            tempo_parado *= fator_corretiva
+        return tempo_parado
+
+    def avaliar_tempo_perdido(self, frota):
+        """Só o detalhamento das perdas da frota, de "avaliar"."""
+        resultado, _ = self._produto(frota, "tempo_perdido")
+        return {perda["nome"]: resultado[k] for k, perda in enumerate(self.perdas)}
+
+    def _linha(self, dados_caminhao, linha):
+        termos, constante = self._termos[linha]
+        total = constante
+        for campo, coeficiente in termos:
+            total += dados_caminhao[campo] * coeficiente
+        return total
+
+    def tempo_parado(self, dados_caminhao):
+        """Tempo parado de um caminhão (dicionário dados_caminhao), com corretivas."""
+        tempo = self._linha(dados_caminhao, 0)
+        if self.campo_corretiva:
+            tempo *= 1 + dados_caminhao[self.campo_corretiva]
+        return tempo
+
+    def tempo_perdido(self, dados_caminhao):
+        """Horas perdidas de um caminhão em cada perda do catálogo."""
+        return {
+            perda["nome"]: self._linha(dados_caminhao, 2 + k)
+            for k, perda in enumerate(self.perdas)
+        }
+
+
+def carregar_catalogo(caminho=None):
+    """
+    Lê e compila um catálogo de paradas.
+
+    Args:
+      caminho: Arquivo TOML no formato de paradas.toml. Padrão: a variável de
+        ambiente CATALOGO_PARADAS ou paradas.toml ao lado deste módulo.
+
+    Returns:
+      CatalogoParadas compilado.
+
+    Raises:
+      ErroCatalogo: Se alguma parada for inválida.
+    """
+    caminho = caminho or os.environ.get("CATALOGO_PARADAS") or ARQUIVO_CATALOGO
+    with open(caminho, "rb") as arquivo:
+        configuracao = tomllib.load(arquivo)
+    return CatalogoParadas(
+        configuracao.get("parada", []),
+        campo_corretiva=configuracao.get("campo_corretiva", "taxa_corretiva"),
+    )
+
+
+# Catálogo usado por padrão em calculos.py, frota.py e serie_temporal.py
+CATALOGO = carregar_catalogo()
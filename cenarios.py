@@ -0,0 +1,283 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+
+from frota import CAMPOS_CAMINHAO, DTYPE_FROTA
+
+CAMINHO_BANCO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cenarios.sqlite3")
+
+# Registro binário compacto de um caminhão: só os campos numéricos, sem os
+# textos de largura fixa do array da frota (nome e modelo ficam em colunas próprias)
+DTYPE_REGISTRO = np.dtype([(campo, tipo) for campo, tipo in CAMPOS_CAMINHAO.items()])
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cenarios (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE,
+    quantidade INTEGER NOT NULL,
+    campos TEXT NOT NULL,
+    atualizado_em TEXT NOT NULL,
+    revisao TEXT
+);
+CREATE TABLE IF NOT EXISTS caminhoes (
+    cenario_id INTEGER NOT NULL REFERENCES cenarios(id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    caminhao TEXT NOT NULL,
+    modelo TEXT NOT NULL,
+    dados BLOB NOT NULL,
+    PRIMARY KEY (cenario_id, posicao)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS caminhoes_por_nome ON caminhoes (cenario_id, caminhao);
+"""
+
+# Revisão dos cenários gravados antes da coluna revisao: a data de atualização
+# não basta (duas gravações no mesmo segundo), mas o id não se repete enquanto
+# a linha existir, e a próxima gravação do cenário já calcula o hash
+REVISAO = "COALESCE(revisao, id || ':' || atualizado_em)"
+
+
+def _dtype_registro(campos):
+    """Reconstrói o dtype do registro gravado a partir da lista JSON de campos."""
+    return np.dtype([(campo, tipo) for campo, tipo in json.loads(campos)])
+
+
+def _decodificar(linhas, campos):
+    """
+    Converte linhas (caminhao, modelo, dados) do banco em um array da frota.
+
+    Campos gravados que não existem mais em DTYPE_FROTA são ignorados e campos
+    novos ficam zerados, para que cenários antigos continuem abrindo.
+    """
+    dtype = _dtype_registro(campos)
+    frota = np.zeros(len(linhas), dtype=DTYPE_FROTA)
+    if not linhas:
+        return frota
+    nomes, modelos, blobs = zip(*linhas)
+    registros = np.frombuffer(b"".join(blobs), dtype=dtype)
+    frota["caminhao"] = nomes
+    frota["modelo"] = modelos
+    for campo in dtype.names:
+        if campo in CAMPOS_CAMINHAO:
+            frota[campo] = registros[campo]
+    return frota
+
+
+class ArmazemCenarios:
+    """
+    Cenários de frota nomeados, gravados em um banco SQLite local.
+
+    Cada caminhão é uma linha com o nome, o modelo e um registro binário
+    compacto (DTYPE_REGISTRO) com os campos numéricos. Assim um cenário pode
+    ser aberto inteiro, por faixa de posições ou caminhão a caminhão, e duas
+    versões podem ser comparadas no próprio banco.
+
+    Uma única instância pode ser compartilhada entre sessões (por exemplo com
+    st.cache_resource): cada operação abre a própria conexão, e o modo WAL
+    permite leituras simultâneas a uma gravação.
+    """
+
+    def __init__(self, caminho=CAMINHO_BANCO):
+        self.caminho = caminho
+        self._trava_gravacao = threading.Lock()
+        with self._conectar() as conexao:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.executescript(ESQUEMA)
+            colunas = [linha[1] for linha in conexao.execute("PRAGMA table_info(cenarios)")]
+            if "revisao" not in colunas:
+                conexao.execute("ALTER TABLE cenarios ADD COLUMN revisao TEXT")
+
+    @contextmanager
+    def _conectar(self):
+        with closing(sqlite3.connect(self.caminho, timeout=30)) as conexao:
+            conexao.execute("PRAGMA foreign_keys=ON")
+            with conexao:
+                yield conexao
+
+    def _cenario(self, conexao, nome, revisao=None):
+        linha = conexao.execute(
+            f"SELECT id, quantidade, campos, {REVISAO} FROM cenarios WHERE nome = ?", (nome,)
+        ).fetchone()
+        if linha is None:
+            raise KeyError(f"Cenário não encontrado: {nome}")
+        if revisao is not None and linha[3] != revisao:
+            raise KeyError(f"O cenário {nome} foi gravado de novo durante a leitura")
+        return linha[:3]
+
+    def salvar(self, nome, frota):
+        """
+        Grava a frota como o cenário 'nome', substituindo a versão anterior.
+
+        Args:
+          nome: Nome do cenário.
+          frota: Array estruturado da frota (ver frota.py).
+
+        Returns:
+          A revisão gravada: um hash do conteúdo, que identifica a versão do
+          cenário (ver revisao).
+        """
+        registros = np.zeros(len(frota), dtype=DTYPE_REGISTRO)
+        for campo in DTYPE_REGISTRO.names:
+            registros[campo] = frota[campo]
+        dados = registros.tobytes()
+        tamanho = DTYPE_REGISTRO.itemsize
+        campos = json.dumps(
+            [[campo, DTYPE_REGISTRO[campo].str] for campo in DTYPE_REGISTRO.names]
+        )
+        agora = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        nomes = frota["caminhao"].tolist()
+        modelos = frota["modelo"].tolist()
+
+        conteudo = hashlib.blake2b(digest_size=16)
+        for parte in (campos, "\0".join(nomes), "\0".join(modelos)):
+            conteudo.update(parte.encode())
+            conteudo.update(b"\1")
+        conteudo.update(dados)
+        revisao = conteudo.hexdigest()
+
+        with self._trava_gravacao, self._conectar() as conexao:
+            conexao.execute("DELETE FROM cenarios WHERE nome = ?", (nome,))
+            cenario_id = conexao.execute(
+                "INSERT INTO cenarios (nome, quantidade, campos, atualizado_em, revisao) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (nome, len(frota), campos, agora, revisao),
+            ).lastrowid
+            conexao.executemany(
+                "INSERT INTO caminhoes (cenario_id, posicao, caminhao, modelo, dados) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    (cenario_id, i, caminhao, modelo, dados[i * tamanho : (i + 1) * tamanho])
+                    for i, (caminhao, modelo) in enumerate(zip(nomes, modelos))
+                ),
+            )
+        return revisao
+
+    def revisao(self, nome):
+        """
+        Revisão atual do cenário. Muda a cada gravação com outro conteúdo,
+        mesmo no mesmo segundo; serve de chave para caches do cenário.
+
+        Raises:
+          KeyError: Se o cenário não existir.
+        """
+        with self._conectar() as conexao:
+            linha = conexao.execute(
+                f"SELECT {REVISAO} FROM cenarios WHERE nome = ?", (nome,)
+            ).fetchone()
+        if linha is None:
+            raise KeyError(f"Cenário não encontrado: {nome}")
+        return linha[0]
+
+    def listar(self):
+        """Retorna nome, quantidade de caminhões, data de atualização e revisão de cada cenário."""
+        with self._conectar() as conexao:
+            return [
+                {
+                    "nome": nome,
+                    "quantidade": quantidade,
+                    "atualizado_em": atualizado_em,
+                    "revisao": revisao,
+                }
+                for nome, quantidade, atualizado_em, revisao in conexao.execute(
+                    f"SELECT nome, quantidade, atualizado_em, {REVISAO} FROM cenarios ORDER BY nome"
+                )
+            ]
+
+    def excluir(self, nome):
+        with self._trava_gravacao, self._conectar() as conexao:
+            conexao.execute("DELETE FROM cenarios WHERE nome = ?", (nome,))
+
+    def carregar(self, nome, inicio=0, quantidade=None, revisao=None):
+        """
+        Abre um cenário inteiro ou apenas uma faixa de caminhões.
+
+        Args:
+          nome: Nome do cenário.
+          inicio: Posição do primeiro caminhão lido.
+          quantidade: Quantidade de caminhões lidos. Padrão: até o fim.
+          revisao: Revisão esperada (ver revisao); se o cenário tiver sido
+            gravado de novo, a leitura é recusada em vez de trazer outra versão.
+
+        Returns:
+          Array estruturado com dtype DTYPE_FROTA.
+
+        Raises:
+          KeyError: Se o cenário não existir ou não estiver na revisão esperada.
+        """
+        with self._conectar() as conexao:
+            cenario_id, total, campos = self._cenario(conexao, nome, revisao)
+            fim = total if quantidade is None else inicio + quantidade
+            linhas = conexao.execute(
+                "SELECT caminhao, modelo, dados FROM caminhoes "
+                "WHERE cenario_id = ? AND posicao >= ? AND posicao < ? ORDER BY posicao",
+                (cenario_id, inicio, fim),
+            ).fetchall()
+        return _decodificar(linhas, campos)
+
+    def carregar_caminhao(self, nome, caminhao):
+        """
+        Lê um único caminhão de um cenário pelo nome, sem abrir os demais.
+
+        Returns:
+          Registro da frota (DTYPE_FROTA) ou None se o caminhão não existir.
+        """
+        with self._conectar() as conexao:
+            cenario_id, _, campos = self._cenario(conexao, nome)
+            linhas = conexao.execute(
+                "SELECT caminhao, modelo, dados FROM caminhoes "
+                "WHERE cenario_id = ? AND caminhao = ? ORDER BY posicao LIMIT 1",
+                (cenario_id, caminhao),
+            ).fetchall()
+        return _decodificar(linhas, campos)[0] if linhas else None
+
+    def diferencas(self, nome_a, nome_b):
+        """
+        Compara dois cenários caminhão a caminhão, pelo nome do caminhão.
+
+        Os caminhões com registro binário idêntico são descartados no próprio
+        banco; só os diferentes são decodificados.
+
+        Returns:
+          Dicionário com "adicionados" (caminhões só em nome_b), "removidos"
+          (só em nome_a) e "alterados" (caminhão -> {campo: (valor em nome_a,
+          valor em nome_b)}).
+        """
+        with self._conectar() as conexao:
+            id_a, _, campos_a = self._cenario(conexao, nome_a)
+            id_b, _, campos_b = self._cenario(conexao, nome_b)
+            mesmo_formato = campos_a == campos_b
+            alterados = conexao.execute(
+                "SELECT a.caminhao, a.modelo, a.dados, b.caminhao, b.modelo, b.dados "
+                "FROM caminhoes a JOIN caminhoes b INDEXED BY caminhoes_por_nome "
+                "ON b.cenario_id = ? AND b.caminhao = a.caminhao "
+                "WHERE a.cenario_id = ? AND (? = 0 OR a.dados != b.dados OR a.modelo != b.modelo) "
+                "ORDER BY a.posicao",
+                (id_b, id_a, int(mesmo_formato)),
+            ).fetchall()
+            consulta_exclusivos = (
+                "SELECT caminhao FROM caminhoes x WHERE x.cenario_id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM caminhoes y WHERE y.cenario_id = ? AND y.caminhao = x.caminhao) "
+                "ORDER BY posicao"
+            )
+            removidos = [linha[0] for linha in conexao.execute(consulta_exclusivos, (id_a, id_b))]
+            adicionados = [linha[0] for linha in conexao.execute(consulta_exclusivos, (id_b, id_a))]
+
+        resultado = {"adicionados": adicionados, "removidos": removidos, "alterados": {}}
+        if not alterados:
+            return resultado
+        frota_a = _decodificar([linha[:3] for linha in alterados], campos_a)
+        frota_b = _decodificar([linha[3:] for linha in alterados], campos_b)
+        for registro_a, registro_b in zip(frota_a, frota_b):
+            mudancas = {
+                campo: (registro_a[campo].item(), registro_b[campo].item())
+                for campo in DTYPE_FROTA.names[1:]
+                if registro_a[campo] != registro_b[campo]
+            }
+            if mudancas:
+                resultado["alterados"][str(registro_a["caminhao"])] = mudancas
+        return resultado
@@ -0,0 +1,168 @@
+"""
+Execução em lote do dimensionamento, sem Streamlit.
+
+Exemplos:
+  python cli.py frota.csv
+  python cli.py frota.parquet --rotas rotas.csv --capacidade 240 --saida resultados.json
+  python cli.py frota.csv --formato csv --saida caminhoes.csv
+  python cli.py frota.csv --rotas rotas.csv --capacidade 240 --formato csv \
+      --saida caminhoes.csv --saida-rotas rotas_resultado.csv
+"""
+import argparse
+import csv
+import json
+import sys
+
+from agregados import AgregadosFrota
+from frota import calcular_indicadores_frota
+from importacao import (
+    COLUNAS_RESULTADOS,
+    ErroImportacao,
+    exportar_resultados_csv,
+    ler_frota,
+    ler_rotas_csv,
+)
+from calculos import calcular_capacidade_liquida
+from rotas import calcular_produtividade_rotas
+
+
+def calcular_lote(frota, segmentos=None, capacidade_liquida=0.0):
+    """
+    Calcula os indicadores da frota e, se informadas, a produtividade das rotas.
+
+    Args:
+      frota: Array estruturado da frota.
+      segmentos: Tabela de segmentos das rotas (ver rotas.py), opcional.
+      capacidade_liquida: Capacidade líquida do caminhão em toneladas.
+
+    Returns:
+      Dicionário serializável em JSON com as chaves "caminhoes", "frota",
+      "modelos" (resumo por modelo de caminhão) e "rotas".
+    """
+    indicadores = calcular_indicadores_frota(frota)
+    caminhoes = frota["caminhao"].tolist()
+    resultado = {
+        "caminhoes": [
+            {
+                "caminhao": caminhao,
+                "modelo": modelo,
+                **{coluna: float(indicadores[coluna][i]) for coluna in COLUNAS_RESULTADOS},
+            }
+            for i, (caminhao, modelo) in enumerate(zip(caminhoes, frota["modelo"].tolist()))
+        ],
+        "frota": {
+            "quantidade": len(caminhoes),
+            "df": float(indicadores["df"].mean()) if caminhoes else None,
+            "utilizacao": float(indicadores["utilizacao"].mean()) if caminhoes else None,
+            "horas_trabalhadas": float(indicadores["horas_trabalhadas"].sum()),
+        },
+        "modelos": {
+            modelo: {
+                "quantidade": resumo["quantidade"],
+                "df": resumo["media"]["df"],
+                "utilizacao": resumo["media"]["utilizacao"],
+                "horas_trabalhadas": resumo["soma"]["horas_trabalhadas"],
+            }
+            for modelo, resumo in AgregadosFrota(frota, indicadores).por_grupo().items()
+        },
+        "rotas": [],
+    }
+    if segmentos is not None:
+        rotas = calcular_produtividade_rotas(segmentos, capacidade_liquida)
+        resultado["rotas"] = [
+            {
+                "rota": rota,
+                "tempo_ciclo": float(rotas["tempo_ciclo"][i]),
+                "produtividade": float(rotas["produtividade"][i]),
+                "valida": bool(rotas["valida"][i]),
+            }
+            for i, rota in enumerate(rotas["rotas"].tolist())
+        ]
+    return resultado
+
+
+def _escrever_rotas_csv(rotas, destino):
+    escritor = csv.writer(destino, lineterminator="\n")
+    escritor.writerow(["rota", "tempo_ciclo", "produtividade", "valida"])
+    for rota in rotas:
+        escritor.writerow(
+            [
+                rota["rota"],
+                f"{rota['tempo_ciclo']:.6f}",
+                f"{rota['produtividade']:.6f}",
+                int(rota["valida"]),
+            ]
+        )
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description="Calcula DF, utilização e produtividade de uma frota sem abrir o dashboard."
+    )
+    parser.add_argument("frota", help="Arquivo CSV ou Parquet com os dados dos caminhões.")
+    parser.add_argument("--rotas", help="Arquivo CSV com os segmentos das rotas.")
+    parser.add_argument(
+        "--capacidade", type=float, help="Capacidade do caminhão (toneladas), exigida com --rotas."
+    )
+    parser.add_argument(
+        "--fator-enchimento", type=float, default=100.0, help="Fator de enchimento (%%)."
+    )
+    parser.add_argument("--formato", choices=["json", "csv"], default="json")
+    parser.add_argument("--saida", help="Arquivo de saída (padrão: saída padrão).")
+    parser.add_argument(
+        "--saida-rotas",
+        help=(
+            "Arquivo CSV dos resultados das rotas; exigido com --formato csv e --rotas, "
+            "e só com eles."
+        ),
+    )
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.rotas and args.capacidade is None:
+        parser.error("--capacidade é obrigatória quando --rotas é informado")
+    # Duas tabelas CSV na mesma saída não seriam um CSV válido
+    if args.formato == "csv" and args.rotas and not args.saida_rotas:
+        parser.error("--saida-rotas é obrigatória com --formato csv e --rotas")
+    # Em JSON as rotas vão no mesmo documento; o arquivo não seria gravado
+    if args.saida_rotas and (args.formato != "csv" or not args.rotas):
+        parser.error("--saida-rotas só é usada com --formato csv e --rotas")
+    capacidade_liquida = calcular_capacidade_liquida(
+        args.capacidade or 0.0, args.fator_enchimento
+    )
+
+    try:
+        frota = ler_frota(args.frota)
+        rotas = ler_rotas_csv(args.rotas) if args.rotas else None
+    except (ErroImportacao, ValueError, OSError) as erro:
+        erros = getattr(erro, "erros", [str(erro)])
+        json.dump({"erros": erros}, sys.stderr, ensure_ascii=False)
+        sys.stderr.write("\n")
+        return 2
+
+    if args.formato == "csv":
+        if args.saida:
+            exportar_resultados_csv(frota, args.saida)
+        else:
+            exportar_resultados_csv(frota, sys.stdout.buffer)
+        if rotas is not None:
+            resultado_rotas = calcular_lote(frota[:0], rotas, capacidade_liquida)["rotas"]
+            with open(args.saida_rotas, "w", encoding="utf-8", newline="") as destino:
+                _escrever_rotas_csv(resultado_rotas, destino)
+        return 0
+
+    resultado = calcular_lote(frota, rotas, capacidade_liquida)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as destino:
+            json.dump(resultado, destino, ensure_ascii=False)
+    else:
+        json.dump(resultado, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+import streamlit as st
+
+from frota import PARADAS_EXTRAS, TAMANHO_NOME
+
+TAMANHOS_PAGINA = (25, 50, 100, 250)
+
+# Colunas da grade: campo da frota -> configuração da coluna. A taxa corretiva é
+# exibida em porcentagem, como no formulário do caminhão selecionado.
+COLUNAS_EDITOR = {
+    "caminhao": st.column_config.TextColumn("Caminhão", disabled=True),
+    "modelo": st.column_config.TextColumn("Modelo", max_chars=TAMANHO_NOME),
+    "qtd_250h": st.column_config.NumberColumn("Preventiva 250h", min_value=0, step=1),
+    "qtd_500h": st.column_config.NumberColumn("Preventiva 500h", min_value=0, step=1),
+    "qtd_1000h": st.column_config.NumberColumn("Preventiva 1000h", min_value=0, step=1),
+    "qtd_16000h": st.column_config.NumberColumn("Preventiva 16000h", min_value=0, step=1),
+    "taxa_corretiva": st.column_config.NumberColumn(
+        "Taxa Corretiva (%)", min_value=0, max_value=100, step=1
+    ),
+    "qtd_sem_operador": st.column_config.NumberColumn("Sem Operador", min_value=0, step=1),
+    "qtd_parada_desmonte": st.column_config.NumberColumn("Parada Desmonte", min_value=0, step=1),
+    "qtd_parada_climatica": st.column_config.NumberColumn("Parada Climática", min_value=0, step=1),
+    "qtd_almoco": st.column_config.NumberColumn("Almoço", min_value=0, step=1),
+    "qtd_troca_turno": st.column_config.NumberColumn("Troca de Turno", min_value=0, step=1),
+    "perc_absenteismo": st.column_config.NumberColumn(
+        "Absenteísmo (%)", min_value=0.0, max_value=100.0, step=0.1, format="%.1f"
+    ),
+    "perc_treinamento": st.column_config.NumberColumn(
+        "Treinamento (%)", min_value=0.0, max_value=100.0, step=0.1, format="%.1f"
+    ),
+}
+# Paradas acrescentadas no catálogo (paradas.toml)
+for _parada in PARADAS_EXTRAS:
+    COLUNAS_EDITOR[_parada["campo"]] = st.column_config.NumberColumn(_parada["nome"], min_value=0)
+
+# Indicadores exibidos ao lado dos dados, somente leitura
+COLUNAS_INDICADORES = {
+    "df": st.column_config.NumberColumn("DF (%)", format="%.2f", disabled=True),
+    "utilizacao": st.column_config.NumberColumn("Utilização (%)", format="%.2f", disabled=True),
+}
+
+
+def _aplicar_edicoes(inicio, chave, ao_alterar):
+    """
+    Grava na frota da sessão apenas as células alteradas na página e chama
+    ao_alterar.
+
+    A grade é recriada em seguida com uma nova chave, para que as edições já
+    gravadas não sejam reaplicadas sobre alterações feitas em outro lugar
+    (por exemplo no formulário do caminhão selecionado).
+    """
+    frota = st.session_state.frota
+    for linha, valores in st.session_state[chave]["edited_rows"].items():
+        posicao = inicio + int(linha)
+        for campo, valor in valores.items():
+            if valor is None or campo not in COLUNAS_EDITOR:
+                continue
+            if campo == "taxa_corretiva":
+                valor = valor / 100
+            elif campo == "modelo":
+                valor = valor.strip()
+            frota.alterar(posicao, campo, valor)
+
+    st.session_state.versao_editor_frota += 1
+    if ao_alterar is not None:
+        ao_alterar()
+
+
+def editor_frota(frota, num_caminhoes, indicadores=None, ao_alterar=None):
+    """
+    Exibe uma grade editável com uma página de caminhões da frota.
+
+    Só os caminhões da página são montados, convertidos em tabela e enviados
+    ao navegador, então o custo de cada execução depende do tamanho da página
+    e não da frota.
+
+    Args:
+      frota: FrotaSessao da sessão (st.session_state.frota).
+      num_caminhoes: Quantidade de caminhões em uso.
+      indicadores: Resultado de calcular_indicadores_frota dos caminhões em
+        uso, para exibir DF e utilização ao lado dos dados.
+      ao_alterar: Função sem argumentos chamada no callback da grade depois
+        de gravar as alterações (por exemplo para reexecutar os fragmentos).
+    """
+    import pandas as pd
+
+    if "versao_editor_frota" not in st.session_state:
+        st.session_state.versao_editor_frota = 0
+
+    col_tamanho, col_pagina = st.columns(2)
+    tamanho = col_tamanho.selectbox("Caminhões por página", TAMANHOS_PAGINA, key="tamanho_pagina_frota")
+    n_paginas = max(-(-num_caminhoes // tamanho), 1)
+    # A frota pode ter diminuído desde a última escolha de página
+    if st.session_state.get("pagina_frota", 1) > n_paginas:
+        st.session_state.pagina_frota = n_paginas
+    pagina = col_pagina.number_input("Página", min_value=1, max_value=n_paginas, step=1, key="pagina_frota")
+
+    inicio = (pagina - 1) * tamanho
+    fim = min(inicio + tamanho, num_caminhoes)
+    pagina_frota = frota.materializar(inicio, fim)
+    dados = {campo: pagina_frota[campo] for campo in COLUNAS_EDITOR}
+    dados["taxa_corretiva"] = (dados["taxa_corretiva"] * 100).round()
+    colunas = dict(COLUNAS_EDITOR)
+    if indicadores is not None and len(indicadores["df"]) >= fim:
+        for indicador, coluna in COLUNAS_INDICADORES.items():
+            dados[indicador] = indicadores[indicador][inicio:fim]
+            colunas[indicador] = coluna
+
+    chave = f"editor_frota_{st.session_state.versao_editor_frota}"
+    st.data_editor(
+        pd.DataFrame(dados),
+        key=chave,
+        on_change=_aplicar_edicoes,
+        args=(inicio, chave, ao_alterar),
+        column_config=colunas,
+        hide_index=True,
+        num_rows="fixed",
+        width="stretch",
+    )
+    st.caption(f"Caminhões {inicio + 1}–{fim} de {num_caminhoes}")
@@ -0,0 +1,276 @@
+import sys
+
+import numpy as np
+
+from catalogo_paradas import CATALOGO
+from instrumentacao import medido
+
+# Campos numéricos de dados_caminhao, na mesma convenção usada em calculos.py
+CAMPOS_CAMINHAO = {
+    "qtd_250h": np.int64,
+    "qtd_500h": np.int64,
+    "qtd_1000h": np.int64,
+    "qtd_16000h": np.int64,
+    "taxa_corretiva": np.float64,
+    "qtd_sem_operador": np.int64,
+    "qtd_parada_desmonte": np.int64,
+    "qtd_parada_climatica": np.int64,
+    "qtd_almoco": np.int64,
+    "qtd_troca_turno": np.int64,
+    "perc_absenteismo": np.float64,
+    "perc_treinamento": np.float64,
+}
+
+# Paradas acrescentadas no catálogo (paradas.toml) com um campo novo na frota
+PARADAS_EXTRAS = [
+    parada for parada in CATALOGO.paradas
+    if parada["campo"] is not None and parada["campo"] not in CAMPOS_CAMINHAO
+]
+for _parada in PARADAS_EXTRAS:
+    CAMPOS_CAMINHAO.setdefault(_parada["campo"], np.float64)
+
+# Caracteres do nome e do modelo do caminhão. Os textos do array da frota têm
+# largura fixa: um texto mais longo seria truncado, por isso é recusado
+TAMANHO_NOME = 32
+
+# "modelo" agrupa os caminhões nos resumos da frota; vazio quando não informado
+DTYPE_FROTA = np.dtype(
+    [("caminhao", f"U{TAMANHO_NOME}"), ("modelo", f"U{TAMANHO_NOME}")]
+    + [(campo, tipo) for campo, tipo in CAMPOS_CAMINHAO.items()]
+)
+
+# Valores padrão de um caminhão novo na frota
+DADOS_PADRAO_CAMINHAO = {
+    "qtd_250h": 35,
+    "qtd_500h": 18,
+    "qtd_1000h": 9,
+    "qtd_16000h": 0,
+    "taxa_corretiva": 0.25,
+    "qtd_sem_operador": 0,
+    "qtd_parada_desmonte": 0,
+    "qtd_parada_climatica": 0,
+    "qtd_almoco": 0,
+    "qtd_troca_turno": 0,
+    "perc_absenteismo": 0.0,
+    "perc_treinamento": 0.0,
+}
+for _parada in PARADAS_EXTRAS:
+    DADOS_PADRAO_CAMINHAO.setdefault(_parada["campo"], _parada["padrao"])
+
+
+def textos_longos(textos, tamanho=TAMANHO_NOME):
+    """
+    Indica os textos com mais de tamanho caracteres, que não cabem no nome ou
+    no modelo do array da frota.
+
+    Returns:
+      Array booleano, um valor por texto.
+    """
+    textos = np.asarray(textos, dtype=str)
+    if textos.dtype.itemsize // np.dtype("U1").itemsize <= tamanho:
+        return np.zeros(textos.shape, dtype=bool)
+    return np.char.str_len(textos) > tamanho
+
+
+def criar_frota(dados_caminhoes):
+    """
+    Converte uma lista de dicionários dados_caminhao em um array estruturado.
+
+    Args:
+      dados_caminhoes: Lista de dicionários no formato usado em main.py.
+
+    Returns:
+      Array estruturado NumPy com dtype DTYPE_FROTA, um registro por caminhão.
+
+    Raises:
+      ValueError: Se um nome ou modelo tiver mais de TAMANHO_NOME caracteres.
+    """
+    frota = np.zeros(len(dados_caminhoes), dtype=DTYPE_FROTA)
+    for campo in DTYPE_FROTA.names:
+        padrao = "" if DTYPE_FROTA[campo].kind == "U" else 0
+        valores = [dados.get(campo, padrao) for dados in dados_caminhoes]
+        if DTYPE_FROTA[campo].kind == "U" and textos_longos(valores).any():
+            raise ValueError(
+                f"O campo {campo} aceita no máximo {TAMANHO_NOME} caracteres."
+            )
+        frota[campo] = valores
+    return frota
+
+
+def completar_frota(frota, num_caminhoes):
+    """
+    Garante que a frota tenha pelo menos num_caminhoes caminhões, acrescentando
+    caminhões com DADOS_PADRAO_CAMINHAO nomeados na sequência CM-001, CM-002...
+
+    Returns:
+      A própria frota, se já for grande o suficiente, ou uma nova frota ampliada.
+    """
+    if len(frota) >= num_caminhoes:
+        return frota
+    return np.concatenate([frota, gerar_caminhoes_padrao(len(frota), num_caminhoes)])
+
+
+def gerar_caminhoes_padrao(inicio, fim):
+    """
+    Caminhões com DADOS_PADRAO_CAMINHAO das posições inicio a fim - 1, com os
+    nomes da sequência de completar_frota (CM-001 na posição 0).
+    """
+    novos = np.zeros(fim - inicio, dtype=DTYPE_FROTA)
+    novos["caminhao"] = [f"CM-{i+1:03}" for i in range(inicio, fim)]
+    for campo, valor in DADOS_PADRAO_CAMINHAO.items():
+        novos[campo] = valor
+    return novos
+
+
+def frota_para_dicionarios(frota):
+    """Converte um array estruturado da frota de volta em lista de dicionários."""
+    return [
+        {campo: registro[campo].item() for campo in DTYPE_FROTA.names}
+        for registro in frota
+    ]
+
+
+def calcular_tempo_parado_frota(frota, catalogo=None):
+    """Versão vetorizada de calcular_tempo_parado para toda a frota."""
+    return (catalogo or CATALOGO).avaliar_tempo_parado(frota)
+
+
+def calcular_df_frota(tempo_total_parado):
+    """Versão vetorizada de calcular_df."""
+    horas_programadas_ano = 365 * 24
+    return (
+        (horas_programadas_ano - np.asarray(tempo_total_parado))
+        / horas_programadas_ano
+    ) * 100
+
+
+def calcular_tempo_perdido_frota(frota, catalogo=None):
+    """
+    Versão vetorizada de calcular_tempo_perdido.
+
+    Returns:
+      Dicionário com as mesmas chaves de calcular_tempo_perdido, cada uma com
+      um array de horas perdidas por caminhão.
+    """
+    return (catalogo or CATALOGO).avaliar_tempo_perdido(frota)
+
+
+@medido("calcular_indicadores_frota")
+def calcular_indicadores_frota(frota, catalogo=None):
+    """
+    Calcula DF, utilização, HNU, horas trabalhadas e horas disponíveis de toda a
+    frota em uma única passada vetorizada.
+
+    Produz os mesmos valores que calcular_tempo_parado, calcular_df e
+    calcular_utilizacao aplicados caminhão a caminhão (a menos de
+    arredondamento). O tempo parado e as perdas saem de uma única avaliação do
+    catálogo de paradas.
+
+    Args:
+      frota: Array estruturado (DTYPE_FROTA) ou tabela colunar (dicionário de
+        arrays, DataFrame) com as colunas de CAMPOS_CAMINHAO. As colunas podem
+        ter qualquer forma comum, por exemplo (caminhões, simulações).
+      catalogo: CatalogoParadas a usar. Padrão: o de paradas.toml.
+
+    Returns:
+      Dicionário de arrays com as chaves "tempo_parado", "df", "utilizacao",
+      "horas_nao_utilizadas", "horas_trabalhadas" e "horas_disponiveis", além
+      de "tempo_perdido" com as horas de cada perda do catálogo.
+    """
+    dias_programados = 365
+    horas_programadas_dia = 24
+
+    paradas = (catalogo or CATALOGO).avaliar(frota)
+    tempo_total_parado = paradas["tempo_parado"]
+    df = calcular_df_frota(tempo_total_parado)
+    horas_disponiveis = dias_programados * horas_programadas_dia * (df / 100)
+    horas_nao_utilizadas = paradas["horas_nao_utilizadas"]
+
+    horas_trabalhadas = horas_disponiveis - horas_nao_utilizadas
+
+    utilizacao = np.zeros_like(horas_disponiveis)
+    np.divide(
+        horas_trabalhadas, horas_disponiveis, out=utilizacao, where=horas_disponiveis != 0
+    )
+    utilizacao *= 100
+
+    return {
+        "tempo_parado": tempo_total_parado,
+        "df": df,
+        "utilizacao": utilizacao,
+        "horas_nao_utilizadas": horas_nao_utilizadas,
+        "horas_trabalhadas": horas_trabalhadas,
+        "horas_disponiveis": horas_disponiveis,
+        "tempo_perdido": paradas["tempo_perdido"],
+    }
+
+
+def indicadores_caminhao(indicadores, i):
+    """
+    Indicadores da posição i de um resultado de calcular_indicadores_frota
+    como valores escalares, com "tempo_perdido" por operação.
+    """
+    resultado = {
+        chave: valores[i].item() for chave, valores in indicadores.items() if chave != "tempo_perdido"
+    }
+    resultado["tempo_perdido"] = {
+        operacao: tempos[i].item() for operacao, tempos in indicadores["tempo_perdido"].items()
+    }
+    return resultado
+
+
+class ResultadosFrota:
+    """
+    Indicadores da frota calculados uma única vez por execução do script e
+    indexados pelo identificador do caminhão.
+
+    Compartilhado entre a barra lateral, os gráficos e o resumo de main.py para
+    que o custo de renderização seja linear no tamanho da frota. Aceita o array
+    estruturado da frota ou uma lista de dicionários dados_caminhao e,
+    opcionalmente, um CacheIndicadores para reaproveitar os caminhões não
+    alterados.
+    """
+
+    def __init__(self, frota, cache=None):
+        if not isinstance(frota, np.ndarray):
+            frota = criar_frota(frota)
+        self.frota = frota
+        self.caminhoes = self.frota["caminhao"].tolist()
+        if cache is None:
+            self.indicadores = calcular_indicadores_frota(self.frota)
+        else:
+            # Recalcula apenas os caminhões cujos dados mudaram desde a última execução
+            self.indicadores = cache.calcular(self.frota)
+        self._indices = {caminhao: i for i, caminhao in enumerate(self.caminhoes)}
+
+    def __len__(self):
+        return len(self.caminhoes)
+
+    def __contains__(self, caminhao):
+        return caminhao in self._indices
+
+    def posicao(self, caminhao):
+        """Posição do caminhão na frota, ou None."""
+        return self._indices.get(caminhao)
+
+    def __getitem__(self, caminhao):
+        """Retorna os indicadores de um caminhão como valores escalares."""
+        return indicadores_caminhao(self.indicadores, self._indices[caminhao])
+
+    @property
+    def dfs(self):
+        return self.indicadores["df"]
+
+    @property
+    def utilizacoes(self):
+        return self.indicadores["utilizacao"]
+
+    def memoria(self):
+        """Bytes aproximados dos indicadores, dos nomes e da frota, se não for uma visão."""
+        indicadores = dict(self.indicadores)
+        arrays = list(indicadores.pop("tempo_perdido").values()) + list(indicadores.values())
+        total = sum(valores.nbytes for valores in arrays)
+        if self.frota.base is None:
+            total += self.frota.nbytes
+        total += sys.getsizeof(self.caminhoes) + sum(map(sys.getsizeof, self.caminhoes))
+        return total + sys.getsizeof(self._indices)
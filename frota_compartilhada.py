@@ -0,0 +1,556 @@
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+from agregados import INDICADORES_AGREGADOS, AgregadosAlterados, AgregadosFrota
+from frota import (
+    DTYPE_FROTA,
+    ResultadosFrota,
+    calcular_indicadores_frota,
+    completar_frota,
+    gerar_caminhoes_padrao,
+    indicadores_caminhao,
+)
+
+# Dados de frota compartilhados entre as sessões. Não depende do Streamlit: em
+# main.py as bases e os derivados delas ficam em st.cache_resource e cada
+# sessão guarda apenas a sua FrotaSessao (as alterações que fez) e os seus
+# DerivadosSessao (os indicadores dos caminhões alterados).
+
+_trava_padrao = threading.Lock()
+_padrao = np.zeros(0, dtype=DTYPE_FROTA)
+
+
+def caminhoes_padrao(fim, inicio=0):
+    """
+    Caminhões padrão das posições inicio a fim - 1 (CM-001, CM-002...), como
+    os de completar_frota.
+
+    A partir da posição 0 (a frota padrão, sem base) vêm de um array único no
+    processo e somente leitura, que cresce dobrando de tamanho quando uma
+    sessão pede mais caminhões. Depois do fim de uma base (inicio > 0) só a
+    faixa pedida é gerada, se o array do processo não a tiver.
+    """
+    global _padrao
+    with _trava_padrao:
+        if inicio > 0 and len(_padrao) < fim:
+            return gerar_caminhoes_padrao(inicio, fim)
+        if len(_padrao) < fim:
+            novo = completar_frota(np.zeros(0, dtype=DTYPE_FROTA), max(fim, 2 * len(_padrao)))
+            novo.flags.writeable = False
+            _padrao = novo
+        return _padrao[inicio:fim]
+
+
+class FrotaBase:
+    """
+    Frota somente leitura compartilhada por todas as sessões que a abriram
+    (o mesmo cenário, o mesmo arquivo importado ou a frota padrão).
+
+    Args:
+      frota: Array estruturado (DTYPE_FROTA). Passa a pertencer à base e é
+        marcado como somente leitura.
+      chave: Identificação da origem, por exemplo "cenario:nome:revisão".
+    """
+
+    def __init__(self, frota, chave):
+        self.frota = frota
+        self.frota.flags.writeable = False
+        self.chave = chave
+
+    def __len__(self):
+        return len(self.frota)
+
+    def materializar(self, inicio, fim):
+        """
+        Caminhões das posições inicio a fim - 1: os da base, seguidos dos
+        caminhões padrão depois do fim dela.
+
+        Returns:
+          Visão somente leitura quando a faixa está toda na base ou toda depois
+          dela; senão uma cópia.
+        """
+        n_base = len(self.frota)
+        if fim <= n_base:
+            return self.frota[inicio:fim]
+        if inicio >= n_base:
+            return caminhoes_padrao(fim, inicio)
+        frota = np.empty(fim - inicio, dtype=DTYPE_FROTA)
+        frota[: n_base - inicio] = self.frota[inicio:]
+        frota[n_base - inicio :] = caminhoes_padrao(fim, n_base)
+        return frota
+
+
+class FrotaSessao:
+    """
+    Frota vista por uma sessão: a FrotaBase compartilhada, seguida dos
+    caminhões padrão acrescentados pela quantidade de caminhões, com as
+    alterações da sessão por cima (cópia na escrita).
+
+    A sessão só guarda os registros que alterou; as leituras montam na hora
+    as faixas pedidas. Sem alterações na faixa, materializar() devolve uma
+    visão da base sem copiar nada.
+    """
+
+    def __init__(self, base, tamanho=0):
+        self.base = base
+        self.tamanho = max(len(base), tamanho)
+        # Incrementada a cada alteração; identifica os derivados calculados
+        self.versao = 0
+        self._posicoes = {}
+        # Versão da última alteração de cada caminhão alterado
+        self._versoes = {}
+        self._registros = np.zeros(0, dtype=DTYPE_FROTA)
+
+    def __len__(self):
+        return self.tamanho
+
+    def completar(self, n):
+        """Garante pelo menos n caminhões, acrescentando caminhões padrão."""
+        self.tamanho = max(self.tamanho, n)
+
+    def alterada(self, fim=None):
+        """True se a sessão alterou algum caminhão antes da posição fim."""
+        fim = self.tamanho if fim is None else fim
+        return any(posicao < fim for posicao in self._posicoes)
+
+    def _original(self, i):
+        if i < len(self.base):
+            return self.base.frota[i]
+        return caminhoes_padrao(i + 1, i)[0]
+
+    def registro(self, i):
+        """Registro do caminhão i (somente leitura) com as alterações da sessão."""
+        linha = self._posicoes.get(i)
+        if linha is None:
+            return self._original(i)
+        return self._registros[linha]
+
+    def alterar(self, i, campo, valor):
+        """Grava um campo do caminhão i, copiando o registro na primeira alteração."""
+        linha = self._posicoes.get(i)
+        if linha is None:
+            linha = len(self._posicoes)
+            if linha == len(self._registros):
+                # Cresce dobrando, como uma lista
+                registros = np.zeros(max(2 * linha, 4), dtype=DTYPE_FROTA)
+                registros[:linha] = self._registros
+                self._registros = registros
+            self._registros[linha] = self._original(i)
+            self._posicoes[i] = linha
+        self._registros[campo][linha] = valor
+        self.versao += 1
+        self._versoes[i] = self.versao
+
+    def alteracoes_desde(self, versao, fim=None):
+        """
+        Caminhões alterados depois da versão informada, antes da posição fim.
+
+        Returns:
+          Tupla (posições em ordem crescente, cópia dos registros desses
+          caminhões com as alterações).
+        """
+        fim = self.tamanho if fim is None else fim
+        posicoes = sorted(
+            posicao
+            for posicao, alterada_em in self._versoes.items()
+            if alterada_em > versao and posicao < fim
+        )
+        linhas = [self._posicoes[posicao] for posicao in posicoes]
+        return np.array(posicoes, dtype=np.intp), self._registros[linhas]
+
+    def materializar(self, inicio=0, fim=None):
+        """
+        Monta a frota das posições inicio a fim - 1 como array estruturado.
+
+        Returns:
+          Visão somente leitura da base ou dos caminhões padrão quando não há
+          alterações na faixa; senão uma cópia com as alterações aplicadas.
+        """
+        fim = self.tamanho if fim is None else min(fim, self.tamanho)
+        inicio = min(inicio, fim)
+        alteradas = [
+            (posicao, linha) for posicao, linha in self._posicoes.items() if inicio <= posicao < fim
+        ]
+        frota = self.base.materializar(inicio, fim)
+        if alteradas:
+            if not frota.flags.writeable:
+                frota = frota.copy()
+            posicoes, linhas = zip(*alteradas)
+            frota[np.array(posicoes) - inicio] = self._registros[list(linhas)]
+        return frota
+
+    def memoria(self):
+        """
+        Returns:
+          Dicionário com "alterados" (caminhões) e "bytes" guardados pela sessão.
+        """
+        return {
+            "alterados": len(self._posicoes),
+            "bytes": (
+                self._registros.nbytes
+                + sys.getsizeof(self._posicoes)
+                + sys.getsizeof(self._versoes)
+                + sys.getsizeof(self)
+            ),
+        }
+
+
+class DerivadosFrota:
+    """
+    ResultadosFrota e AgregadosFrota dos n primeiros caminhões de uma frota
+    base, sem alterações. Compartilhados pelas sessões dessa base: as que não
+    alteraram a frota os usam diretamente, e as que alteraram os leem por
+    baixo dos seus DerivadosSessao. Não são modificados depois de calculados.
+    """
+
+    def __init__(self):
+        self.origem = None
+        self.resultados = ResultadosFrota([])
+        self.agregados = AgregadosFrota()
+        self.invalidos = False
+        self._trava = threading.Lock()
+
+    def atualizar(self, base, n, cache=None):
+        """
+        Calcula os derivados se a base ou a quantidade de caminhões mudaram.
+
+        Args:
+          base: FrotaBase.
+          n: Quantidade de caminhões em uso.
+          cache: CacheIndicadores compartilhado, opcional.
+
+        Returns:
+          O próprio objeto.
+        """
+        origem = (base.chave, n)
+        with self._trava:
+            if origem != self.origem:
+                try:
+                    self.resultados = ResultadosFrota(base.materializar(0, n), cache=cache)
+                    self.invalidos = False
+                except ValueError:
+                    self.resultados = ResultadosFrota([])
+                    self.invalidos = True
+                self.agregados = AgregadosFrota()
+                self.agregados.sincronizar(
+                    self.resultados.frota, self.resultados.indicadores, copiar=False
+                )
+                self.origem = origem
+        return self
+
+    def memoria(self):
+        """Bytes aproximados dos resultados e dos agregados guardados."""
+        return self.resultados.memoria() + self.agregados.memoria()
+
+
+def _mapear(funcao, *indicadores):
+    """
+    Aplica funcao às colunas correspondentes de resultados de
+    calcular_indicadores_frota, inclusive às de "tempo_perdido".
+    """
+    return {
+        chave: (
+            _mapear(funcao, *(dados[chave] for dados in indicadores))
+            if isinstance(valores, dict)
+            else funcao(*(dados[chave] for dados in indicadores))
+        )
+        for chave, valores in indicadores[0].items()
+    }
+
+
+class DerivadosSessao:
+    """
+    Derivados de uma frota de sessão com alterações, por cima dos
+    DerivadosFrota compartilhados da base, que só são lidos.
+
+    A sessão guarda apenas os indicadores dos caminhões alterados, em ordem de
+    posição, e os AgregadosAlterados, que corrigem os agregados da base pela
+    diferença de cada caminhão alterado: a memória cresce com as alterações,
+    não com a frota. A cada versão da frota só os caminhões alterados desde a
+    anterior são recalculados. Mudar a base, a quantidade de caminhões ou os
+    derivados compartilhados (descartados do cache e recriados) recalcula os
+    alterados todos, sem recalcular a frota.
+    """
+
+    def __init__(self):
+        self.origem = None
+        self.versao = 0
+        self.compartilhados = None
+        self.agregados = AgregadosFrota()
+        self.invalidos = False
+        self._posicoes = np.zeros(0, dtype=np.intp)
+        self._indicadores = None
+        self._frota = None
+        self._n = 0
+        self._trava = threading.Lock()
+
+    def atualizar(self, frota, n, compartilhados, cache=None):
+        """
+        Recalcula os caminhões alterados desde a última atualização.
+
+        Args:
+          frota: FrotaSessao.
+          n: Quantidade de caminhões em uso.
+          compartilhados: DerivadosFrota da base da frota com n caminhões, já
+            atualizados.
+          cache: CacheIndicadores compartilhado, opcional.
+
+        Returns:
+          O próprio objeto.
+        """
+        origem = (frota.base.chave, n)
+        with self._trava:
+            if (
+                origem != self.origem
+                or compartilhados is not self.compartilhados
+                or frota is not self._frota
+                or self.invalidos
+            ):
+                self.origem = origem
+                self.versao = 0
+                self.compartilhados = compartilhados
+                self.invalidos = compartilhados.invalidos
+                self._frota = frota
+                self._n = n
+                self._posicoes = np.zeros(0, dtype=np.intp)
+                self._indicadores = None
+                if self.invalidos:
+                    self.agregados = AgregadosFrota()
+                    return self
+                self.agregados = AgregadosAlterados(
+                    compartilhados.agregados, compartilhados.resultados.indicadores
+                )
+            posicoes, registros = frota.alteracoes_desde(self.versao, n)
+            if len(posicoes):
+                try:
+                    if cache is None:
+                        indicadores = calcular_indicadores_frota(registros)
+                    else:
+                        indicadores = cache.calcular(registros)
+                except ValueError:
+                    self.agregados = AgregadosFrota()
+                    self.invalidos = True
+                    return self
+                self._guardar(posicoes, indicadores)
+                colunas = [indicadores[indicador].tolist() for indicador in INDICADORES_AGREGADOS]
+                for i, grupo, valores in zip(
+                    posicoes.tolist(), registros["modelo"].tolist(), zip(*colunas)
+                ):
+                    self.agregados.atualizar(i, grupo, dict(zip(INDICADORES_AGREGADOS, valores)))
+            self.versao = frota.versao
+        return self
+
+    def _guardar(self, posicoes, indicadores):
+        """Grava os indicadores das posições, acrescentando as ainda não guardadas."""
+        novas = posicoes[~np.isin(posicoes, self._posicoes)]
+        if self._indicadores is None:
+            self._indicadores = _mapear(lambda valores: valores[:0].copy(), indicadores)
+        if len(novas):
+            onde = np.searchsorted(self._posicoes, novas)
+            self._posicoes = np.insert(self._posicoes, onde, novas)
+            self._indicadores = _mapear(
+                lambda guardados: np.insert(guardados, onde, 0.0), self._indicadores
+            )
+        linhas = np.searchsorted(self._posicoes, posicoes)
+
+        def gravar(guardados, valores):
+            guardados[linhas] = valores
+            return guardados
+
+        self._indicadores = _mapear(gravar, self._indicadores, indicadores)
+
+    @property
+    def resultados(self):
+        """
+        ResultadosAlterados da versão atualizada, criados a cada leitura: as
+        colunas completas só são montadas quando usadas e não ficam guardadas
+        na sessão.
+        """
+        if self.invalidos:
+            return ResultadosFrota([])
+        return ResultadosAlterados(
+            self._frota, self._n, self.compartilhados.resultados, self._posicoes, self._indicadores
+        )
+
+    def memoria(self):
+        """Bytes aproximados dos indicadores dos caminhões alterados e dos agregados."""
+        total = self._posicoes.nbytes + self.agregados.memoria()
+        if self._indicadores is not None:
+            indicadores = dict(self._indicadores)
+            arrays = list(indicadores.pop("tempo_perdido").values()) + list(indicadores.values())
+            total += sum(valores.nbytes for valores in arrays)
+        return total
+
+
+class ResultadosAlterados:
+    """
+    Indicadores de uma frota de sessão com a interface de ResultadosFrota: os
+    da base compartilhada, com os dos caminhões alterados por cima.
+
+    Os nomes, a frota e as colunas completas são montados na primeira leitura
+    de cada um, como cópias; o objeto é criado a cada execução e descartado
+    com ela (ver DerivadosSessao.resultados).
+
+    Args:
+      frota: FrotaSessao.
+      n: Quantidade de caminhões em uso.
+      base: ResultadosFrota compartilhado da base com n caminhões.
+      posicoes: Posições dos caminhões alterados, em ordem crescente.
+      indicadores: Indicadores dos caminhões alterados, na ordem de posicoes.
+    """
+
+    def __init__(self, frota, n, base, posicoes, indicadores):
+        self._frota_sessao = frota
+        self._n = n
+        self.base = base
+        self.posicoes = posicoes
+        self.alterados = indicadores
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.base)
+
+    def _montado(self, nome, montar):
+        if nome not in self._cache:
+            self._cache[nome] = montar()
+        return self._cache[nome]
+
+    def _coluna(self, valores_base, valores_alterados):
+        coluna = valores_base.copy()
+        coluna[self.posicoes] = valores_alterados
+        return coluna
+
+    @property
+    def frota(self):
+        return self._montado("frota", lambda: self._frota_sessao.materializar(0, self._n))
+
+    @property
+    def indicadores(self):
+        return self._montado(
+            "indicadores",
+            lambda: _mapear(self._coluna, self.base.indicadores, self.alterados),
+        )
+
+    @property
+    def dfs(self):
+        return self.indicadores["df"]
+
+    @property
+    def utilizacoes(self):
+        return self.indicadores["utilizacao"]
+
+    def _nomes_alterados(self):
+        """Nome de cada caminhão alterado, pela posição."""
+        return self._montado(
+            "nomes_alterados",
+            lambda: {
+                i: str(self._frota_sessao.registro(i)["caminhao"]) for i in self.posicoes.tolist()
+            },
+        )
+
+    @property
+    def caminhoes(self):
+        def montar():
+            caminhoes = list(self.base.caminhoes)
+            for i, caminhao in self._nomes_alterados().items():
+                caminhoes[i] = caminhao
+            return caminhoes
+
+        return self._montado("caminhoes", montar)
+
+    def _posicao(self, caminhao):
+        """Posição do caminhão pelo nome, ou None."""
+        nomes = self._nomes_alterados()
+        for i, nome in nomes.items():
+            if nome == caminhao:
+                return i
+        i = self.base.posicao(caminhao)
+        # O caminhão da base pode ter sido renomeado pela sessão
+        return None if i is None or i in nomes else i
+
+    def __contains__(self, caminhao):
+        return self._posicao(caminhao) is not None
+
+    def __getitem__(self, caminhao):
+        """Retorna os indicadores de um caminhão como valores escalares."""
+        i = self._posicao(caminhao)
+        if i is None:
+            raise KeyError(caminhao)
+        j = np.searchsorted(self.posicoes, i)
+        if j < len(self.posicoes) and self.posicoes[j] == i:
+            return indicadores_caminhao(self.alterados, j)
+        return indicadores_caminhao(self.base.indicadores, i)
+
+
+class RegistroMemoria:
+    """
+    Referências fracas às frotas das sessões, às bases e aos derivados em uso,
+    para o relatório de memória. Não mantém nada vivo: uma sessão encerrada ou
+    um derivado descartado do cache somem do relatório.
+    """
+
+    def __init__(self):
+        self._sessoes = weakref.WeakValueDictionary()
+        self._derivados_sessoes = weakref.WeakValueDictionary()
+        self._derivados = weakref.WeakValueDictionary()
+        self._trava = threading.Lock()
+
+    def registrar_sessao(self, id_sessao, frota, derivados=None):
+        """Registra a frota da sessão e, se houver, os derivados próprios dela."""
+        with self._trava:
+            self._sessoes[id_sessao] = frota
+            if derivados is None:
+                self._derivados_sessoes.pop(id_sessao, None)
+            else:
+                self._derivados_sessoes[id_sessao] = derivados
+
+    def registrar_derivados(self, chave, derivados):
+        with self._trava:
+            self._derivados[chave] = derivados
+
+    def relatorio(self):
+        """
+        Returns:
+          Tupla (sessões, compartilhados): listas de dicionários com a memória
+          própria de cada sessão (alterações e derivados próprios, somados em
+          "bytes") e a dos dados compartilhados (bases e derivados das frotas
+          sem alterações), em bytes.
+        """
+        with self._trava:
+            sessoes = list(self._sessoes.items())
+            derivados_sessoes = dict(self._derivados_sessoes.items())
+            derivados = list(self._derivados.items())
+
+        linhas_sessoes = []
+        bases = {}
+        for id_sessao, frota in sessoes:
+            memoria = frota.memoria()
+            proprios = derivados_sessoes.get(id_sessao)
+            bytes_derivados = proprios.memoria() if proprios is not None else 0
+            linhas_sessoes.append(
+                {
+                    "sessao": id_sessao,
+                    "base": frota.base.chave,
+                    "caminhoes": len(frota),
+                    "alterados": memoria["alterados"],
+                    "derivados": bytes_derivados,
+                    "bytes": memoria["bytes"] + bytes_derivados,
+                }
+            )
+            bases[frota.base.chave] = frota.base
+
+        compartilhados = [
+            {"dados": f"Base {chave}", "bytes": base.frota.nbytes} for chave, base in bases.items()
+        ]
+        compartilhados.append({"dados": "Caminhões padrão", "bytes": _padrao.nbytes})
+        for (chave_base, n), derivados_frota in derivados:
+            compartilhados.append(
+                {
+                    "dados": f"Derivados {chave_base}, {n} caminhões",
+                    "bytes": derivados_frota.memoria(),
+                }
+            )
+        return linhas_sessoes, compartilhados
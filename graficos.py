@@ -1,14 +1,105 @@
+import io
+
 import streamlit as st
-import matplotlib.pyplot as plt
 import numpy as np
 
-def gerar_grafico(caminhoes, dfs_caminhoes):
-    """Gera um gráfico de barras com a DF de cada caminhão."""
-    fig, ax = plt.subplots(
-        figsize=(2, 1), facecolor=st.get_option("theme.backgroundColor")
-    )
-    cores = plt.cm.viridis(np.linspace(0, 1, len(caminhoes)))
-    ax.bar(caminhoes, dfs_caminhoes, color=cores)
+from instrumentacao import etapa, medido, registrar_cache
+
+# Acima desta quantidade de barras os caminhões são agrupados em faixas
+LIMITE_BARRAS = 60
+
+# Largura máxima das imagens em pixels. Acima de 1460 px o st.image reduz e
+# recodifica o PNG a cada execução; abaixo dele os bytes em cache são enviados direto
+LARGURA_MAXIMA_PNG = 1400
+DPI_GRAFICOS = 200
+
+# Backends de renderização: imagem gerada no servidor ou gráfico desenhado no navegador
+BACKENDS_GRAFICOS = {
+    "Matplotlib": "matplotlib",
+    "Vega-Lite (navegador)": "vega",
+}
+
+
+def agregar_barras(caminhoes, *series, limite=LIMITE_BARRAS):
+    """
+    Agrupa caminhões consecutivos em faixas quando há barras demais para ler.
+
+    Args:
+      caminhoes: Nomes dos caminhões, na ordem da frota.
+      *series: Valores por caminhão (DF, utilização...).
+      limite: Quantidade máxima de barras.
+
+    Returns:
+      Tupla (rótulos, séries, tamanho da faixa). Sem agrupamento, os rótulos e
+      as séries são os originais e o tamanho da faixa é 1; com agrupamento,
+      cada barra é a média de uma faixa "primeiro–último" de caminhões.
+    """
+    caminhoes = list(caminhoes)
+    series = [np.asarray(serie, dtype=np.float64) for serie in series]
+    n = len(caminhoes)
+    if n <= limite:
+        return caminhoes, series, 1
+
+    tamanho = -(-n // limite)
+    inicios = np.arange(0, n, tamanho)
+    fins = np.minimum(inicios + tamanho, n)
+    contagens = fins - inicios
+    rotulos = [f"{caminhoes[i]}–{caminhoes[f - 1]}" for i, f in zip(inicios, fins)]
+    medias = [np.add.reduceat(serie, inicios) / contagens for serie in series]
+    return rotulos, medias, tamanho
+
+
+def _figura(**kwargs):
+    """
+    Cria uma figura do Matplotlib sem o pyplot. O Matplotlib só é importado no
+    primeiro gráfico rasterizado, e não na partida do app; sem o pyplot, a
+    figura não entra no registro global de figuras e é liberada com a última
+    referência.
+    """
+    from matplotlib.figure import Figure
+
+    return Figure(**kwargs)
+
+
+def _para_png(fig):
+    """Rasteriza a figura em PNG."""
+    arquivo = io.BytesIO()
+    dpi = min(DPI_GRAFICOS, LARGURA_MAXIMA_PNG / fig.get_figwidth())
+    fig.savefig(arquivo, format="png", dpi=dpi, bbox_inches="tight", facecolor=fig.get_facecolor())
+    return arquivo.getvalue()
+
+
+def aquecer_graficos():
+    """
+    Importa o Matplotlib e rasteriza os dois gráficos com dados de exemplo,
+    carregando as fontes, os glifos e o renderizador antes do primeiro
+    gráfico de uma sessão (ver partida.py).
+    """
+    rotulos = [f"CM-{i:03d}" for i in range(1, 9)]
+    valores = np.linspace(80, 95, len(rotulos))
+    _desenhar_grafico_df(rotulos, valores, "#0e1117")
+    _desenhar_grafico_df_utilizacao(rotulos, valores, valores)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _png_grafico_df(rotulos, dfs, cor_fundo):
+    registrar_cache("Gráficos PNG", falhas=1)
+    return _desenhar_grafico_df(rotulos, dfs, cor_fundo)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def _png_grafico_df_utilizacao(rotulos, dfs, utilizacoes):
+    registrar_cache("Gráficos PNG", falhas=1)
+    return _desenhar_grafico_df_utilizacao(rotulos, dfs, utilizacoes)
+
+
+def _desenhar_grafico_df(rotulos, dfs, cor_fundo):
+    from matplotlib import colormaps
+
+    fig = _figura(figsize=(2, 1), facecolor=cor_fundo)
+    ax = fig.subplots()
+    cores = colormaps["viridis"](np.linspace(0, 1, len(rotulos)))
+    ax.bar(rotulos, dfs, color=cores)
     ax.set_ylabel("Disponibilidade Física (%)", fontsize=5, color="white")
     ax.set_title(
         "Comparativo de Disponibilidade da Frota",
@@ -18,24 +109,160 @@ def gerar_grafico(caminhoes, dfs_caminhoes):
     ax.set_ylim(0, 100)
     ax.tick_params(axis="x", colors="black", rotation=45, labelsize=5)
     ax.tick_params(axis="y", colors="black", labelsize=5)
-    st.pyplot(fig)
+    return _para_png(fig)
+
+
+def _desenhar_grafico_df_utilizacao(rotulos, dfs, utilizacoes):
+    fig = _figura(figsize=(10, 4))
+    ax = fig.subplots()
+    bar_width = 0.35
+    index = np.arange(len(rotulos))
+
+    ax.bar(index, dfs, bar_width, label="DF", color="skyblue")
+    ax.bar(index + bar_width, utilizacoes, bar_width, label="Utilização", color="lightcoral")
+
+    ax.set_xlabel("Caminhões", fontsize=12)
+    ax.set_ylabel("Percentual (%)", fontsize=12)
+    ax.set_title("Comparativo DF x Utilização", fontsize=14)
+    ax.set_xticks(index + bar_width / 2)
+    ax.set_xticklabels(rotulos, rotation=45)
+    ax.legend()
+    return _para_png(fig)
+
 
-def gerar_grafico_df_utilizacao(caminhoes, dfs, utilizacoes):
-  """Gera um gráfico de barras comparando a DF com a Utilização."""
+def _legenda_agregacao(tamanho):
+    if tamanho > 1:
+        st.caption(f"Cada barra é a média de uma faixa de até {tamanho} caminhões.")
 
-  fig, ax = plt.subplots(figsize=(10, 4))
-  bar_width = 0.35
-  index = np.arange(len(caminhoes))
 
-  barras_df = ax.bar(index, dfs, bar_width, label="DF", color='skyblue')
-  barras_utilizacao = ax.bar(index + bar_width, utilizacoes, bar_width, label="Utilização", color='lightcoral')
+@medido("gerar_grafico")
+def gerar_grafico(caminhoes, dfs_caminhoes, backend="matplotlib"):
+    """
+    Gera um gráfico de barras com a DF de cada caminhão.
 
-  ax.set_xlabel("Caminhões", fontsize=12)
-  ax.set_ylabel("Percentual (%)", fontsize=12)
-  ax.set_title("Comparativo DF x Utilização", fontsize=14)
-  ax.set_xticks(index + bar_width / 2)
-  ax.set_xticklabels(caminhoes)
-  ax.legend()
+    Com o backend "matplotlib" a imagem é rasterizada uma vez para cada
+    conjunto de dados e reaproveitada nas execuções seguintes; com "vega" só
+    os valores e a especificação Vega-Lite (montada sem o Altair, ver
+    gerar_grafico_linhas) são enviados e o gráfico é desenhado no navegador.
+    """
+    rotulos, (dfs,), tamanho = agregar_barras(caminhoes, dfs_caminhoes)
+    if backend == "vega":
+        import pandas as pd
 
-  plt.xticks(rotation=45)
-  st.pyplot(fig)
+        dados = pd.DataFrame({"Caminhão": rotulos, "DF (%)": dfs})
+        especificacao = {
+            "title": "Comparativo de Disponibilidade da Frota",
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "Caminhão", "type": "nominal", "sort": None},
+                "y": {
+                    "field": "DF (%)",
+                    "type": "quantitative",
+                    "scale": {"domain": [0, 100]},
+                    "title": "Disponibilidade Física (%)",
+                },
+                "color": {
+                    "field": "Caminhão",
+                    "type": "nominal",
+                    "sort": None,
+                    "scale": {"scheme": "viridis"},
+                    "legend": None,
+                },
+                "tooltip": [
+                    {"field": "Caminhão", "type": "nominal"},
+                    {"field": "DF (%)", "type": "quantitative", "format": ".2f"},
+                ],
+            },
+        }
+        st.vega_lite_chart(dados, especificacao, width="stretch")
+    else:
+        cor_fundo = st.get_option("theme.backgroundColor")
+        registrar_cache("Gráficos PNG", consultas=1)
+        with etapa("Matplotlib (PNG)"):
+            png = _png_grafico_df(tuple(rotulos), dfs, cor_fundo)
+        st.image(png, width="stretch")
+    _legenda_agregacao(tamanho)
+
+
+@medido("gerar_grafico_df_utilizacao")
+def gerar_grafico_df_utilizacao(caminhoes, dfs, utilizacoes, backend="matplotlib"):
+    """Gera um gráfico de barras comparando a DF com a Utilização."""
+    rotulos, (dfs, utilizacoes), tamanho = agregar_barras(caminhoes, dfs, utilizacoes)
+    if backend == "vega":
+        import pandas as pd
+
+        dados = pd.DataFrame(
+            {
+                "Caminhão": np.tile(rotulos, 2),
+                "Indicador": np.repeat(["DF", "Utilização"], len(rotulos)),
+                "Percentual (%)": np.concatenate([dfs, utilizacoes]),
+            }
+        )
+        especificacao = {
+            "title": "Comparativo DF x Utilização",
+            "mark": "bar",
+            "encoding": {
+                "x": {"field": "Caminhão", "type": "nominal", "sort": None, "title": "Caminhões"},
+                "xOffset": {"field": "Indicador", "type": "nominal"},
+                "y": {"field": "Percentual (%)", "type": "quantitative"},
+                "color": {
+                    "field": "Indicador",
+                    "type": "nominal",
+                    "scale": {"domain": ["DF", "Utilização"], "range": ["skyblue", "lightcoral"]},
+                },
+                "tooltip": [
+                    {"field": "Caminhão", "type": "nominal"},
+                    {"field": "Indicador", "type": "nominal"},
+                    {"field": "Percentual (%)", "type": "quantitative", "format": ".2f"},
+                ],
+            },
+        }
+        st.vega_lite_chart(dados, especificacao, width="stretch")
+    else:
+        registrar_cache("Gráficos PNG", consultas=1)
+        with etapa("Matplotlib (PNG)"):
+            png = _png_grafico_df_utilizacao(tuple(rotulos), dfs, utilizacoes)
+        st.image(png, width="stretch")
+    _legenda_agregacao(tamanho)
+
+
+@medido("gerar_grafico_linhas")
+def gerar_grafico_linhas(series, rotulo_x, rotulo_y="Percentual (%)"):
+    """
+    Gera um gráfico de linhas, uma por série, sobre os períodos 1, 2, 3...
+
+    A especificação Vega-Lite é montada diretamente, sem o Altair: st.line_chart
+    valida o gráfico inteiro contra o esquema do Vega-Lite a cada execução, o
+    que custa dezenas de milissegundos mesmo com poucos pontos.
+
+    Args:
+      series: Dicionário nome da série -> valores por período.
+      rotulo_x: Título do eixo x (por exemplo "Mês").
+      rotulo_y: Título do eixo y.
+    """
+    import pandas as pd
+
+    nomes = list(series)
+    valores = [np.asarray(series[nome], dtype=np.float64) for nome in nomes]
+    n = len(valores[0]) if valores else 0
+    dados = pd.DataFrame(
+        {
+            rotulo_x: np.tile(np.arange(1, n + 1), len(nomes)),
+            "Série": np.repeat(nomes, n),
+            rotulo_y: np.concatenate(valores) if valores else [],
+        }
+    )
+    especificacao = {
+        "mark": {"type": "line", "tooltip": True},
+        "encoding": {
+            "x": {"field": rotulo_x, "type": "quantitative", "axis": {"tickMinStep": 1}},
+            "y": {"field": rotulo_y, "type": "quantitative"},
+            "color": {
+                "field": "Série",
+                "type": "nominal",
+                "sort": nomes,
+                "legend": {"orient": "bottom", "title": None},
+            },
+        },
+    }
+    st.vega_lite_chart(dados, especificacao, width="stretch")
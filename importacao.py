@@ -0,0 +1,562 @@
+import csv
+import io
+import os
+from itertools import islice
+
+import numpy as np
+
+from frota import CAMPOS_CAMINHAO, DTYPE_FROTA, TAMANHO_NOME, calcular_indicadores_frota, textos_longos
+from rotas import DTYPE_SEGMENTO, TAMANHO_ROTA, criar_segmentos
+
+# Colunas que precisam estar presentes no arquivo; as demais paradas assumem zero
+COLUNAS_OBRIGATORIAS = ["qtd_250h", "qtd_500h", "qtd_1000h", "qtd_16000h", "taxa_corretiva"]
+
+# Colunas de indicadores exportadas junto com os dados da frota
+COLUNAS_RESULTADOS = [
+    "df",
+    "utilizacao",
+    "horas_nao_utilizadas",
+    "horas_trabalhadas",
+    "horas_disponiveis",
+    "tempo_parado",
+]
+
+# Colunas obrigatórias do arquivo de segmentos de rotas
+COLUNAS_ROTAS = ["rota", "distancia", "velocidade_carregado", "velocidade_vazio"]
+
+LINHAS_POR_BLOCO = 8_192
+
+
+class ErroImportacao(ValueError):
+    """Erro de validação de um arquivo de frota, com a lista de problemas encontrados."""
+
+    def __init__(self, erros):
+        self.erros = erros
+        super().__init__("; ".join(erros))
+
+
+def _linhas(mascara, linha_inicial):
+    """
+    As primeiras linhas do arquivo marcadas na máscara, para as mensagens.
+
+    Args:
+      mascara: Array booleano, um valor por linha de dados.
+      linha_inicial: Número no arquivo da primeira linha de dados ou, quando
+        há linhas em branco no meio, array com o número de cada uma.
+    """
+    indices = np.flatnonzero(mascara)[:5]
+    if np.ndim(linha_inicial):
+        numeros = np.asarray(linha_inicial)[indices]
+    else:
+        numeros = indices + linha_inicial
+    return ", ".join(str(i) for i in numeros)
+
+
+def _validar(colunas, linha_inicial):
+    """
+    Valida um bloco de colunas numéricas de forma vetorizada.
+
+    Returns:
+      Lista de mensagens de erro, vazia se o bloco for válido.
+    """
+    erros = []
+    for campo, valores in colunas.items():
+        invalidos = ~np.isfinite(valores) | (valores < 0)
+        if campo.startswith("qtd_"):
+            invalidos |= valores != np.round(valores)
+        elif campo == "taxa_corretiva":
+            invalidos |= valores > 1
+        else:
+            invalidos |= valores > 100
+        if invalidos.any():
+            erros.append(
+                f"Coluna {campo}: valores inválidos nas linhas {_linhas(invalidos, linha_inicial)}"
+            )
+    return erros
+
+
+def _validar_textos(nomes, modelos, linha_inicial):
+    """
+    Valida os nomes e os modelos de um bloco: textos mais longos que
+    TAMANHO_NOME seriam truncados no array da frota.
+
+    Returns:
+      Lista de mensagens de erro, vazia se o bloco for válido.
+    """
+    erros = []
+    for campo, textos in (("caminhao", nomes), ("modelo", modelos)):
+        if textos is None:
+            continue
+        longos = textos_longos(textos)
+        if longos.any():
+            erros.append(
+                f"Coluna {campo}: textos com mais de {TAMANHO_NOME} caracteres "
+                f"nas linhas {_linhas(longos, linha_inicial)}"
+            )
+    return erros
+
+
+def _validar_repetidos(nomes, linha_inicial):
+    """
+    Procura caminhões com o mesmo nome no arquivo inteiro.
+
+    Returns:
+      Lista com uma mensagem de erro, vazia se os nomes forem únicos.
+    """
+    nomes = list(nomes)
+    if len(set(nomes)) == len(nomes):
+        return []
+    if np.ndim(linha_inicial):
+        numeros = np.asarray(linha_inicial).tolist()
+    else:
+        numeros = range(linha_inicial, linha_inicial + len(nomes))
+    linhas = {}
+    for nome, numero in zip(nomes, numeros):
+        linhas.setdefault(nome, []).append(numero)
+    repetidos = [
+        f"{nome} (linhas {', '.join(str(linha) for linha in linhas_nome[:5])})"
+        for nome, linhas_nome in linhas.items()
+        if len(linhas_nome) > 1
+    ]
+    return [f"Coluna caminhao: nomes repetidos: {'; '.join(repetidos[:5])}"]
+
+
+def _preencher(frota, inicio, nomes, colunas, modelos=None):
+    """Copia um bloco validado para a frota pré-alocada."""
+    fim = inicio + len(nomes)
+    frota["caminhao"][inicio:fim] = nomes
+    if modelos is not None:
+        frota["modelo"][inicio:fim] = modelos
+    for campo, valores in colunas.items():
+        frota[campo][inicio:fim] = valores
+    return fim
+
+
+def _nomes_padrao(inicio, quantidade):
+    return [f"CM-{i+1:03}" for i in range(inicio, inicio + quantidade)]
+
+
+def _contar_linhas(arquivo):
+    """Conta as linhas de um arquivo binário posicionável, sem carregá-lo inteiro."""
+    posicao = arquivo.tell()
+    total = 0
+    ultimo = b"\n"
+    for bloco in iter(lambda: arquivo.read(1 << 20), b""):
+        total += bloco.count(b"\n")
+        ultimo = bloco[-1:]
+    if ultimo != b"\n":
+        total += 1
+    arquivo.seek(posicao)
+    return total
+
+
+def ler_frota_csv(arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Lê a frota de um arquivo CSV no esquema de dados_caminhao.
+
+    O arquivo é lido em blocos e cada bloco é convertido e validado por coluna
+    diretamente no array estruturado da frota, sem criar um dicionário por linha.
+
+    Args:
+      arquivo: Caminho ou arquivo binário aberto (por exemplo, o retorno de
+        st.file_uploader).
+      linhas_por_bloco: Quantidade de linhas convertidas por vez.
+
+    Returns:
+      Array estruturado com dtype DTYPE_FROTA.
+
+    Raises:
+      ErroImportacao: Se faltarem colunas obrigatórias, houver valores
+        inválidos, nomes ou modelos longos demais ou nomes repetidos.
+    """
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "rb") as binario:
+            return ler_frota_csv(binario, linhas_por_bloco)
+
+    # Pré-aloca a frota quando o tamanho é conhecido para não duplicar a memória
+    frota = None
+    if arquivo.seekable():
+        frota = np.zeros(max(_contar_linhas(arquivo) - 1, 0), dtype=DTYPE_FROTA)
+
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        cabecalho = [coluna.strip() for coluna in next(csv.reader([texto.readline()]))]
+        faltantes = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cabecalho]
+        if faltantes:
+            raise ErroImportacao([f"Colunas obrigatórias ausentes: {', '.join(faltantes)}"])
+
+        campos = [campo for campo in CAMPOS_CAMINHAO if campo in cabecalho]
+        tem_nome = "caminhao" in cabecalho
+        usecols = [cabecalho.index(campo) for campo in campos]
+        tipos = [(campo, np.float64) for campo in campos]
+        # Um caractere a mais que o array da frota, para reconhecer os textos longos
+        tipo_texto = f"U{TAMANHO_NOME + 1}"
+        if tem_nome:
+            usecols.append(cabecalho.index("caminhao"))
+            tipos.append(("caminhao", tipo_texto))
+        tem_modelo = "modelo" in cabecalho
+        if tem_modelo:
+            usecols.append(cabecalho.index("modelo"))
+            tipos.append(("modelo", tipo_texto))
+
+        blocos = []
+        total = 0
+        erros = []
+        # Número no arquivo de cada linha de dados, contando as linhas em
+        # branco, que são puladas, para as mensagens
+        numeros_blocos = []
+        proxima = 2
+        while True:
+            lidas = list(islice(texto, linhas_por_bloco))
+            if not lidas:
+                break
+            numeros = np.array(
+                [proxima + k for k, linha in enumerate(lidas) if linha.strip()], dtype=np.intp
+            )
+            linhas = [linha for linha in lidas if linha.strip()]
+            proxima += len(lidas)
+            if not linhas:
+                continue
+            numeros_blocos.append(numeros)
+            try:
+                dados = np.loadtxt(
+                    linhas,
+                    delimiter=",",
+                    quotechar='"',
+                    usecols=usecols,
+                    dtype=tipos,
+                    ndmin=1,
+                )
+            except ValueError as erro:
+                raise ErroImportacao([f"Bloco a partir da linha {numeros[0]}: {erro}"]) from erro
+
+            colunas = {campo: dados[campo] for campo in campos}
+            nomes = dados["caminhao"] if tem_nome else _nomes_padrao(total, len(dados))
+            modelos = dados["modelo"] if tem_modelo else None
+            erros.extend(_validar(colunas, linha_inicial=numeros))
+            erros.extend(_validar_textos(dados["caminhao"] if tem_nome else None, modelos, numeros))
+
+            if frota is None:
+                bloco = np.zeros(len(dados), dtype=DTYPE_FROTA)
+                _preencher(bloco, 0, nomes, colunas, modelos)
+                blocos.append(bloco)
+                total += len(dados)
+            else:
+                total = _preencher(frota, total, nomes, colunas, modelos)
+    finally:
+        texto.detach()
+
+    if frota is None:
+        frota = np.concatenate(blocos) if blocos else np.zeros(0, dtype=DTYPE_FROTA)
+    frota = frota[:total]
+    if tem_nome:
+        numeros = np.concatenate(numeros_blocos) if numeros_blocos else 2
+        erros.extend(_validar_repetidos(frota["caminhao"].tolist(), linha_inicial=numeros))
+    if erros:
+        raise ErroImportacao(erros)
+    return frota
+
+
+def ler_frota_parquet(arquivo, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Lê a frota de um arquivo Parquet no esquema de dados_caminhao.
+
+    Os grupos de linhas são lidos em lotes colunares diretamente para o array
+    estruturado da frota. Requer o pacote pyarrow.
+
+    Args:
+      arquivo: Caminho ou arquivo binário aberto.
+      linhas_por_bloco: Quantidade de linhas por lote lido.
+
+    Returns:
+      Array estruturado com dtype DTYPE_FROTA.
+
+    Raises:
+      ErroImportacao: Se faltarem colunas obrigatórias, houver valores
+        inválidos, nomes ou modelos longos demais ou nomes repetidos.
+    """
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as erro:
+        raise ImportError("A leitura de arquivos Parquet requer o pacote pyarrow.") from erro
+
+    parquet = pq.ParquetFile(arquivo)
+    cabecalho = parquet.schema_arrow.names
+    faltantes = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in cabecalho]
+    if faltantes:
+        raise ErroImportacao([f"Colunas obrigatórias ausentes: {', '.join(faltantes)}"])
+
+    campos = [campo for campo in CAMPOS_CAMINHAO if campo in cabecalho]
+    textos = [coluna for coluna in ("caminhao", "modelo") if coluna in cabecalho]
+    frota = np.zeros(parquet.metadata.num_rows, dtype=DTYPE_FROTA)
+    total = 0
+    erros = []
+
+    for lote in parquet.iter_batches(
+        batch_size=linhas_por_bloco, columns=campos + textos
+    ):
+        colunas = {
+            campo: lote.column(campo).to_numpy(zero_copy_only=False).astype(np.float64)
+            for campo in campos
+        }
+        if "caminhao" in textos:
+            nomes = lote.column("caminhao").to_numpy(zero_copy_only=False).astype(str)
+        else:
+            nomes = _nomes_padrao(total, lote.num_rows)
+        modelos = None
+        if "modelo" in textos:
+            modelos = lote.column("modelo").to_numpy(zero_copy_only=False).astype(str)
+        erros.extend(_validar(colunas, linha_inicial=total + 1))
+        erros.extend(
+            _validar_textos(nomes if "caminhao" in textos else None, modelos, total + 1)
+        )
+        total = _preencher(frota, total, nomes, colunas, modelos)
+
+    if "caminhao" in textos:
+        erros.extend(_validar_repetidos(frota["caminhao"].tolist(), linha_inicial=1))
+    if erros:
+        raise ErroImportacao(erros)
+    return frota
+
+
+def ler_frota(arquivo, nome=None):
+    """
+    Lê a frota de um arquivo CSV ou Parquet, escolhendo o formato pela extensão.
+
+    Args:
+      arquivo: Caminho ou arquivo binário aberto.
+      nome: Nome do arquivo, usado quando arquivo não é um caminho.
+    """
+    nome = str(nome or arquivo)
+    if nome.lower().endswith(".parquet"):
+        return ler_frota_parquet(arquivo)
+    return ler_frota_csv(arquivo)
+
+
+def ler_frota_colunas(colunas):
+    """
+    Monta a frota a partir de uma tabela colunar já carregada (por exemplo o
+    corpo JSON de uma requisição de api.py), com a mesma validação dos arquivos.
+
+    Args:
+      colunas: Dicionário coluna -> sequência de valores, no esquema de
+        dados_caminhao; "caminhao" e "modelo" são opcionais.
+
+    Returns:
+      Array estruturado com dtype DTYPE_FROTA.
+
+    Raises:
+      ErroImportacao: Se faltarem colunas obrigatórias, as colunas tiverem
+        tamanhos diferentes, houver valores inválidos, nomes ou modelos longos
+        demais ou nomes repetidos.
+    """
+    faltantes = [coluna for coluna in COLUNAS_OBRIGATORIAS if coluna not in colunas]
+    if faltantes:
+        raise ErroImportacao([f"Colunas obrigatórias ausentes: {', '.join(faltantes)}"])
+    tamanhos = {len(valores) for valores in colunas.values()}
+    if len(tamanhos) > 1:
+        raise ErroImportacao(["As colunas precisam ter o mesmo número de valores"])
+    n = tamanhos.pop()
+
+    numericas = {}
+    erros = []
+    for campo in CAMPOS_CAMINHAO:
+        if campo not in colunas:
+            continue
+        try:
+            numericas[campo] = np.asarray(colunas[campo], dtype=np.float64)
+        except (TypeError, ValueError):
+            erros.append(f"Coluna {campo}: valores não numéricos")
+    erros.extend(_validar(numericas, linha_inicial=1))
+    nomes = colunas.get("caminhao")
+    modelos = colunas.get("modelo")
+    erros.extend(_validar_textos(nomes, modelos, linha_inicial=1))
+    if nomes is not None:
+        erros.extend(_validar_repetidos(np.asarray(nomes, dtype=str).tolist(), linha_inicial=1))
+    if erros:
+        raise ErroImportacao(erros)
+
+    frota = np.zeros(n, dtype=DTYPE_FROTA)
+    _preencher(frota, 0, _nomes_padrao(0, n) if nomes is None else nomes, numericas, modelos)
+    return frota
+
+
+def ler_rotas_csv(arquivo):
+    """
+    Lê as rotas de transporte de um arquivo CSV de segmentos.
+
+    Cada linha é um segmento de uma rota, com as colunas "rota", "distancia"
+    (metros), "velocidade_carregado" e "velocidade_vazio" (km/h) e a coluna
+    opcional "segmento" com a descrição do trecho.
+
+    Returns:
+      Array estruturado com dtype DTYPE_SEGMENTO (ver rotas.py).
+
+    Raises:
+      ErroImportacao: Se faltarem colunas obrigatórias, houver valores
+        inválidos ou rotas e segmentos com nomes longos demais.
+    """
+    if isinstance(arquivo, (str, os.PathLike)):
+        with open(arquivo, "rb") as binario:
+            return ler_rotas_csv(binario)
+
+    texto = io.TextIOWrapper(arquivo, encoding="utf-8-sig", newline="")
+    try:
+        cabecalho = [coluna.strip() for coluna in next(csv.reader([texto.readline()]), [])]
+        # As linhas em branco são puladas; o número de cada linha no arquivo
+        # fica para as mensagens
+        numeradas = [(numero, linha) for numero, linha in enumerate(texto, start=2) if linha.strip()]
+    finally:
+        texto.detach()
+    numeros = np.array([numero for numero, _ in numeradas], dtype=np.intp)
+    linhas = [linha for _, linha in numeradas]
+
+    faltantes = [coluna for coluna in COLUNAS_ROTAS if coluna not in cabecalho]
+    if faltantes:
+        raise ErroImportacao([f"Colunas obrigatórias ausentes: {', '.join(faltantes)}"])
+    campos = [campo for campo in DTYPE_SEGMENTO.names if campo in cabecalho]
+    # Um caractere a mais que a tabela de segmentos, para reconhecer os textos longos
+    tipos = [
+        (campo, f"U{TAMANHO_ROTA + 1}" if DTYPE_SEGMENTO[campo].kind == "U" else DTYPE_SEGMENTO[campo])
+        for campo in campos
+    ]
+    try:
+        dados = np.loadtxt(
+            linhas,
+            delimiter=",",
+            quotechar='"',
+            usecols=[cabecalho.index(campo) for campo in campos],
+            dtype=tipos,
+            ndmin=1,
+        )
+    except ValueError as erro:
+        raise ErroImportacao([str(erro)]) from erro
+    erros = _validar_textos_rotas({campo: dados[campo] for campo in campos}, numeros)
+    return _validar_segmentos(criar_segmentos(dados), numeros, erros)
+
+
+def _validar_textos_rotas(colunas, linha_inicial):
+    """
+    Valida os nomes das rotas e as descrições dos segmentos: textos mais
+    longos que TAMANHO_ROTA seriam truncados, e rotas diferentes com o mesmo
+    começo seriam somadas como uma só.
+
+    Returns:
+      Lista de mensagens de erro, vazia se os textos couberem.
+    """
+    erros = []
+    for campo in ("rota", "segmento"):
+        if campo not in colunas:
+            continue
+        longos = textos_longos(colunas[campo], TAMANHO_ROTA)
+        if longos.any():
+            erros.append(
+                f"Coluna {campo}: textos com mais de {TAMANHO_ROTA} caracteres "
+                f"nas linhas {_linhas(longos, linha_inicial)}"
+            )
+    return erros
+
+
+def _validar_segmentos(segmentos, linha_inicial, erros=()):
+    erros = list(erros)
+    for campo in ("distancia", "velocidade_carregado", "velocidade_vazio"):
+        invalidos = ~np.isfinite(segmentos[campo]) | (segmentos[campo] < 0)
+        if invalidos.any():
+            erros.append(
+                f"Coluna {campo}: valores inválidos nas linhas {_linhas(invalidos, linha_inicial)}"
+            )
+    if erros:
+        raise ErroImportacao(erros)
+    return segmentos
+
+
+def ler_rotas_colunas(colunas):
+    """
+    Monta a tabela de segmentos a partir de uma tabela colunar já carregada,
+    com a mesma validação de ler_rotas_csv.
+
+    Raises:
+      ErroImportacao: Se faltarem colunas obrigatórias, houver valores
+        inválidos ou rotas e segmentos com nomes longos demais.
+    """
+    faltantes = [coluna for coluna in COLUNAS_ROTAS if coluna not in colunas]
+    if faltantes:
+        raise ErroImportacao([f"Colunas obrigatórias ausentes: {', '.join(faltantes)}"])
+    if len({len(valores) for valores in colunas.values()}) > 1:
+        raise ErroImportacao(["As colunas precisam ter o mesmo número de valores"])
+    erros = _validar_textos_rotas(colunas, linha_inicial=1)
+    try:
+        segmentos = criar_segmentos(colunas)
+    except (TypeError, ValueError) as erro:
+        raise ErroImportacao([str(erro)]) from erro
+    return _validar_segmentos(segmentos, 1, erros)
+
+
+def tabela_resultados(frota, indicadores=None):
+    """
+    Monta a tabela colunar de exportação com os dados e os indicadores da frota.
+
+    Args:
+      frota: Array estruturado da frota.
+      indicadores: Resultado de calcular_indicadores_frota; calculado se omitido.
+
+    Returns:
+      Dicionário nome da coluna -> array, na ordem de exportação.
+    """
+    if indicadores is None:
+        indicadores = calcular_indicadores_frota(frota)
+    tabela = {campo: frota[campo] for campo in DTYPE_FROTA.names}
+    for coluna in COLUNAS_RESULTADOS:
+        tabela[coluna] = np.asarray(indicadores[coluna], dtype=np.float64)
+    return tabela
+
+
+def exportar_resultados_csv(frota, destino, indicadores=None, linhas_por_bloco=LINHAS_POR_BLOCO):
+    """
+    Exporta os dados e os indicadores por caminhão em CSV.
+
+    Os números são formatados por coluna, de forma vetorizada; as linhas são
+    gravadas pelo csv.writer, que põe entre aspas os nomes e modelos com
+    vírgula, aspas ou quebra de linha.
+
+    Args:
+      frota: Array estruturado da frota.
+      destino: Caminho ou arquivo binário aberto para escrita.
+      indicadores: Resultado de calcular_indicadores_frota; calculado se omitido.
+      linhas_por_bloco: Quantidade de linhas formatadas por vez.
+    """
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, "wb") as binario:
+            return exportar_resultados_csv(frota, binario, indicadores, linhas_por_bloco)
+
+    tabela = tabela_resultados(frota, indicadores)
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    try:
+        escritor = csv.writer(texto, lineterminator="\n")
+        escritor.writerow(tabela)
+        for inicio in range(0, len(frota), linhas_por_bloco):
+            colunas = []
+            for valores in tabela.values():
+                valores = valores[inicio : inicio + linhas_por_bloco]
+                if valores.dtype.kind == "U":
+                    colunas.append(valores.tolist())
+                elif valores.dtype.kind == "i":
+                    colunas.append(valores.astype(str).tolist())
+                else:
+                    colunas.append(np.char.mod("%.6f", valores).tolist())
+            escritor.writerows(zip(*colunas))
+        texto.flush()
+    finally:
+        texto.detach()
+
+
+def exportar_resultados_parquet(frota, destino, indicadores=None):
+    """Exporta os dados e os indicadores por caminhão em Parquet. Requer pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as erro:
+        raise ImportError("A gravação de arquivos Parquet requer o pacote pyarrow.") from erro
+
+    tabela = tabela_resultados(frota, indicadores)
+    pq.write_table(pa.table(tabela), destino)
@@ -0,0 +1,234 @@
+import cProfile
+import functools
+import io
+import marshal
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+# Instrumentação da execução em andamento. Sem instrumentação ativa, cada ponto
+# de medição custa apenas uma consulta a esta variável. Não depende do
+# Streamlit: main.py cria uma instância por execução do script, mas o mesmo
+# objeto pode medir scripts ou o benchmark.
+_atual = ContextVar("instrumentacao", default=None)
+
+_NULO = nullcontext()
+
+SEPARADOR = " / "
+
+
+class Instrumentacao:
+    """
+    Tempos por etapa, contagem de chamadas e acertos de cache de uma execução,
+    com captura opcional do cProfile e do tracemalloc.
+
+    As etapas de primeiro nível são marcadas em sequência com marcar() (cada
+    marca encerra a anterior); dentro delas, etapa() e medido() registram
+    trechos aninhados, identificados pelo caminho "fase / etapa".
+
+    O tracemalloc é global ao processo: com várias sessões capturando memória
+    ao mesmo tempo, as alocações de uma aparecem no relatório da outra.
+    """
+
+    def __init__(self, perfil=False, memoria=False):
+        self.tempos = {}
+        self.chamadas = {}
+        self.caches = {}
+        self.total = 0.0
+        self._pilha = []
+        self._fase = None
+        self._inicio_fase = 0.0
+        self._inicio = 0.0
+        self._ativa = False
+        self._perfil = cProfile.Profile() if perfil else None
+        self._memoria = memoria
+        self._iniciou_tracemalloc = False
+        self.estatisticas_perfil = None
+        self.instantaneo_memoria = None
+        self.pico_memoria = None
+
+    def iniciar(self):
+        """Torna esta a instrumentação ativa e inicia as capturas pedidas."""
+        encerrar_ativa()
+        _atual.set(self)
+        self._ativa = True
+        if self._memoria:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._iniciou_tracemalloc = True
+            tracemalloc.reset_peak()
+        self._inicio = time.perf_counter()
+        if self._perfil is not None:
+            self._perfil.enable()
+        return self
+
+    def finalizar(self):
+        """Encerra a fase em andamento e as capturas. Pode ser chamado mais de uma vez."""
+        if not self._ativa:
+            return self
+        self._ativa = False
+        if self._perfil is not None:
+            self._perfil.disable()
+            self._perfil.create_stats()
+            self.estatisticas_perfil = self._perfil.stats
+        self.marcar(None)
+        self.total = time.perf_counter() - self._inicio
+        if self._memoria:
+            self.instantaneo_memoria = tracemalloc.take_snapshot()
+            self.pico_memoria = tracemalloc.get_traced_memory()[1]
+            if self._iniciou_tracemalloc:
+                tracemalloc.stop()
+        if _atual.get() is self:
+            _atual.set(None)
+        return self
+
+    def _registrar(self, nome, segundos):
+        self.tempos[nome] = self.tempos.get(nome, 0.0) + segundos
+        self.chamadas[nome] = self.chamadas.get(nome, 0) + 1
+
+    def marcar(self, fase):
+        """Encerra a fase de primeiro nível em andamento e inicia 'fase' (None só encerra)."""
+        agora = time.perf_counter()
+        if self._fase is not None:
+            self._registrar(self._fase, agora - self._inicio_fase)
+        self._fase = fase
+        self._inicio_fase = agora
+        if fase is not None:
+            self.tempos.setdefault(fase, 0.0)
+
+    @contextmanager
+    def etapa(self, nome):
+        """Mede um trecho dentro da fase (ou da etapa) em andamento."""
+        caminho = SEPARADOR.join(filter(None, [self._fase, *self._pilha, nome]))
+        self.tempos.setdefault(caminho, 0.0)
+        self._pilha.append(nome)
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._registrar(caminho, time.perf_counter() - inicio)
+            self._pilha.pop()
+
+    def registrar_cache(self, nome, consultas=0, falhas=0):
+        """Acumula consultas e falhas de um cache; os acertos são a diferença."""
+        contadores = self.caches.setdefault(nome, [0, 0])
+        contadores[0] += consultas
+        contadores[1] += falhas
+
+    def relatorio(self):
+        """
+        Returns:
+          Lista de dicionários com "etapa", "ms", "chamadas" e "percentual" (do
+          tempo total da execução), na ordem em que as etapas começaram.
+        """
+        total = self.total or sum(
+            segundos for nome, segundos in self.tempos.items() if SEPARADOR not in nome
+        )
+        return [
+            {
+                "etapa": nome,
+                "ms": segundos * 1000,
+                "chamadas": self.chamadas[nome],
+                "percentual": segundos / total * 100 if total else 0.0,
+            }
+            for nome, segundos in self.tempos.items()
+        ]
+
+    def relatorio_caches(self):
+        """Retorna consultas, acertos, falhas e taxa de acerto de cada cache."""
+        return [
+            {
+                "cache": nome,
+                "consultas": consultas,
+                "acertos": consultas - falhas,
+                "falhas": falhas,
+                "taxa_acerto": (consultas - falhas) / consultas if consultas else 0.0,
+            }
+            for nome, (consultas, falhas) in self.caches.items()
+        ]
+
+    def perfil_binario(self):
+        """Estatísticas do cProfile no formato de pstats.Stats.dump_stats (arquivo .prof)."""
+        if self.estatisticas_perfil is None:
+            return None
+        return marshal.dumps(self.estatisticas_perfil)
+
+    def perfil_texto(self, linhas=40, ordem="cumulative"):
+        """Resumo legível do cProfile com as funções mais custosas."""
+        if self._perfil is None or self.estatisticas_perfil is None:
+            return None
+        saida = io.StringIO()
+        pstats.Stats(self._perfil, stream=saida).sort_stats(ordem).print_stats(linhas)
+        return saida.getvalue()
+
+    def memoria_texto(self, linhas=30):
+        """Linhas de código que mais alocaram memória durante a execução."""
+        if self.instantaneo_memoria is None:
+            return None
+        estatisticas = self.instantaneo_memoria.filter_traces(
+            [tracemalloc.Filter(False, tracemalloc.__file__)]
+        ).statistics("lineno")
+        total = sum(estatistica.size for estatistica in estatisticas)
+        cabecalho = [
+            f"Memória alocada em uso: {total / 1024:.1f} KiB; "
+            f"pico da execução: {self.pico_memoria / 1024:.1f} KiB",
+            "",
+        ]
+        return "\n".join(cabecalho + [str(estatistica) for estatistica in estatisticas[:linhas]])
+
+
+def ativa():
+    """Retorna a instrumentação da execução em andamento, ou None."""
+    return _atual.get()
+
+
+def encerrar_ativa():
+    """
+    Finaliza a instrumentação que ficou ativa, por exemplo quando uma execução
+    foi interrompida por st.rerun ou por uma exceção antes de finalizar().
+    """
+    instrumentacao = _atual.get()
+    if instrumentacao is not None:
+        instrumentacao.finalizar()
+
+
+def marcar(fase):
+    """Marca o início de uma fase de primeiro nível, se houver instrumentação ativa."""
+    instrumentacao = _atual.get()
+    if instrumentacao is not None:
+        instrumentacao.marcar(fase)
+
+
+def etapa(nome):
+    """Contexto que mede um trecho se houver instrumentação ativa; senão não faz nada."""
+    instrumentacao = _atual.get()
+    if instrumentacao is None:
+        return _NULO
+    return instrumentacao.etapa(nome)
+
+
+def registrar_cache(nome, consultas=0, falhas=0):
+    instrumentacao = _atual.get()
+    if instrumentacao is not None:
+        instrumentacao.registrar_cache(nome, consultas, falhas)
+
+
+def medido(nome=None):
+    """Decorador que mede cada chamada da função como uma etapa."""
+
+    def decorador(funcao):
+        rotulo = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            instrumentacao = _atual.get()
+            if instrumentacao is None:
+                return funcao(*args, **kwargs)
+            with instrumentacao.etapa(rotulo):
+                return funcao(*args, **kwargs)
+
+        return medida
+
+    return decorador
@@ -1,19 +1,35 @@
-import streamlit as st
-
+import functools
+import hashlib
+import io
+import uuid
+from collections import deque
 
+import numpy as np
+import streamlit as st
 
-from calculos import (
-    calcular_tempo_parado,
-    calcular_df,
-    calcular_utilizacao,
-    calcular_tempo_perdido,
-    calcular_tempo_total,
-    calcular_tempo_ciclo,
-    calcular_tempo_ciclo_total,
-    calcular_capacidade_liquida,
-    calcular_produtividade_horaria
+# Os módulos das análises (cenários, importação, metas, sensibilidade, séries
+# por período e Monte Carlo) são importados nas funções que os usam, para não
+# pesar na primeira execução
+from cache_indicadores import CacheIndicadores
+from catalogo_paradas import CATALOGO
+from editor_frota import editor_frota
+from frota import PARADAS_EXTRAS, TAMANHO_NOME, criar_frota
+from frota_compartilhada import (
+    DerivadosFrota,
+    DerivadosSessao,
+    FrotaBase,
+    FrotaSessao,
+    RegistroMemoria,
 )
-from graficos import gerar_grafico, gerar_grafico_df_utilizacao
+from graficos import (
+    BACKENDS_GRAFICOS,
+    gerar_grafico,
+    gerar_grafico_df_utilizacao,
+    gerar_grafico_linhas,
+)
+from instrumentacao import Instrumentacao, ativa, encerrar_ativa, etapa, marcar
+from painel_tarefas import acompanhar_tarefa, iniciar_tarefa, obter_executor_tarefas
+from partida import aquecimento_processo
 
 # Configuração da página
 st.set_page_config(
@@ -22,11 +38,525 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
+# Aquecimento do processo, quando o servidor foi iniciado por partida.py. Não é
+# iniciado aqui: na primeira sessão ele disputaria o GIL com a própria página
+aquecimento = aquecimento_processo()
+
 # Tema escuro (configurado no arquivo config.toml)
 
-# Inicializa dados_caminhoes na session_state se não existir
-if "dados_caminhoes" not in st.session_state:
-    st.session_state.dados_caminhoes = []
+# Acima desta quantidade de caminhões o caminhão selecionado é escolhido pelo
+# número, sem montar a lista de nomes da frota inteira
+LIMITE_LISTA_CAMINHOES = 1_000
+
+# Fragmentos (st.fragment) que dependem de cada dado. Uma alteração feita dentro
+# de um fragmento reexecuta apenas os dependentes, não a página inteira.
+DEPENDENTES = {
+    "frota": [
+        "caminhao", "editor_frota", "graficos", "resumo", "curvas", "monte_carlo", "sensibilidade",
+        "metas",
+    ],
+    "selecao": ["caminhao", "curvas"],
+}
+
+# Quantidade de execuções guardadas para os percentis de latência do painel
+HISTORICO_LATENCIAS = 200
+
+# Frotas base e derivados (resultados e agregados) das frotas sem alterações
+# mantidos em memória para todas as sessões, e por quanto tempo sem uso. Uma
+# sessão que alterou a frota guarda na session_state só os indicadores dos
+# caminhões alterados (ver DerivadosSessao)
+LIMITE_BASES = 32
+LIMITE_DERIVADOS = 16
+TTL_COMPARTILHADOS = 3600
+TAMANHO_CACHE_INDICADORES = 50_000
+
+# Atualizações parciais do gráfico da análise de sensibilidade
+PARTES_VARREDURA = 10
+
+# Instrumentação opcional desta execução, ligada no painel "Instrumentação"
+if st.session_state.get("instrumentacao_ativa"):
+    instrumentacao = Instrumentacao(
+        perfil=st.session_state.get("instrumentacao_perfil", False),
+        memoria=st.session_state.get("instrumentacao_memoria", False),
+    ).iniciar()
+else:
+    instrumentacao = None
+    encerrar_ativa()
+marcar("Inicialização")
+
+# Dados compartilhados por todas as sessões. Cada frota aberta (cenário, arquivo
+# importado ou a padrão) é uma FrotaBase somente leitura; a sessão guarda só a
+# sua FrotaSessao, com as alterações que fez (ver frota_compartilhada.py)
+@st.cache_resource(show_spinner=False, max_entries=LIMITE_BASES, ttl=TTL_COMPARTILHADOS)
+def obter_frota_base(chave, _carregar):
+    return FrotaBase(_carregar(), chave)
+
+
+@st.cache_resource
+def obter_cache_indicadores():
+    return CacheIndicadores(TAMANHO_CACHE_INDICADORES, descartar_substituidos=False)
+
+
+@st.cache_resource
+def obter_registro_memoria():
+    return RegistroMemoria()
+
+
+@st.cache_resource(max_entries=LIMITE_DERIVADOS, ttl=TTL_COMPARTILHADOS)
+def _derivados_frota(chave_base, n):
+    derivados = DerivadosFrota()
+    obter_registro_memoria().registrar_derivados((chave_base, n), derivados)
+    return derivados
+
+
+def abrir_frota(base, num_caminhoes=None):
+    """Passa a sessão para a frota base informada, descartando as alterações."""
+    st.session_state.frota = FrotaSessao(base)
+    st.session_state.derivados_frota = DerivadosSessao()
+    obter_registro_memoria().registrar_sessao(
+        st.session_state.id_sessao, st.session_state.frota, st.session_state.derivados_frota
+    )
+    # Incrementada a cada alteração dos dados da frota; identifica os campos do
+    # formulário do caminhão
+    st.session_state.versao_frota = st.session_state.get("versao_frota", -1) + 1
+    st.session_state.num_caminhoes = num_caminhoes or max(len(base), 1)
+
+
+if "id_sessao" not in st.session_state:
+    st.session_state.id_sessao = uuid.uuid4().hex[:8]
+
+# Uma sessão nova começa com a frota padrão
+if "frota" not in st.session_state:
+    abrir_frota(obter_frota_base("padrao", lambda: criar_frota([])), num_caminhoes=8)
+
+# Banco de cenários compartilhado por todas as sessões
+@st.cache_resource
+def obter_armazem_cenarios():
+    from cenarios import ArmazemCenarios
+
+    return ArmazemCenarios()
+
+
+def salvar_cenario():
+    nome = st.session_state.nome_cenario.strip()
+    if nome:
+        obter_armazem_cenarios().salvar(
+            nome, st.session_state.frota.materializar(0, st.session_state.num_caminhoes)
+        )
+
+
+def abrir_cenario(nome):
+    # Sessões que abrem a mesma revisão do cenário compartilham a frota
+    armazem = obter_armazem_cenarios()
+    revisao = armazem.revisao(nome)
+    abrir_frota(
+        obter_frota_base(
+            f"cenario:{nome}:{revisao}", lambda: armazem.carregar(nome, revisao=revisao)
+        )
+    )
+    st.session_state.nome_cenario = nome
+
+
+def registrar_latencia(tipo, segundos):
+    """Guarda a duração de uma execução para os percentis do painel de instrumentação."""
+    latencias = st.session_state.setdefault("latencias", {})
+    latencias.setdefault(tipo, deque(maxlen=HISTORICO_LATENCIAS)).append(segundos * 1000)
+
+
+def fragmento(chave):
+    """
+    Transforma a função em um st.fragment com a chave usada em DEPENDENTES.
+
+    Numa execução completa o fragmento é medido como uma etapa da
+    instrumentação; reexecutado sozinho, é medido à parte e a duração entra no
+    histórico de latências.
+    """
+
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def executar():
+            if ativa() is not None or not st.session_state.get("instrumentacao_ativa"):
+                with etapa(f"fragmento {chave}"):
+                    return funcao()
+            medicao = Instrumentacao().iniciar()
+            try:
+                return funcao()
+            finally:
+                registrar_latencia(f"Fragmento {chave}", medicao.finalizar().total)
+
+        return st.fragment(executar, key=chave)
+
+    return decorador
+
+
+def obter_derivados():
+    """
+    Resultados e agregados dos caminhões em uso, compartilhados pelos
+    fragmentos. Os da frota base são calculados uma vez para todas as
+    sessões; uma sessão com alterações usa os seus, que guardam só os
+    caminhões alterados, recalculados a cada alteração, e leem os demais dos
+    da base.
+    """
+    frota = st.session_state.frota
+    n = st.session_state.num_caminhoes
+    frota.completar(n)
+    cache = obter_cache_indicadores()
+    compartilhados = _derivados_frota(frota.base.chave, n).atualizar(frota.base, n, cache=cache)
+    if not frota.alterada(n):
+        return compartilhados
+    return st.session_state.derivados_frota.atualizar(frota, n, compartilhados, cache=cache)
+
+
+def obter_resultados():
+    return obter_derivados().resultados
+
+
+def chave_frota():
+    """
+    Identifica os dados dos caminhões em uso, para as chaves das análises em
+    segundo plano: a frota base e a quantidade, mais a sessão e a versão
+    quando a sessão alterou a frota.
+    """
+    frota = st.session_state.frota
+    n = st.session_state.num_caminhoes
+    if frota.alterada(n):
+        return (frota.base.chave, n, st.session_state.id_sessao, frota.versao)
+    return (frota.base.chave, n)
+
+
+def frota_alterada():
+    """
+    Reexecuta só os fragmentos que dependem da frota. Chamada nos callbacks
+    dos widgets que editam a frota, depois de gravar as alterações.
+    """
+    st.session_state.versao_frota += 1
+    st.rerun(DEPENDENTES["frota"])
+
+
+def alterar_caminhao(i, campo, chave, escala):
+    valor = st.session_state[chave]
+    st.session_state.frota.alterar(i, campo, valor.strip() if campo == "modelo" else valor / escala)
+    frota_alterada()
+
+
+def campo_caminhao(i, campo, rotulo, widget=st.number_input, escala=1, **kwargs):
+    """
+    Widget de um campo do caminhão i. A chave inclui a versão da frota para que
+    o campo mostre os valores alterados em outro lugar (por exemplo no editor
+    da frota); escala converte o valor exibido no valor gravado.
+    """
+    chave = f"{campo}_{i}_{st.session_state.versao_frota}"
+    widget(rotulo, key=chave, on_change=alterar_caminhao, args=(i, campo, chave, escala), **kwargs)
+
+
+def indice_caminhao():
+    """Posição do caminhão selecionado, limitada à quantidade de caminhões em uso."""
+    return min(st.session_state.get("indice_caminhao", 0), st.session_state.num_caminhoes - 1)
+
+
+def selecionar_caminhao(chave, deslocamento=0):
+    st.session_state.indice_caminhao = st.session_state[chave] - deslocamento
+    st.rerun(DEPENDENTES["selecao"])
+
+
+@fragmento("caminhao")
+def exibir_caminhao():
+    """Seleção, formulário e indicadores do caminhão selecionado."""
+    frota = st.session_state.frota
+    num_caminhoes = st.session_state.num_caminhoes
+    i = indice_caminhao()
+
+    # Lista suspensa para selecionar o caminhão; em frotas grandes, o número dele
+    if num_caminhoes <= LIMITE_LISTA_CAMINHOES:
+        caminhoes = frota.materializar(0, num_caminhoes)["caminhao"].tolist()
+        st.selectbox(
+            "Selecione o caminhão:",
+            range(num_caminhoes),
+            index=i,
+            format_func=caminhoes.__getitem__,
+            key="lista_caminhoes",
+            on_change=selecionar_caminhao,
+            args=("lista_caminhoes",),
+        )
+    else:
+        st.number_input(
+            "Número do caminhão:",
+            min_value=1,
+            max_value=num_caminhoes,
+            value=i + 1,
+            step=1,
+            key="numero_caminhao",
+            on_change=selecionar_caminhao,
+            args=("numero_caminhao", 1),
+        )
+    registro = frota.registro(i)
+    caminhao = str(registro["caminhao"])
+
+    # Exibe as configurações para o caminhão selecionado; cada campo é gravado na
+    # frota pelo próprio callback
+    with st.expander(f"Configurações do caminhão {caminhao}", expanded=True):
+
+        # Modelo usado para agrupar os caminhões no resumo da frota
+        campo_caminhao(
+            i,
+            "modelo",
+            f"Modelo ({caminhao})",
+            widget=st.text_input,
+            value=str(registro["modelo"]),
+            max_chars=TAMANHO_NOME,
+        )
+
+        # Campos para o usuário inserir a quantidade de cada tipo de serviço e parada
+        campo_caminhao(
+            i,
+            "qtd_250h",
+            f"Qtd Preventiva 250h ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_250h"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_500h",
+            f"Qtd Preventiva 500h ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_500h"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_1000h",
+            f"Qtd Preventiva 1000h ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_1000h"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_16000h",
+            f"Qtd Preventiva 16000h ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_16000h"]),
+            step=1,
+        )
+
+        campo_caminhao(
+            i,
+            "taxa_corretiva",
+            f"Taxa Corretiva (%) ({caminhao})",
+            escala=100,
+            min_value=0,
+            max_value=100,
+            value=int(round(registro["taxa_corretiva"] * 100)),
+        )
+
+        # ... (outros campos de parada) ...
+        campo_caminhao(
+            i,
+            "qtd_sem_operador",
+            f"Qtd Sem Operador ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_sem_operador"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_parada_desmonte",
+            f"Qtd Parada Desmonte ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_parada_desmonte"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_parada_climatica",
+            f"Qtd Parada Climática ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_parada_climatica"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_almoco",
+            f"Qtd Almoço ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_almoco"]),
+            step=1,
+        )
+        campo_caminhao(
+            i,
+            "qtd_troca_turno",
+            f"Qtd Troca de Turno ({caminhao})",
+            min_value=0,
+            value=int(registro["qtd_troca_turno"]),
+            step=1,
+        )
+
+        # Campos para o usuário inserir o percentual de absenteísmo e treinamento
+        campo_caminhao(
+            i,
+            "perc_absenteismo",
+            f"Percentual Absenteísmo (%) ({caminhao})",
+            min_value=0.0,
+            max_value=100.0,
+            value=float(registro["perc_absenteismo"]),
+            step=0.1,
+            format="%.1f",
+        )
+        campo_caminhao(
+            i,
+            "perc_treinamento",
+            f"Percentual Treinamento (%) ({caminhao})",
+            min_value=0.0,
+            max_value=100.0,
+            value=float(registro["perc_treinamento"]),
+            step=0.1,
+            format="%.1f",
+        )
+
+        # Paradas acrescentadas no catálogo (paradas.toml)
+        for parada in PARADAS_EXTRAS:
+            campo_caminhao(
+                i,
+                parada["campo"],
+                f"{parada['nome']} ({caminhao})",
+                min_value=0.0,
+                value=float(registro[parada["campo"]]),
+            )
+
+        # Exibe a utilização, horas não utilizadas, horas trabalhadas e a DF do caminhão selecionado
+        resultados = obter_resultados()
+        if caminhao in resultados:
+            indicadores = resultados[caminhao]
+            # Divide a área em duas colunas
+            col_utilizacao, col_tempos = st.columns(2)
+
+            # Primeira coluna: Utilização, Horas Não Utilizadas, Horas Trabalhadas
+            with col_utilizacao:
+                st.container()
+                st.write(f"Utilização: {indicadores['utilizacao']:.2f}%")
+                st.write(f"Horas não utilizadas: {indicadores['horas_nao_utilizadas']:.2f}")
+                st.write(f"Horas trabalhadas: {indicadores['horas_trabalhadas']:.2f}")
+
+            # Segunda coluna: Horas Disponíveis, DF, Tempo Perdido
+            with col_tempos:
+                st.container()
+                st.write(f"Horas disponíveis: {indicadores['horas_disponiveis']:.2f}")
+                st.write(f"DF: {indicadores['df']:.2f}%")
+
+                # Exibe o tempo perdido em cada operação
+                for operacao, tempo in indicadores["tempo_perdido"].items():
+                    st.write(f"{operacao}: {tempo:.2f} horas")
+
+
+@fragmento("editor_frota")
+def exibir_editor_frota():
+    resultados = obter_resultados()
+    editor_frota(
+        st.session_state.frota,
+        st.session_state.num_caminhoes,
+        resultados.indicadores if len(resultados) else None,
+        ao_alterar=frota_alterada,
+    )
+
+
+def exibir_instrumentacao():
+    """Painel com os tempos por etapa, os caches e as capturas da execução atual."""
+    if instrumentacao is not None:
+        registrar_latencia("Execução completa", instrumentacao.finalizar().total)
+    with st.sidebar.expander("Instrumentação"):
+        st.toggle("Medir tempos por etapa", key="instrumentacao_ativa")
+        desligada = not st.session_state.instrumentacao_ativa
+        st.toggle("Capturar perfil (cProfile)", key="instrumentacao_perfil", disabled=desligada)
+        st.toggle("Capturar memória (tracemalloc)", key="instrumentacao_memoria", disabled=desligada)
+        if instrumentacao is None:
+            return
+
+        st.caption(f"Execução completa: {instrumentacao.total * 1000:.1f} ms")
+        if aquecimento is not None and aquecimento.concluido():
+            st.caption(
+                "Aquecimento do processo: "
+                + ", ".join(
+                    f"{nome} {segundos * 1000:.0f} ms" + (" (falhou)" if nome in aquecimento.erros else "")
+                    for nome, segundos in aquecimento.tempos.items()
+                )
+            )
+        st.dataframe(
+            [
+                {
+                    "Etapa": linha["etapa"],
+                    "ms": round(linha["ms"], 2),
+                    "Chamadas": linha["chamadas"],
+                    "%": round(linha["percentual"], 1),
+                }
+                for linha in instrumentacao.relatorio()
+            ],
+            hide_index=True,
+        )
+
+        # Percentis das execuções completas e das reexecuções de cada fragmento
+        st.dataframe(
+            [
+                {
+                    "Execução": tipo,
+                    "Quantidade": len(duracoes),
+                    "p50 (ms)": round(float(np.percentile(duracoes, 50)), 1),
+                    "p95 (ms)": round(float(np.percentile(duracoes, 95)), 1),
+                }
+                for tipo, duracoes in st.session_state.latencias.items()
+            ],
+            hide_index=True,
+        )
+        caches = instrumentacao.relatorio_caches()
+        if caches:
+            st.dataframe(
+                [
+                    {
+                        "Cache": cache["cache"],
+                        "Acertos": cache["acertos"],
+                        "Falhas": cache["falhas"],
+                        "Taxa (%)": round(cache["taxa_acerto"] * 100, 1),
+                    }
+                    for cache in caches
+                ],
+                hide_index=True,
+            )
+        perfil = instrumentacao.perfil_binario()
+        if perfil is not None:
+            st.download_button(
+                "Baixar perfil (.prof)",
+                data=perfil,
+                file_name="perfil_execucao.prof",
+                mime="application/octet-stream",
+            )
+            st.download_button(
+                "Baixar resumo do perfil (.txt)",
+                data=instrumentacao.perfil_texto(),
+                file_name="perfil_execucao.txt",
+                mime="text/plain",
+            )
+        memoria = instrumentacao.memoria_texto()
+        if memoria is not None:
+            st.download_button(
+                "Baixar alocações de memória (.txt)",
+                data=memoria,
+                file_name="memoria_execucao.txt",
+                mime="text/plain",
+            )
+
+
+# Navegação entre as páginas; cada execução monta apenas a página escolhida
+pagina = st.sidebar.radio(
+    "Página", ["Dimensionamento da Frota", "Produtividade Horária"], horizontal=True, key="pagina"
+)
+if pagina == "Produtividade Horária":
+    marcar("Produtividade Horária")
+    # Importada só quando a página é aberta, com o pandas e a simulação com filas
+    from produtividade import pagina_produtividade
+
+    fragmento("produtividade")(pagina_produtividade)()
+    exibir_instrumentacao()
+    st.stop()
 
 # Título principal
 st.markdown(
@@ -38,242 +568,188 @@ st.markdown(
 col1, col2 = st.columns([2, 1])  # Ajuste a proporção conforme necessário
 
 # Barra lateral com os parâmetros de entrada
+marcar("Barra lateral")
 with st.sidebar:
     st.subheader("Parâmetros de Entrada")
-    num_caminhoes = st.sidebar.slider(
-        "Quantos caminhões sua frota possui?", 1, 20, 8, 1
+
+    # Importação em lote da frota a partir de um arquivo CSV ou Parquet
+    arquivo_frota = st.file_uploader(
+        "Importar frota (CSV ou Parquet)", type=["csv", "parquet"]
     )
-    caminhoes = [f"CM-{i+1:03}" for i in range(num_caminhoes)]
-
-    # Lista suspensa para selecionar o caminhão
-    selected_caminhao = st.sidebar.selectbox("Selecione o caminhão:", caminhoes)
-
-    # Loop para coletar as informações de cada caminhão
-    for i, caminhao in enumerate(caminhoes):
-        # Verifica se já existem dados para este caminhão na session_state
-        if i < len(st.session_state.dados_caminhoes):
-            dados_caminhao = st.session_state.dados_caminhoes[i]
-        else:
-            # Cria um novo dicionário com valores padrão se não houver dados
-            dados_caminhao = {
-                "caminhao": caminhao,
-                "qtd_250h": 35,
-                "qtd_500h": 18,
-                "qtd_1000h": 9,
-                "qtd_16000h": 0,
-                "taxa_corretiva": 0.25,
-                "qtd_sem_operador": 0,
-                "qtd_parada_desmonte": 0,
-                "qtd_parada_climatica": 0,
-                "qtd_almoco": 0,
-                "qtd_troca_turno": 0,
-                "perc_absenteismo": 0.0,
-                "perc_treinamento": 0.0,
-            }
-            st.session_state.dados_caminhoes.append(dados_caminhao)
-
-        # Exibe as configurações para o caminhão selecionado
-        if caminhao == selected_caminhao:
-            with st.expander(
-                f"Configurações do caminhão {caminhao}", expanded=True
-            ):
-
-                # Campos para o usuário inserir a quantidade de cada tipo de serviço e parada
-                dados_caminhao["qtd_250h"] = st.number_input(
-                    f"Qtd Preventiva 250h ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao["qtd_250h"],
-                    step=1,
-                )
-                dados_caminhao["qtd_500h"] = st.number_input(
-                    f"Qtd Preventiva 500h ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao["qtd_500h"],
-                    step=1,
-                )
-                dados_caminhao["qtd_1000h"] = st.number_input(
-                    f"Qtd Preventiva 1000h ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao["qtd_1000h"],
-                    step=1,
-                )
-                dados_caminhao["qtd_16000h"] = st.number_input(
-                    f"Qtd Preventiva 16000h ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao["qtd_16000h"],
-                    step=1,
-                )
+    if (
+        arquivo_frota is not None
+        and st.session_state.get("arquivo_frota") != arquivo_frota.file_id
+    ):
+        from importacao import ErroImportacao, ler_frota
 
-                dados_caminhao["taxa_corretiva"] = (
-                    st.number_input(
-                        f"Taxa Corretiva (%) ({caminhao})",
-                        min_value=0,
-                        max_value=100,
-                        value=int(dados_caminhao["taxa_corretiva"] * 100),
-                    )
-                    / 100
+        try:
+            # Sessões que importam o mesmo arquivo compartilham a frota
+            conteudo = arquivo_frota.getvalue()
+            abrir_frota(
+                obter_frota_base(
+                    "arquivo:" + hashlib.sha256(conteudo).hexdigest()[:16],
+                    lambda: ler_frota(io.BytesIO(conteudo), nome=arquivo_frota.name),
                 )
+            )
+        except ErroImportacao as erro:
+            st.error(
+                "Arquivo de frota inválido:\n\n"
+                + "\n".join(f"- {mensagem}" for mensagem in erro.erros)
+            )
+        st.session_state.arquivo_frota = arquivo_frota.file_id
 
-                # ... (outros campos de parada) ...
-                dados_caminhao["qtd_sem_operador"] = st.number_input(
-                    f"Qtd Sem Operador ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao.get("qtd_sem_operador", 0),
-                    step=1,
-                )
-                dados_caminhao["qtd_parada_desmonte"] = st.number_input(
-                    f"Qtd Parada Desmonte ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao.get("qtd_parada_desmonte", 0),
-                    step=1,
-                )
-                dados_caminhao["qtd_parada_climatica"] = st.number_input(
-                    f"Qtd Parada Climática ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao.get("qtd_parada_climatica", 0),
-                    step=1,
-                )
-                dados_caminhao["qtd_almoco"] = st.number_input(
-                    f"Qtd Almoço ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao.get("qtd_almoco", 0),
-                    step=1,
-                )
-                dados_caminhao["qtd_troca_turno"] = st.number_input(
-                    f"Qtd Troca de Turno ({caminhao})",
-                    min_value=0,
-                    value=dados_caminhao.get("qtd_troca_turno", 0),
-                    step=1,
-                )
+    # Cenários nomeados gravados no banco SQLite local
+    with st.expander("Cenários salvos"):
+        armazem = obter_armazem_cenarios()
+        st.text_input("Nome do cenário", key="nome_cenario")
+        st.button("Salvar cenário atual", on_click=salvar_cenario)
 
-                # Campos para o usuário inserir o percentual de absenteísmo e treinamento
-                dados_caminhao["perc_absenteismo"] = st.number_input(
-                    f"Percentual Absenteísmo (%) ({caminhao})",
-                    min_value=0.0,
-                    max_value=100.0,
-                    value=dados_caminhao.get("perc_absenteismo", 0.0),
-                    step=0.1,
-                    format="%.1f",
-                )
-                dados_caminhao["perc_treinamento"] = st.number_input(
-                    f"Percentual Treinamento (%) ({caminhao})",
-                    min_value=0.0,
-                    max_value=100.0,
-                    value=dados_caminhao.get("perc_treinamento", 0.0),
-                    step=0.1,
-                    format="%.1f",
+        cenarios = {cenario["nome"]: cenario for cenario in armazem.listar()}
+        if cenarios:
+            cenario_escolhido = st.selectbox(
+                "Cenário",
+                list(cenarios),
+                format_func=lambda nome: f"{nome} ({cenarios[nome]['quantidade']} caminhões)",
+            )
+            st.button(
+                "Abrir cenário",
+                on_click=abrir_cenario,
+                args=(cenario_escolhido,),
+            )
+
+            if st.toggle("Comparar com outro cenário"):
+                cenario_comparado = st.selectbox("Comparar com", list(cenarios))
+                diferencas = armazem.diferencas(cenario_escolhido, cenario_comparado)
+                st.caption(
+                    f"{len(diferencas['adicionados'])} adicionados, "
+                    f"{len(diferencas['removidos'])} removidos, "
+                    f"{len(diferencas['alterados'])} alterados"
                 )
+                if diferencas["alterados"]:
+                    st.dataframe(
+                        [
+                            {
+                                "Caminhão": nome,
+                                "Campo": campo,
+                                cenario_escolhido: str(antes),
+                                cenario_comparado: str(depois),
+                            }
+                            for nome, mudancas in diferencas["alterados"].items()
+                            for campo, (antes, depois) in mudancas.items()
+                        ],
+                        hide_index=True,
+                    )
+
+    num_caminhoes = st.sidebar.number_input(
+        "Quantos caminhões sua frota possui?",
+        min_value=1,
+        step=1,
+        key="num_caminhoes",
+    )
+
+    # Acrescenta caminhões com valores padrão se a frota for menor que o selecionado
+    st.session_state.frota.completar(num_caminhoes)
+
+    # Caminhão selecionado, com o formulário e os indicadores dele
+    exibir_caminhao()
+
+# Calcula os indicadores de cada caminhão uma única vez por versão da frota
+marcar("Indicadores da frota")
+derivados = obter_derivados()
+resultados = derivados.resultados
+if derivados.invalidos:
+    st.error("Entrada inválida nos dados dos caminhões. Por favor, verifique os dados.")
 
-                # Calcula e exibe a utilização, horas não utilizadas e horas trabalhadas
-                (
-                    utilizacao,
-                    horas_nao_utilizadas,
-                    horas_trabalhadas,
-                    horas_disponiveis,
-                ) = calcular_utilizacao(dados_caminhao)
-
-                # Calcula a DF
-                tempo_total_parado = calcular_tempo_parado(dados_caminhao)
-                df = calcular_df(tempo_total_parado)  # Calcula a DF aqui
-
-                # Divide a área em duas colunas
-                col_utilizacao, col_tempos = st.columns(2)
-
-                # Primeira coluna: Utilização, Horas Não Utilizadas, Horas Trabalhadas
-                with col_utilizacao:
-                    st.container()
-                    st.write(f"Utilização: {utilizacao:.2f}%")
-                    st.write(f"Horas não utilizadas: {horas_nao_utilizadas:.2f}")
-                    st.write(f"Horas trabalhadas: {horas_trabalhadas:.2f}")
-
-                # Segunda coluna: Horas Disponíveis, DF, Tempo Perdido
-                with col_tempos:
-                    st.container()
-                    st.write(f"Horas disponíveis: {horas_disponiveis:.2f}")
-                    st.write(f"DF: {df:.2f}%")
-
-                    # Calcula e exibe o tempo perdido em cada operação
-                    tempo_perdido = calcular_tempo_perdido(
-                        dados_caminhao
-                    )  # Passe horas_trabalhadas como argumento
-                    for operacao, tempo in tempo_perdido.items():
-                        st.write(f"{operacao}: {tempo:.2f} horas")
-
-                # Atualiza os dados na session_state
-                st.session_state.dados_caminhoes[i] = dados_caminhao
+# Exibe os contadores do cache compartilhado para acompanhar a taxa de acerto
+estatisticas_cache = obter_cache_indicadores().estatisticas()
+st.sidebar.caption(
+    f"Cache de indicadores: {estatisticas_cache['acertos']} acertos, "
+    f"{estatisticas_cache['falhas']} falhas, "
+    f"{estatisticas_cache['tamanho']} caminhões em cache"
+)
+
+# Memória própria de cada sessão e dos dados compartilhados entre elas
+with st.sidebar.expander("Memória por sessão"):
+    if st.toggle("Exibir memória por sessão", key="exibir_memoria"):
+        sessoes, compartilhados = obter_registro_memoria().relatorio()
+        st.dataframe(
+            [
+                {
+                    "Sessão": sessao["sessao"]
+                    + (" (esta)" if sessao["sessao"] == st.session_state.id_sessao else ""),
+                    "Frota base": sessao["base"],
+                    "Caminhões": sessao["caminhoes"],
+                    "Alterados": sessao["alterados"],
+                    "Derivados (KB)": round(sessao["derivados"] / 1024, 1),
+                    "KB": round(sessao["bytes"] / 1024, 1),
+                }
+                for sessao in sessoes
+            ],
+            hide_index=True,
+        )
+        st.dataframe(
+            [
+                {"Compartilhado": linha["dados"], "KB": round(linha["bytes"] / 1024, 1)}
+                for linha in compartilhados
+            ],
+            hide_index=True,
+        )
+
+# Grade com uma página de caminhões para editar vários de uma vez
+marcar("Editor da frota")
+with st.expander("Editor da frota"):
+    exibir_editor_frota()
 
 # Conteúdo principal
 col1, col2 = st.columns([2, 1])  # Divide o conteúdo principal em duas colunas
 
 # Subseção Gráficos
-with col1:
+marcar("Gráficos")
+
+
+@fragmento("graficos")
+def exibir_graficos():
     st.subheader("Gráficos")
 
-    # Calcula a DF após a atualização da lista de caminhões
-    dfs_caminhoes = []
-    utilizacoes = []  # Lista para armazenar as utilizações
-    for caminhao in caminhoes:  # Itera sobre a lista atualizada de caminhões
-        for dados in st.session_state.dados_caminhoes:
-            if (
-                dados["caminhao"] == caminhao
-            ):  # Encontra os dados do caminhão
-                try:
-                    tempo_total_parado = calcular_tempo_parado(dados)
-                    df = calcular_df(tempo_total_parado)
-                    dfs_caminhoes.append(df)
-
-                    # Calcula a utilização e adiciona à lista
-                    (
-                        utilizacao,
-                        _,
-                        _,
-                        _,
-                    ) = calcular_utilizacao(dados_caminhao)
-                    utilizacoes.append(utilizacao)
-
-                except ValueError:
-                    st.error(
-                        f"Entrada inválida para o caminhão {dados['caminhao']}. Por favor, verifique os dados."
-                    )
-                    # Interrompe o loop em caso de erro
-                    break
-                break  # Sai do loop interno após encontrar os dados do caminhão
+    # Imagem em cache no servidor ou gráfico desenhado no navegador
+    backend_graficos = BACKENDS_GRAFICOS[
+        st.radio("Renderização", list(BACKENDS_GRAFICOS), horizontal=True)
+    ]
 
     # Gráfico com fundo ajustado dinamicamente, tamanho menor e rotação dos rótulos
-    if dfs_caminhoes:
-        gerar_grafico(caminhoes, dfs_caminhoes)
+    resultados = obter_resultados()
+    if len(resultados):
+        gerar_grafico(resultados.caminhoes, resultados.dfs, backend=backend_graficos)
 
         # Gera o gráfico de DF x Utilização
-        gerar_grafico_df_utilizacao(caminhoes, dfs_caminhoes, utilizacoes)
+        gerar_grafico_df_utilizacao(
+            resultados.caminhoes,
+            resultados.dfs,
+            resultados.utilizacoes,
+            backend=backend_graficos,
+        )
+
+
+with col1:
+    exibir_graficos()
 
 # Subseção Resumo
-with col2:
-    st.subheader("Resumo")
+marcar("Resumo")
 
-    # Calcula a DF após a atualização da lista de caminhões
-    dfs_caminhoes = []
-    for caminhao in caminhoes:  # Itera sobre a lista atualizada de caminhões
-        for dados in st.session_state.dados_caminhoes:
-            if (
-                dados["caminhao"] == caminhao
-            ):  # Encontra os dados do caminhão
-                try:
-                    tempo_total_parado = calcular_tempo_parado(dados)
-                    df = calcular_df(tempo_total_parado)
-                    dfs_caminhoes.append(df)
-                except ValueError:
-                    st.error(
-                        f"Entrada inválida para o caminhão {dados['caminhao']}. Por favor, verifique os dados."
-                    )
-                    # Interrompe o loop em caso de erro
-                    break
-                break  # Sai do loop interno após encontrar os dados do caminhão
+
+@fragmento("resumo")
+def exibir_resumo():
+    st.subheader("Resumo")
 
     # Resumo da disponibilidade centralizado e em destaque
     st.markdown("<br>", unsafe_allow_html=True)
-    if dfs_caminhoes:
-        total_df = sum(dfs_caminhoes) / len(dfs_caminhoes)
-        total_utilizacao= sum(utilizacoes)/len(utilizacoes)
+    derivados = obter_derivados()
+    resultados = derivados.resultados
+    agregados = derivados.agregados
+    if len(resultados):
+        resumo_frota = agregados.resumo()
+        total_df = resumo_frota["media"]["df"]
+        total_utilizacao = resumo_frota["media"]["utilizacao"]
     # Exibe a disponibilidade da frota em uma caixa com área sombreada
         st.markdown(
             f"""
@@ -296,121 +772,276 @@ with col2:
             """,
             unsafe_allow_html=True,
         )
-  
+        st.caption(
+            "Ponderadas pelas horas trabalhadas — DF: "
+            f"{resumo_frota['media_ponderada']['df']:.2f}%, utilização: "
+            f"{resumo_frota['media_ponderada']['utilizacao']:.2f}% | DF entre "
+            f"{resumo_frota['minimo']['df']:.2f}% e {resumo_frota['maximo']['df']:.2f}%"
+        )
+
+        # Resumo por modelo, lido dos agregados sem percorrer a frota
+        resumo_modelos = agregados.por_grupo()
+        if len(resumo_modelos) > 1 or "" not in resumo_modelos:
+            st.dataframe(
+                {
+                    "Modelo": [modelo or "(sem modelo)" for modelo in resumo_modelos],
+                    "Caminhões": [r["quantidade"] for r in resumo_modelos.values()],
+                    "DF (%)": [r["media"]["df"] for r in resumo_modelos.values()],
+                    "Utilização (%)": [r["media"]["utilizacao"] for r in resumo_modelos.values()],
+                    "Horas Trabalhadas": [
+                        r["soma"]["horas_trabalhadas"] for r in resumo_modelos.values()
+                    ],
+                },
+                hide_index=True,
+            )
+
+        # Exporta os dados e indicadores por caminhão; o CSV só é gerado no clique
+        def gerar_csv_resultados(resultados=resultados):
+            from importacao import exportar_resultados_csv
+
+            arquivo = io.BytesIO()
+            exportar_resultados_csv(resultados.frota, arquivo, resultados.indicadores)
+            return arquivo.getvalue()
+
+        st.markdown("<br>", unsafe_allow_html=True)
+        st.download_button(
+            "Exportar resultados (CSV)",
+            data=gerar_csv_resultados,
+            file_name="resultados_frota.csv",
+            mime="text/csv",
+        )
     else:
         st.write("**Nenhum dado de caminhão disponível.**")
 
-# Cria uma nova página
-def pagina_produtividade():
 
-    # Título da aba
-    st.title("Cálculo da Produtividade Horária da Mina")
+with col2:
+    exibir_resumo()
 
-    # Coleta os dados de entrada do usuário
-    st.header("Dados de Distância e Velocidade:")
-    distancia_horizontal = st.number_input("Distância Horizontal (metros):", min_value=0.0)
-    velocidade_horizontal_carregado = st.number_input(
-        "Velocidade Horizontal Carregado (km/h):", min_value=0.0
-    )
-    velocidade_horizontal_vazio = st.number_input(
-        "Velocidade Horizontal Vazio (km/h):", min_value=0.0
-    )
+# Simulação de Monte Carlo da disponibilidade
+marcar("Monte Carlo")
 
-    distancia_subida = st.number_input("Distância Subida (metros):", min_value=0.0)
-    velocidade_subida_carregado = st.number_input(
-        "Velocidade Subida Carregado (km/h):", min_value=0.0
-    )
-    velocidade_subida_vazio = st.number_input(
-        "Velocidade Subida Vazio (km/h):", min_value=0.0
-    )
 
-    distancia_descida = st.number_input("Distância Descida (metros):", min_value=0.0)
-    velocidade_descida_carregado = st.number_input(
-        "Velocidade Descida Carregado (km/h):", min_value=0.0
-    )
-    velocidade_descida_vazio = st.number_input(
-        "Velocidade Descida Vazio (km/h):", min_value=0.0
+def exibir_simulacao(simulacao, final):
+    """Tabela da simulação de Monte Carlo, com os caminhões já simulados."""
+    rotulos = [f"P{p}" for p in simulacao["percentis"]]
+    if final:
+        st.write(
+            "**Frota** — DF: "
+            + ", ".join(f"{r} {v:.2f}%" for r, v in zip(rotulos, simulacao["frota_df"]))
+            + " | Utilização: "
+            + ", ".join(f"{r} {v:.2f}%" for r, v in zip(rotulos, simulacao["frota_utilizacao"]))
+        )
+    tabela = {"Caminhão": simulacao["caminhoes"]}
+    for j, rotulo in enumerate(rotulos):
+        tabela[f"DF {rotulo} (%)"] = simulacao["df"][:, j]
+    for j, rotulo in enumerate(rotulos):
+        tabela[f"Utilização {rotulo} (%)"] = simulacao["utilizacao"][:, j]
+    st.dataframe(tabela, hide_index=True)
+
+
+@fragmento("monte_carlo")
+def exibir_monte_carlo():
+    with st.form("form_simulacao"):
+        col_simulacoes, col_semente = st.columns(2)
+        n_simulacoes = col_simulacoes.number_input(
+            "Quantidade de simulações", min_value=100, max_value=100_000, value=10_000, step=1_000
+        )
+        semente = col_semente.number_input("Semente", min_value=0, value=42, step=1)
+        simular = st.form_submit_button("Simular")
+
+    # A simulação roda em segundo plano; a tabela cresce a cada bloco de caminhões
+    resultados = obter_resultados()
+    if simular and len(resultados):
+        from simulacao import simular_disponibilidade_progressiva
+
+        iniciar_tarefa(
+            "monte_carlo",
+            ("monte_carlo", chave_frota(), int(n_simulacoes), int(semente)),
+            simular_disponibilidade_progressiva,
+            resultados.frota,
+            n_simulacoes=int(n_simulacoes),
+            semente=int(semente),
+            dependencias=chave_frota(),
+        )
+    acompanhar_tarefa(
+        "monte_carlo", exibir_simulacao, dependencias=chave_frota(), rotulo="Simulando"
     )
 
-    st.header("Dados do Caminhão:")
-    capacidade_caminhao = st.number_input(
-        "Capacidade do Caminhão (toneladas):", min_value=0.0
+
+with st.expander("Simulação de Monte Carlo (DF e utilização)"):
+    exibir_monte_carlo()
+
+# Curvas de DF e utilização ao longo do horizonte de planejamento
+marcar("Curvas por período")
+
+
+@fragmento("curvas")
+def exibir_curvas():
+    col_horizonte, col_periodo = st.columns(2)
+    anos_horizonte = col_horizonte.number_input(
+        "Horizonte (anos)", min_value=1, max_value=10, value=1, step=1
     )
-    fator_enchimento = st.number_input(
-        "Fator de Enchimento (%):", min_value=0.0, max_value=100.0
+    periodo = col_periodo.radio(
+        "Período", ["mes", "semana"], format_func={"mes": "Mês", "semana": "Semana"}.get,
+        horizontal=True,
     )
+    resultados = obter_resultados()
+    if len(resultados):
+        from serie_temporal import calcular_series_frota, curvas_frota
 
-    # Verifica se pelo menos uma distância ou velocidade é maior que zero
-    if any(
-        [
-            distancia_horizontal,
-            velocidade_horizontal_carregado,
-            velocidade_horizontal_vazio,
-            distancia_subida,
-            velocidade_subida_carregado,
-            velocidade_subida_vazio,
-            distancia_descida,
-            velocidade_descida_carregado,
-            velocidade_descida_vazio,
-        ]
-    ):
-        # Calcula os tempos de ciclo
-        tempo_horizontal_carregado = calcular_tempo_ciclo(
-            distancia_horizontal, velocidade_horizontal_carregado
-        )
-        tempo_horizontal_vazio = calcular_tempo_ciclo(
-            distancia_horizontal, velocidade_horizontal_vazio
-        )
-        tempo_subida_carregado = calcular_tempo_ciclo(
-            distancia_subida, velocidade_subida_carregado
-        )
-        tempo_subida_vazio = calcular_tempo_ciclo(
-            distancia_subida, velocidade_subida_vazio
-        )
-        tempo_descida_carregado = calcular_tempo_ciclo(
-            distancia_descida, velocidade_descida_carregado
+        i = indice_caminhao()
+        series = calcular_series_frota(resultados.frota, int(anos_horizonte), periodo)
+        curvas = curvas_frota(series)
+        gerar_grafico_linhas(
+            {
+                "DF da frota (%)": curvas["df"],
+                "Utilização da frota (%)": curvas["utilizacao"],
+                f"DF {resultados.caminhoes[i]} (%)": series["df"][i],
+            },
+            "Mês" if periodo == "mes" else "Semana",
         )
-        tempo_descida_vazio = calcular_tempo_ciclo(
-            distancia_descida, velocidade_descida_vazio
+        pendente = series["pendente"].sum()
+        st.caption(
+            f"Agregado do horizonte — DF: {series['total']['df'].mean():.2f}%, "
+            f"utilização: {series['total']['utilizacao'].mean():.2f}% (média dos caminhões)"
+            + (
+                f"; inclui {pendente:,.0f} h de paradas que passam do fim do horizonte"
+                if pendente > 0
+                else ""
+            )
         )
 
-        # Calcula o tempo total de ciclo
-        tempo_ciclo_total = calcular_tempo_ciclo_total(
-            tempo_horizontal_carregado + tempo_horizontal_vazio,
-            tempo_subida_carregado + tempo_subida_vazio,
-            tempo_descida_carregado + tempo_descida_vazio,
-        )
 
-        # Calcula a capacidade líquida do caminhão
-        capacidade_liquida = calcular_capacidade_liquida(
-            capacidade_caminhao, fator_enchimento
-        )
+with st.expander("Curvas de DF e utilização por período"):
+    exibir_curvas()
+
+
+# Análise de sensibilidade calculada em segundo plano
+def exibir_varredura(varredura, final):
+    """Gráfico da análise de sensibilidade, com os pontos já calculados."""
+    combinacoes, valores = varredura
+    st.line_chart(
+        {
+            "Taxa Corretiva (%)": combinacoes["taxa_corretiva"] * 100,
+            "DF (%)": valores["df"],
+            "Utilização (%)": valores["utilizacao"],
+        },
+        x="Taxa Corretiva (%)",
+    )
+
 
-        # Calcula a produtividade horária
-        produtividade_horaria = calcular_produtividade_horaria(
-            capacidade_liquida, tempo_ciclo_total
+@fragmento("sensibilidade")
+def exibir_sensibilidade():
+    with st.form("form_sensibilidade"):
+        faixa_taxa = st.slider("Faixa da Taxa Corretiva (%)", 0, 100, (0, 50))
+        pontos = st.number_input("Quantidade de pontos", min_value=2, max_value=1_000, value=51)
+        analisar = st.form_submit_button("Analisar")
+
+    resultados = obter_resultados()
+    if analisar and len(resultados):
+        from sensibilidade import avaliador_frota, varredura_progressiva
+
+        iniciar_tarefa(
+            "sensibilidade",
+            ("sensibilidade", chave_frota(), faixa_taxa, int(pontos)),
+            varredura_progressiva,
+            avaliador_frota(resultados.frota),
+            {"taxa_corretiva": np.linspace(faixa_taxa[0] / 100, faixa_taxa[1] / 100, int(pontos))},
+            # Lotes pequenos para o gráfico ser atualizado enquanto a varredura avança
+            tamanho_lote=max(int(pontos) // PARTES_VARREDURA, 1),
+            dependencias=chave_frota(),
         )
+    acompanhar_tarefa("sensibilidade", exibir_varredura, dependencias=chave_frota())
 
-        # Exibe os resultados
-        st.header("Resultados:")
-        st.write(
-            f"Tempo de Ciclo Horizontal Carregado: {tempo_horizontal_carregado:.2f} minutos"
+
+marcar("Sensibilidade")
+with st.expander("Análise de sensibilidade (taxa corretiva)"):
+    exibir_sensibilidade()
+
+# Valor de um campo que atinge uma meta de DF ou utilização (metas.py)
+marcar("Metas")
+
+
+def aplicar_meta():
+    """Grava na frota os valores viáveis encontrados para a meta."""
+    campo, meta = st.session_state.meta["campo"], st.session_state.meta["resultado"]
+    n = st.session_state.num_caminhoes
+    valores = np.broadcast_to(meta["valor"], n)
+    for i in np.flatnonzero(np.isfinite(valores)):
+        st.session_state.frota.alterar(int(i), campo, valores[i])
+    st.session_state.pop("meta")
+    frota_alterada()
+
+
+@fragmento("metas")
+def exibir_metas():
+    rotulos = {CATALOGO.campo_corretiva: "Taxa corretiva"}
+    rotulos.update({p["campo"]: p["nome"] for p in CATALOGO.paradas if p["campo"]})
+    with st.form("form_metas"):
+        col_campo, col_indicador, col_alvo, col_escopo = st.columns(4)
+        campo = col_campo.selectbox("Calcular", list(rotulos), format_func=rotulos.get)
+        indicador = col_indicador.radio(
+            "Meta de", ["df", "utilizacao"], format_func={"df": "DF", "utilizacao": "Utilização"}.get,
+            horizontal=True,
         )
-        st.write(
-            f"Tempo de Ciclo Horizontal Vazio: {tempo_horizontal_vazio:.2f} minutos"
+        alvo = col_alvo.number_input("Meta (%)", min_value=0.0, max_value=100.0, value=88.0, step=0.5)
+        escopo = col_escopo.radio(
+            "Valor", ["caminhao", "frota"],
+            format_func={"caminhao": "Por caminhão", "frota": "Único para a frota"}.get,
         )
-        st.write(f"Tempo de Ciclo Subida Carregado: {tempo_subida_carregado:.2f} minutos")
-        st.write(f"Tempo de Ciclo Subida Vazio: {tempo_subida_vazio:.2f} minutos")
+        calcular = st.form_submit_button("Calcular")
+
+    resultados = obter_resultados()
+    if calcular and len(resultados):
+        from metas import resolver_meta
+
+        st.session_state.meta = {
+            "chave": chave_frota(),
+            "campo": campo,
+            "escopo": escopo,
+            "resultado": resolver_meta(resultados.frota, campo, indicador, alvo, escopo),
+        }
+    meta = st.session_state.get("meta")
+    if meta is None or meta["chave"] != chave_frota():
+        return
+
+    resultado = meta["resultado"]
+    escala = 100 if meta["campo"] == CATALOGO.campo_corretiva else 1
+    if meta["escopo"] == "frota":
+        if not resultado["viavel"]:
+            st.warning("A meta não é atingível na média da frota com os limites do campo.")
+            return
+        valor = resultado["valor"]
         st.write(
-            f"Tempo de Ciclo Descida Carregado: {tempo_descida_carregado:.2f} minutos"
+            f"**{rotulos[meta['campo']]}**: "
+            + (f"{valor * escala:g}" if np.isfinite(valor) else "qualquer valor atende")
+            + f" para todos os caminhões (média obtida: {resultado['indicador'].mean():.2f}%)"
         )
-        st.write(f"Tempo de Ciclo Descida Vazio: {tempo_descida_vazio:.2f} minutos")
-        st.write(f"Tempo Total de Ciclo: {tempo_ciclo_total:.2f} minutos")
-        st.write(f"Capacidade Líquida do Caminhão: {capacidade_liquida:.2f} toneladas")
-        st.write(f"Produtividade Horária da Mina: {produtividade_horaria:.2f} Ton/h")
-
     else:
-        st.error(
-            "Pelo menos uma distância ou velocidade deve ser maior que zero. Verifique os dados de entrada."
+        viaveis = int(resultado["viavel"].sum())
+        st.write(f"Meta atingível em {viaveis} de {len(resultado['viavel'])} caminhões.")
+        st.dataframe(
+            {
+                "Caminhão": resultados.caminhoes,
+                "Atual": resultados.frota[meta["campo"]] * escala,
+                "Necessário": resultado["valor"] * escala,
+                "Indicador obtido (%)": resultado["indicador"],
+            },
+            hide_index=True,
         )
+    st.button("Aplicar à frota", on_click=aplicar_meta)
+
+
+with st.expander("Metas de DF e utilização"):
+    exibir_metas()
+
+# Análises em segundo plano de todas as sessões
+estatisticas_tarefas = obter_executor_tarefas().estatisticas()
+st.sidebar.caption(
+    f"Análises em segundo plano: {estatisticas_tarefas['em_andamento']} em andamento, "
+    f"{estatisticas_tarefas['submetidas']} submetidas, "
+    f"{estatisticas_tarefas['deduplicadas']} reaproveitadas"
+)
 
+# Painel de instrumentação, com as medições de toda a execução acima
+exibir_instrumentacao()
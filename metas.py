@@ -0,0 +1,220 @@
+import numpy as np
+
+from catalogo_paradas import DIAS_PROGRAMADOS, HORAS_DIA, CATALOGO
+from frota import CAMPOS_CAMINHAO, calcular_indicadores_frota
+
+# Busca do valor de um campo da frota que atinge uma meta de DF ou utilização.
+#
+# Com os demais campos fixos, o tempo parado T e as horas não utilizadas L de
+# um caminhão são lineares em qualquer campo do catálogo (ver
+# catalogo_paradas.py): DF = 1 - T / horas do ano e utilização = 1 - L / (horas
+# do ano - T). Para um caminhão, as duas metas viram equações lineares no campo
+# e têm solução fechada; o mesmo vale para a DF média da frota com um valor
+# único do campo. Só a utilização média da frota com um valor único não é
+# linear e é resolvida por bissecção.
+
+HORAS_ANO = DIAS_PROGRAMADOS * HORAS_DIA
+
+INDICADORES_META = ("df", "utilizacao")
+
+# Iterações da bissecção: reduzem o intervalo inicial em 2**-ITERACOES_BISSECCAO
+ITERACOES_BISSECCAO = 80
+
+
+def limites_campo(campo, catalogo=None):
+    """
+    Faixa válida de um campo, a mesma da validação da importação.
+
+    Returns:
+      Tupla (mínimo, máximo); quantidades não têm máximo.
+    """
+    if campo == (catalogo or CATALOGO).campo_corretiva:
+        return 0.0, 1.0
+    if campo.startswith("qtd_"):
+        return 0.0, np.inf
+    return 0.0, 100.0
+
+
+def _coeficientes(campo, catalogo):
+    """
+    Derivadas do tempo de manutenção (sem corretivas) e das horas não
+    utilizadas em relação a um campo comum do catálogo.
+    """
+    if campo not in catalogo.campos:
+        return 0.0, 0.0
+    j = catalogo.campos.index(campo)
+    return float(catalogo.coeficientes[0, j]), float(catalogo.coeficientes[1, j])
+
+
+def _resolver_caminhoes(frota, campo, indicador, alvo, catalogo):
+    """
+    Solução fechada por caminhão, sem limites nem arredondamento.
+
+    Returns:
+      Array com o valor do campo que leva cada caminhão exatamente à meta;
+      NaN quando o campo não altera o indicador do caminhão.
+    """
+    paradas = catalogo.avaliar(frota)
+    manutencao = paradas["tempo_manutencao"]
+    hnu = paradas["horas_nao_utilizadas"]
+    atual = np.asarray(frota[campo], dtype=np.float64)
+    alvo = alvo / 100
+
+    if campo == catalogo.campo_corretiva:
+        # T = manutenção * (1 + taxa); as horas não utilizadas não dependem da taxa
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if indicador == "df":
+                tempo_parado = HORAS_ANO * (1 - alvo)
+            else:
+                # Meta de 100%: inatingível com perdas (-inf), sem efeito sem elas (NaN)
+                tempo_parado = HORAS_ANO - hnu / (1 - alvo)
+            return np.where(manutencao > 0, tempo_parado / manutencao - 1, np.nan)
+
+    fator = 1 + np.asarray(frota[catalogo.campo_corretiva], dtype=np.float64)
+    tempo_parado = manutencao * fator
+    a, b = _coeficientes(campo, catalogo)
+    # Variação do campo: T = tempo_parado + a * fator * delta e L = hnu + b * delta
+    if indicador == "df":
+        numerador = HORAS_ANO * (1 - alvo) - tempo_parado
+        denominador = a * fator
+    else:
+        # L = (1 - alvo) * (horas do ano - T), linear em delta
+        numerador = (1 - alvo) * (HORAS_ANO - tempo_parado) - hnu
+        denominador = b + (1 - alvo) * a * fator
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominador > 0, atual + numerador / denominador, np.nan)
+
+
+def _indicador_medio(frota, campo, valores, indicador, catalogo):
+    """Média do indicador na frota para cada valor comum do campo em valores."""
+    colunas = {nome: np.asarray(frota[nome], dtype=np.float64)[:, None] for nome in CAMPOS_CAMINHAO}
+    colunas[campo] = np.asarray(valores, dtype=np.float64)[None, :]
+    return calcular_indicadores_frota(colunas, catalogo)[indicador].mean(axis=0)
+
+
+def _bisseccao(funcao, minimo, maximo, alvo):
+    """
+    Bissecção de uma função decrescente em [minimo, maximo].
+
+    Returns:
+      Maior valor encontrado com funcao(valor) >= alvo, a menos da tolerância
+      do intervalo final.
+    """
+    for _ in range(ITERACOES_BISSECCAO):
+        meio = (minimo + maximo) / 2
+        if meio in (minimo, maximo):
+            break
+        if funcao(np.array([meio]))[0] >= alvo:
+            minimo = meio
+        else:
+            maximo = meio
+    return minimo
+
+
+def _resolver_frota(frota, campo, indicador, alvo, catalogo, maximo):
+    """
+    Valor comum do campo para todos os caminhões que leva a média do
+    indicador na frota à meta, sem limites nem arredondamento.
+
+    Returns:
+      Tupla (valor, método). O valor é NaN quando o campo não altera o
+      indicador; inf quando a meta é atendida com qualquer valor.
+    """
+    def media(valores):
+        return _indicador_medio(frota, campo, valores, indicador, catalogo)
+
+    if indicador == "df":
+        # A DF média é linear no valor comum: dois pontos determinam a reta
+        em_zero, em_um = media(np.array([0.0, 1.0]))
+        inclinacao = em_um - em_zero
+        if inclinacao >= 0:
+            return np.nan, "fechada"
+        return (alvo - em_zero) / inclinacao, "fechada"
+
+    # A utilização média é decrescente no valor comum: bissecção sobre um
+    # intervalo que contém a meta, dobrado até contê-la quando não há máximo
+    minimo = 0.0
+    if media(np.array([minimo]))[0] < alvo:
+        return -np.inf, "bisseccao"
+    superior = maximo if np.isfinite(maximo) else max(1.0, float(np.max(frota[campo], initial=0)))
+    while media(np.array([superior]))[0] >= alvo:
+        if np.isfinite(maximo) or superior > 1e12:
+            return np.inf, "bisseccao"
+        superior *= 2
+    return _bisseccao(media, minimo, superior, alvo), "bisseccao"
+
+
+def resolver_meta(frota, campo, indicador, alvo, escopo="caminhao", catalogo=None):
+    """
+    Calcula o valor de um campo que atinge uma meta de DF ou de utilização,
+    com os demais campos de cada caminhão fixos.
+
+    Os indicadores diminuem quando qualquer campo do catálogo aumenta, então o
+    valor encontrado é o maior que ainda atende a meta: por exemplo a maior
+    taxa corretiva ou a maior quantidade de preventivas com DF de pelo menos
+    88%. Quantidades são arredondadas para baixo.
+
+    Args:
+      frota: Array estruturado da frota (DTYPE_FROTA).
+      campo: Campo a calcular: a taxa corretiva ou um campo do catálogo.
+      indicador: "df" ou "utilizacao".
+      alvo: Meta do indicador, em porcentagem.
+      escopo: "caminhao" para um valor por caminhão, cada um com a meta; ou
+        "frota" para um valor único, aplicado a todos, com a meta na média.
+      catalogo: CatalogoParadas a usar. Padrão: o de paradas.toml.
+
+    Returns:
+      Dicionário com "valor" (array por caminhão ou número para a frota),
+      "viavel" (se a meta é atingível dentro dos limites do campo; quando não
+      é, o valor é NaN), "indicador" (o indicador obtido com o valor, por
+      caminhão) e "metodo" ("fechada" ou "bisseccao").
+
+    Raises:
+      ValueError: Se o campo, o indicador ou o escopo forem inválidos.
+    """
+    catalogo = catalogo or CATALOGO
+    if indicador not in INDICADORES_META:
+        raise ValueError(f"Indicador deve ser um de {', '.join(INDICADORES_META)}")
+    if campo != catalogo.campo_corretiva and campo not in catalogo.campos:
+        raise ValueError(f"Campo sem efeito nos indicadores: {campo}")
+    if escopo not in ("caminhao", "frota"):
+        raise ValueError("Escopo deve ser \"caminhao\" ou \"frota\"")
+    if not 0 <= alvo <= 100:
+        raise ValueError("A meta deve estar entre 0 e 100%")
+
+    minimo, maximo = limites_campo(campo, catalogo)
+    if escopo == "frota":
+        valor, metodo = _resolver_frota(frota, campo, indicador, alvo, catalogo, maximo)
+        valores = np.array([valor])
+    else:
+        valores = _resolver_caminhoes(frota, campo, indicador, alvo, catalogo)
+        metodo = "fechada"
+
+    # Sem efeito no indicador (NaN): atende com qualquer valor ou com nenhum
+    indicador_atual = calcular_indicadores_frota(frota, catalogo)[indicador]
+    if escopo == "frota":
+        indicador_atual = np.array([indicador_atual.mean()])
+    atende = indicador_atual >= alvo
+    valores = np.where(np.isnan(valores), np.where(atende, np.inf, -np.inf), valores)
+
+    viavel = valores >= minimo
+    valores = np.minimum(valores, maximo)
+    if campo.startswith("qtd_"):
+        valores = np.floor(valores + 1e-9)
+    valores = np.where(viavel, valores, np.nan)
+
+    # Indicador obtido com os valores encontrados (os atuais onde não é viável
+    # ou onde qualquer valor atende)
+    colunas = {nome: frota[nome] for nome in CAMPOS_CAMINHAO}
+    aplicar = viavel & np.isfinite(valores)
+    colunas[campo] = np.where(aplicar, valores, np.asarray(frota[campo], dtype=np.float64))
+    obtido = calcular_indicadores_frota(colunas, catalogo)[indicador]
+
+    if escopo == "frota":
+        return {
+            "valor": float(valores[0]),
+            "viavel": bool(viavel[0]),
+            "indicador": obtido,
+            "metodo": metodo,
+        }
+    return {"valor": valores, "viavel": viavel, "indicador": obtido, "metodo": metodo}
@@ -0,0 +1,231 @@
+import math
+
+import numpy as np
+
+from frota import calcular_indicadores_frota
+from rotas import calcular_ciclo_rotas
+
+# Limite de nós da busca; acima dele retorna a melhor solução encontrada até então
+LIMITE_NOS_BUSCA = 200_000
+
+
+def toneladas_por_caminhao(
+    horas_trabalhadas, capacidade_liquida, segmentos, participacao=None, ciclo=None
+):
+    """
+    Calcula a produção anual (toneladas) de um caminhão de cada tipo no conjunto de rotas.
+
+    O caminhão atende as rotas na proporção da participação de cada uma na
+    produção, então a produtividade efetiva é a média harmônica ponderada das
+    produtividades de cada rota (Ton/h, como em calcular_produtividade_horaria).
+
+    Args:
+      horas_trabalhadas: Horas trabalhadas por ano de cada tipo (ver
+        calcular_utilizacao), um valor por tipo.
+      capacidade_liquida: Capacidade líquida de cada tipo em toneladas.
+      segmentos: Tabela de segmentos das rotas (ver rotas.py).
+      participacao: Fração da produção em cada rota, na ordem de
+        calcular_ciclo_rotas. Padrão: partes iguais.
+      ciclo: Ciclo já calculado, com "tempo_ciclo" e "valida" de cada tipo em
+        cada rota (ver perfis_modelo.calcular_ciclo_perfis). Padrão: o de
+        calcular_ciclo_rotas, o mesmo para todos os tipos.
+
+    Returns:
+      Tupla (toneladas por caminhão por ano, produtividade efetiva em Ton/h),
+      um valor por tipo. Tipos que não conseguem atender alguma rota com
+      participação positiva produzem zero.
+    """
+    horas_trabalhadas = np.atleast_1d(np.asarray(horas_trabalhadas, dtype=np.float64))
+    capacidade_liquida = np.atleast_1d(np.asarray(capacidade_liquida, dtype=np.float64))
+    if ciclo is None:
+        ciclo = calcular_ciclo_rotas(segmentos)
+    n_rotas = len(ciclo["rotas"])
+
+    if participacao is None:
+        participacao = np.full(n_rotas, 1.0 / n_rotas if n_rotas else 0.0)
+    participacao = np.asarray(participacao, dtype=np.float64)
+    if participacao.sum() > 0:
+        participacao = participacao / participacao.sum()
+
+    # Horas por tonelada de cada tipo em cada rota: tempo de ciclo / (60 * capacidade)
+    tempo_ciclo = np.atleast_2d(ciclo["tempo_ciclo"])
+    atende = np.atleast_2d(ciclo["valida"]) & (tempo_ciclo > 0)
+    horas_por_tonelada = np.full((len(capacidade_liquida), n_rotas), np.inf)
+    np.divide(
+        tempo_ciclo,
+        capacidade_liquida[:, None] * 60,
+        out=horas_por_tonelada,
+        where=atende & (capacidade_liquida[:, None] > 0),
+    )
+    usadas = participacao > 0
+    horas_por_tonelada_mix = (horas_por_tonelada[:, usadas] * participacao[usadas]).sum(axis=1)
+
+    produtividade = np.zeros_like(horas_por_tonelada_mix)
+    np.divide(
+        1.0,
+        horas_por_tonelada_mix,
+        out=produtividade,
+        where=np.isfinite(horas_por_tonelada_mix) & (horas_por_tonelada_mix > 0),
+    )
+    return np.maximum(horas_trabalhadas, 0.0) * produtividade, produtividade
+
+
+def _limite_linear(ordem, toneladas, custos, limites, inicio, restante):
+    """Custo mínimo da relaxação linear para produzir 'restante' com os tipos ordem[inicio:]."""
+    custo = 0.0
+    for k in ordem[inicio:]:
+        if restante <= 0:
+            return custo
+        quantidade = min(limites[k], restante / toneladas[k])
+        custo += quantidade * custos[k]
+        restante -= quantidade * toneladas[k]
+    return custo if restante <= 1e-9 else math.inf
+
+
+def otimizar_frota(meta_toneladas, toneladas, custos=None, limites=None, nomes=None):
+    """
+    Encontra a frota de menor custo (por padrão, a menor quantidade de caminhões)
+    que atinge a meta anual de produção.
+
+    Parte do limite fechado da relaxação linear, em que os tipos são usados em
+    ordem de custo por tonelada, e refina com uma busca limitada (branch and
+    bound) sobre as quantidades inteiras de cada tipo.
+
+    Args:
+      meta_toneladas: Produção anual desejada em toneladas.
+      toneladas: Produção anual de um caminhão de cada tipo (ver
+        toneladas_por_caminhao).
+      custos: Custo de cada tipo de caminhão. Padrão: 1 por caminhão.
+      limites: Quantidade máxima disponível de cada tipo. Padrão: sem limite.
+      nomes: Nome de cada tipo, usado na composição retornada.
+
+    Returns:
+      Dicionário com "composicao" (tipo -> quantidade), "quantidade_total",
+      "toneladas", "custo", "limite_inferior" (custo da relaxação linear),
+      "viavel" e "otimo" (False se a busca foi interrompida pelo limite de nós).
+    """
+    toneladas = np.atleast_1d(np.asarray(toneladas, dtype=np.float64))
+    n_tipos = len(toneladas)
+    custos = np.ones(n_tipos) if custos is None else np.asarray(custos, dtype=np.float64)
+    if limites is None:
+        limites = np.full(n_tipos, np.inf)
+    limites = np.asarray(limites, dtype=np.float64)
+    if nomes is None:
+        nomes = [f"Tipo {k + 1}" for k in range(n_tipos)]
+
+    def resultado(quantidades, limite_inferior, viavel, otimo):
+        quantidades = np.asarray(quantidades, dtype=np.int64)
+        return {
+            "composicao": {nome: int(n) for nome, n in zip(nomes, quantidades)},
+            "quantidade_total": int(quantidades.sum()),
+            "toneladas": float(quantidades @ toneladas),
+            "custo": float(quantidades @ custos),
+            "limite_inferior": float(limite_inferior),
+            "viavel": viavel,
+            "otimo": otimo,
+        }
+
+    if meta_toneladas <= 0:
+        return resultado(np.zeros(n_tipos), 0.0, True, True)
+
+    # Apenas tipos que produzem algo participam, do menor para o maior custo por tonelada
+    produtivos = np.flatnonzero(toneladas > 0)
+    ordem = produtivos[np.argsort(custos[produtivos] / toneladas[produtivos], kind="stable")]
+
+    if np.sum(limites[ordem] * toneladas[ordem]) < meta_toneladas:
+        quantidades = np.zeros(n_tipos)
+        quantidades[ordem] = limites[ordem]
+        return resultado(quantidades, math.inf, False, True)
+
+    limite_inferior = _limite_linear(ordem, toneladas, custos, limites, 0, meta_toneladas)
+
+    # Solução inicial: a relaxação linear arredondada para cima, tipo a tipo
+    melhor = np.zeros(n_tipos)
+    restante = meta_toneladas
+    for k in ordem:
+        if restante <= 0:
+            break
+        melhor[k] = min(limites[k], math.ceil(restante / toneladas[k]))
+        restante -= melhor[k] * toneladas[k]
+    melhor_custo = float(melhor @ custos)
+
+    # Com custos inteiros (o padrão), o custo de qualquer solução também é inteiro
+    custos_inteiros = bool(np.all(custos == np.round(custos)))
+
+    atual = np.zeros(n_tipos)
+    nos = 0
+    interrompida = False
+
+    def buscar(posicao, restante, custo):
+        nonlocal melhor, melhor_custo, nos, interrompida
+        nos += 1
+        if nos > LIMITE_NOS_BUSCA:
+            interrompida = True
+            return
+        if restante <= 1e-9:
+            if custo < melhor_custo - 1e-9:
+                melhor, melhor_custo = atual.copy(), custo
+            return
+        if posicao == len(ordem):
+            return
+
+        k = ordem[posicao]
+        maximo = int(min(limites[k], math.ceil(restante / toneladas[k])))
+        for quantidade in range(maximo, -1, -1):
+            novo_custo = custo + quantidade * custos[k]
+            novo_restante = restante - quantidade * toneladas[k]
+            limite = novo_custo + _limite_linear(
+                ordem, toneladas, custos, limites, posicao + 1, novo_restante
+            )
+            if custos_inteiros and limite < math.inf:
+                limite = math.ceil(limite - 1e-9)
+            if limite >= melhor_custo - 1e-9:
+                if novo_restante <= 0:
+                    continue
+                # Enquanto falta produção, menos caminhões deste tipo só a transferem
+                # para tipos com custo por tonelada maior: o limite não diminui mais
+                break
+            atual[k] = quantidade
+            buscar(posicao + 1, novo_restante, novo_custo)
+            if interrompida:
+                break
+        atual[k] = 0
+
+    buscar(0, meta_toneladas, 0.0)
+    return resultado(melhor, limite_inferior, True, not interrompida)
+
+
+def dimensionar_frota(
+    meta_toneladas,
+    tipos,
+    capacidade_liquida,
+    segmentos,
+    participacao=None,
+    custos=None,
+    limites=None,
+):
+    """
+    Dimensiona a frota mínima para a meta anual a partir dos dados de cada tipo
+    de caminhão.
+
+    Args:
+      meta_toneladas: Produção anual desejada em toneladas.
+      tipos: Array estruturado no formato da frota (ver frota.py), uma linha por
+        tipo de caminhão; o campo "caminhao" é o nome do tipo.
+      capacidade_liquida: Capacidade líquida de cada tipo em toneladas.
+      segmentos: Tabela de segmentos das rotas (ver rotas.py).
+      participacao, custos, limites: Como em toneladas_por_caminhao e otimizar_frota.
+
+    Returns:
+      O dicionário de otimizar_frota acrescido de "toneladas_por_caminhao" e
+      "produtividade" (Ton/h efetiva) por tipo.
+    """
+    horas_trabalhadas = calcular_indicadores_frota(tipos)["horas_trabalhadas"]
+    toneladas, produtividade = toneladas_por_caminhao(
+        horas_trabalhadas, capacidade_liquida, segmentos, participacao
+    )
+    nomes = tipos["caminhao"].tolist()
+    resultado = otimizar_frota(meta_toneladas, toneladas, custos, limites, nomes)
+    resultado["toneladas_por_caminhao"] = dict(zip(nomes, toneladas.tolist()))
+    resultado["produtividade"] = dict(zip(nomes, produtividade.tolist()))
+    return resultado
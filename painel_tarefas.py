@@ -0,0 +1,106 @@
+import streamlit as st
+
+from tarefas import CANCELADA, CONCLUIDA, ERRO, ExecutorTarefas
+
+# Tarefas executadas ao mesmo tempo no processo, somando todas as sessões
+TAREFAS_SIMULTANEAS = 2
+
+# Intervalo, em segundos, entre as consultas ao progresso de uma tarefa em andamento
+INTERVALO_CONSULTA = 0.5
+
+
+@st.cache_resource
+def obter_executor_tarefas():
+    """Executor de tarefas compartilhado por todas as sessões (ver tarefas.py)."""
+    return ExecutorTarefas(max_workers=TAREFAS_SIMULTANEAS)
+
+
+def _tarefas_sessao():
+    # nome -> (Tarefa, dependências) das análises desta sessão
+    return st.session_state.setdefault("tarefas", {})
+
+
+def descartar_tarefa(nome):
+    """Esquece a tarefa da sessão, cancelando-a se nenhuma outra sessão a usa."""
+    registro = _tarefas_sessao().pop(nome, None)
+    if registro is not None:
+        obter_executor_tarefas().liberar(registro[0])
+
+
+def iniciar_tarefa(nome, chave, funcao, *args, dependencias=None, **kwargs):
+    """
+    Executa uma análise em segundo plano como a tarefa "nome" da sessão.
+
+    Se a sessão já tem essa tarefa com a mesma chave, nada muda; senão a
+    anterior é descartada e a nova é submetida (ou reaproveitada, se outra
+    sessão já pediu a mesma chave).
+
+    Args:
+      nome: Nome da tarefa na sessão, o mesmo de acompanhar_tarefa.
+      chave: Identificação de todas as entradas da análise.
+      funcao: Função geradora da tarefa (ver tarefas.py).
+      dependencias: Valor conferido por acompanhar_tarefa; quando muda, a
+        tarefa é descartada, por exemplo ao alterar a frota analisada.
+      *args, **kwargs: Argumentos de funcao.
+    """
+    registro = _tarefas_sessao().get(nome)
+    if registro is not None and registro[0].chave == chave and registro[0].estado not in (CANCELADA, ERRO):
+        return
+    descartar_tarefa(nome)
+    tarefa = obter_executor_tarefas().submeter(chave, funcao, *args, **kwargs)
+    _tarefas_sessao()[nome] = (tarefa, dependencias)
+
+
+def acompanhar_tarefa(nome, exibir, dependencias=None, rotulo="Calculando"):
+    """
+    Exibe o progresso e o resultado, parcial ou final, da tarefa "nome".
+
+    Enquanto a tarefa roda, só este trecho da página é reexecutado a cada
+    INTERVALO_CONSULTA segundos; ao terminar, uma execução completa encerra
+    a consulta.
+
+    Args:
+      nome: Nome da tarefa em iniciar_tarefa.
+      exibir: Função exibir(dados, final) chamada com o resultado parcial
+        (final=False) ou o completo (final=True).
+      dependencias: Valor atual das dependências; diferente do informado em
+        iniciar_tarefa, descarta a tarefa.
+      rotulo: Texto da barra de progresso.
+    """
+    registro = _tarefas_sessao().get(nome)
+    if registro is None:
+        return
+    tarefa, dependencias_tarefa = registro
+    if dependencias != dependencias_tarefa:
+        descartar_tarefa(nome)
+        return
+    em_andamento = not tarefa.concluida()
+
+    def acompanhar():
+        situacao = tarefa.situacao()
+        descartada = _tarefas_sessao().get(nome) is not registro
+        if em_andamento and (descartada or situacao["estado"] in (CONCLUIDA, CANCELADA, ERRO)):
+            st.rerun()
+        if descartada:
+            return
+
+        if situacao["estado"] == ERRO:
+            st.error(f"Erro na análise: {situacao['erro']}")
+        elif situacao["estado"] == CANCELADA:
+            st.info("Análise cancelada.")
+        elif situacao["estado"] == CONCLUIDA:
+            st.caption(f"Calculado em {situacao['segundos']:.1f} s")
+        else:
+            col_progresso, col_cancelar = st.columns([4, 1])
+            col_progresso.progress(
+                situacao["progresso"],
+                text=f"{rotulo}... {situacao['progresso']:.0%} ({situacao['segundos']:.1f} s)",
+            )
+            col_cancelar.button("Cancelar", key=f"cancelar_tarefa_{nome}", on_click=descartar_tarefa, args=(nome,))
+
+        final = situacao["estado"] == CONCLUIDA
+        dados = situacao["resultado"] if final else situacao["parcial"]
+        if dados is not None:
+            exibir(dados, final)
+
+    st.fragment(acompanhar, run_every=INTERVALO_CONSULTA if em_andamento else None)()
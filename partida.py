@@ -0,0 +1,178 @@
+"""
+Partida do servidor do dashboard com o processo aquecido.
+
+Um processo novo (depois de um deploy ou num pod recém-criado) pagaria na
+primeira sessão as importações das bibliotecas pesadas e o primeiro uso do
+Matplotlib (fontes, glifos e renderizador). Iniciado por este script, o
+servidor faz esse trabalho numa thread de fundo enquanto sobe, antes de a
+primeira sessão chegar. Com "streamlit run main.py" não há aquecimento: feito
+durante a primeira sessão, ele só disputaria o GIL com a página.
+
+Exemplos:
+  python partida.py --preparar                 # na construção da imagem
+  python partida.py --server.port 8501         # no lugar de streamlit run main.py
+
+--preparar compila o bytecode do app e cria o cache de fontes do Matplotlib,
+que num contêiner novo seriam gerados na primeira sessão. O benchmark mede a
+primeira execução de cada página num processo novo contra ORCAMENTO_PARTIDA
+(grupo "partida" de benchmark.py).
+"""
+import compileall
+import importlib
+import os
+import sys
+import threading
+import time
+
+DIRETORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Orçamento, em segundos, da primeira execução de cada página num servidor
+# iniciado por este script: as importações de main.py e a execução completa
+ORCAMENTO_PARTIDA = {
+    "dimensionamento": 0.8,
+    "produtividade": 0.5,
+}
+
+# Módulos importados pelas páginas, inclusive os que main.py só importa
+# quando a página é aberta
+MODULOS_APP = [
+    "cache_indicadores",
+    "cenarios",
+    "editor_frota",
+    "frota_compartilhada",
+    "graficos",
+    "importacao",
+    "metas",
+    "painel_tarefas",
+    "produtividade",
+    "sensibilidade",
+    "serie_temporal",
+    "simulacao",
+]
+
+_aquecimento = None
+_trava = threading.Lock()
+
+
+class Aquecimento:
+    """
+    Executa as etapas de aquecimento em sequência numa thread de fundo.
+
+    Cada etapa é uma função sem argumentos. Uma etapa que falha não interrompe
+    as seguintes; o erro fica em "erros", e a sessão que precisar do recurso o
+    prepara por conta própria, como sem aquecimento.
+
+    Args:
+      etapas: Lista de tuplas (nome, função).
+    """
+
+    def __init__(self, etapas):
+        self.etapas = list(etapas)
+        self.tempos = {}
+        self.erros = {}
+        self.fim = None
+        self._thread = threading.Thread(target=self._executar, name="aquecimento", daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def _executar(self):
+        for nome, funcao in self.etapas:
+            inicio = time.perf_counter()
+            try:
+                funcao()
+            except Exception as erro:
+                self.erros[nome] = erro
+            self.tempos[nome] = time.perf_counter() - inicio
+        self.fim = time.perf_counter()
+
+    def concluido(self):
+        return self.fim is not None
+
+    def aguardar(self, tempo_limite=None):
+        """Espera o fim do aquecimento; retorna se ele terminou."""
+        self._thread.join(tempo_limite)
+        return self.concluido()
+
+
+def _aguardar_servidor(tempo_limite=10):
+    """
+    Espera o runtime do Streamlit ser criado. Os decoradores de cache dos
+    módulos do app registram um aviso quando importados antes dele.
+    """
+    from streamlit import runtime
+
+    limite = time.perf_counter() + tempo_limite
+    while not runtime.exists() and time.perf_counter() < limite:
+        time.sleep(0.01)
+
+
+def _importar_modulos():
+    for modulo in MODULOS_APP:
+        importlib.import_module(modulo)
+
+
+def _aquecer_graficos():
+    from graficos import aquecer_graficos
+
+    aquecer_graficos()
+
+
+def aquecer(servidor=False):
+    """
+    Inicia o aquecimento do processo, uma única vez por processo.
+
+    Args:
+      servidor: Se o servidor do Streamlit está subindo neste processo; o
+        aquecimento começa quando o runtime dele existir.
+
+    Returns:
+      O Aquecimento do processo, possivelmente ainda em andamento.
+    """
+    global _aquecimento
+    with _trava:
+        if _aquecimento is None:
+            etapas = [("Módulos do app", _importar_modulos), ("Matplotlib", _aquecer_graficos)]
+            if servidor:
+                etapas.insert(0, ("Servidor", _aguardar_servidor))
+            _aquecimento = Aquecimento(etapas).iniciar()
+        return _aquecimento
+
+
+def aquecimento_processo():
+    """O Aquecimento iniciado por aquecer() neste processo, ou None."""
+    return _aquecimento
+
+
+def preparar(diretorio=DIRETORIO):
+    """
+    Gera o que um contêiner novo criaria na primeira sessão: o bytecode dos
+    módulos do app e o cache de fontes do Matplotlib (no MPLCONFIGDIR).
+
+    Returns:
+      True se todos os módulos compilaram.
+    """
+    compilado = compileall.compile_dir(diretorio, maxlevels=0, quiet=1)
+    import matplotlib.font_manager  # noqa: F401  (cria o cache de fontes)
+
+    return bool(compilado)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv == ["--preparar"]:
+        return 0 if preparar() else 1
+
+    # Executado como script, este módulo é o __main__; main.py importa
+    # "partida" e consulta o aquecimento dessa outra instância
+    importlib.import_module("partida").aquecer(servidor=True)
+    from streamlit.web import cli
+
+    # Os demais argumentos são repassados ao "streamlit run"
+    sys.argv = ["streamlit", "run", os.path.join(DIRETORIO, "main.py"), *argv]
+    return cli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import numpy as np
+
+from calculos import calcular_capacidade_liquida
+from frota import TAMANHO_NOME, calcular_indicadores_frota
+from otimizacao import toneladas_por_caminhao
+from rotas import agrupar_rotas, calcular_tempo_segmentos
+
+# Perfis dos modelos de caminhão para a produtividade de uma frota mista. Cada
+# caminhão usa o perfil do seu "modelo" (ver frota.py); caminhões sem perfil
+# usam o perfil padrão, com a capacidade e o fator de enchimento informados na
+# página. As velocidades de cada segmento vêm da rota e são ajustadas pelo
+# perfil: multiplicadas pelo fator do modelo e limitadas pela velocidade
+# máxima dele, carregado e vazio.
+DTYPE_PERFIL = np.dtype(
+    [
+        ("modelo", f"U{TAMANHO_NOME}"),
+        ("capacidade", np.float64),  # toneladas
+        ("fator_enchimento", np.float64),  # %
+        ("fator_velocidade_carregado", np.float64),  # 1 = velocidades da rota
+        ("fator_velocidade_vazio", np.float64),
+        ("velocidade_maxima_carregado", np.float64),  # km/h, 0 = sem limite
+        ("velocidade_maxima_vazio", np.float64),
+    ]
+)
+
+# Valores das colunas opcionais de um perfil
+PADROES_PERFIL = {
+    "modelo": "",
+    "fator_velocidade_carregado": 1.0,
+    "fator_velocidade_vazio": 1.0,
+    "velocidade_maxima_carregado": 0.0,
+    "velocidade_maxima_vazio": 0.0,
+}
+
+
+def criar_perfis(colunas):
+    """
+    Monta a tabela de perfis a partir de uma tabela colunar.
+
+    Args:
+      colunas: Dicionário de arrays, DataFrame ou array estruturado com as
+        colunas "capacidade" e "fator_enchimento" e, opcionalmente, "modelo"
+        e as de velocidade (ver PADROES_PERFIL).
+
+    Returns:
+      Array estruturado com dtype DTYPE_PERFIL.
+    """
+    if isinstance(colunas, np.ndarray):
+        nomes = colunas.dtype.names
+    else:
+        nomes = list(colunas.keys())
+    perfis = np.zeros(len(colunas["capacidade"]), dtype=DTYPE_PERFIL)
+    for campo in DTYPE_PERFIL.names:
+        perfis[campo] = np.asarray(colunas[campo]) if campo in nomes else PADROES_PERFIL[campo]
+    return perfis
+
+
+def perfil_padrao(capacidade_caminhao, fator_enchimento):
+    """Perfil dos caminhões sem modelo cadastrado, com as velocidades da rota."""
+    return criar_perfis(
+        {"capacidade": [capacidade_caminhao], "fator_enchimento": [fator_enchimento]}
+    )
+
+
+def indices_perfis(modelos, perfis, padrao):
+    """
+    Posição do perfil de cada caminhão pelo modelo. Com modelos repetidos na
+    tabela de perfis vale o primeiro.
+
+    Uma comparação da coluna de modelos por perfil: as tabelas de perfis são
+    pequenas, e comparar textos é mais rápido que ordená-los ou buscá-los.
+
+    Args:
+      modelos: Modelo de cada caminhão.
+      perfis: Array estruturado com dtype DTYPE_PERFIL.
+      padrao: Posição usada pelos caminhões cujo modelo não tem perfil.
+
+    Returns:
+      Array de posições em perfis, um valor por caminhão.
+    """
+    modelos = np.asarray(modelos)
+    indices = np.full(len(modelos), padrao, dtype=np.intp)
+    for posicao in range(len(perfis) - 1, -1, -1):
+        indices[modelos == perfis["modelo"][posicao]] = posicao
+    return indices
+
+
+def calcular_ciclo_perfis(segmentos, perfis):
+    """
+    Calcula o tempo de ciclo de cada perfil em cada rota de uma vez.
+
+    Os tempos de todos os perfis em todos os segmentos formam uma matriz
+    (perfis x segmentos), somada por rota com um produto de matrizes. Como em
+    calcular_ciclo_rotas, segmentos com distância zero são ignorados e uma
+    rota com algum segmento de distância positiva e velocidade não positiva é
+    inválida para o perfil, com os tempos zerados.
+
+    Args:
+      segmentos: Array estruturado com dtype DTYPE_SEGMENTO (ver rotas.py).
+      perfis: Array estruturado com dtype DTYPE_PERFIL.
+
+    Returns:
+      Dicionário com "rotas" (nomes, na ordem de calcular_ciclo_rotas) e
+      "tempo_carregado", "tempo_vazio", "tempo_ciclo" (minutos) e "valida",
+      matrizes (perfis x rotas).
+    """
+    nomes, indices = agrupar_rotas(segmentos)
+    # Pertinência de cada segmento à sua rota (segmentos x rotas)
+    pertinencia = np.zeros((len(segmentos), len(nomes)))
+    pertinencia[np.arange(len(segmentos)), indices] = 1.0
+
+    distancia = segmentos["distancia"][None, :]
+    tempos = {}
+    invalidos = np.zeros((len(perfis), len(segmentos)), dtype=bool)
+    for estado in ("carregado", "vazio"):
+        velocidade = (
+            segmentos[f"velocidade_{estado}"][None, :]
+            * perfis[f"fator_velocidade_{estado}"][:, None]
+        )
+        maxima = perfis[f"velocidade_maxima_{estado}"][:, None]
+        velocidade = np.where(maxima > 0, np.minimum(velocidade, maxima), velocidade)
+        tempos[estado] = calcular_tempo_segmentos(distancia, velocidade) @ pertinencia
+        invalidos |= (distancia > 0) & (velocidade <= 0)
+
+    valida = invalidos.astype(np.float64) @ pertinencia == 0
+    tempo_carregado = np.where(valida, tempos["carregado"], 0.0)
+    tempo_vazio = np.where(valida, tempos["vazio"], 0.0)
+    return {
+        "rotas": nomes,
+        "tempo_carregado": tempo_carregado,
+        "tempo_vazio": tempo_vazio,
+        "tempo_ciclo": tempo_carregado + tempo_vazio,
+        "valida": valida,
+    }
+
+
+def calcular_produtividade_frota(
+    frota, segmentos, perfis, padrao, participacao=None, horas_trabalhadas=None, catalogo=None
+):
+    """
+    Calcula a produtividade de cada caminhão da frota em cada rota e a
+    produção anual da frota, com o perfil do modelo de cada caminhão.
+
+    A produtividade (Ton/h, como em calcular_produtividade_horaria) é
+    calculada uma vez por perfil e rota e distribuída aos caminhões pelo
+    perfil; a produção de cada caminhão são as horas trabalhadas (ver
+    calcular_utilizacao) vezes a produtividade efetiva do perfil no conjunto
+    de rotas (ver toneladas_por_caminhao).
+
+    Args:
+      frota: Array estruturado da frota (DTYPE_FROTA).
+      segmentos: Array estruturado com dtype DTYPE_SEGMENTO.
+      perfis: Array estruturado com dtype DTYPE_PERFIL.
+      padrao: Perfil dos caminhões sem modelo cadastrado (ver perfil_padrao).
+      participacao: Fração da produção em cada rota. Padrão: partes iguais.
+      horas_trabalhadas: Horas trabalhadas por ano de cada caminhão, quando
+        já calculadas. Padrão: as de calcular_indicadores_frota.
+      catalogo: CatalogoParadas das horas trabalhadas. Padrão: o de paradas.toml.
+
+    Returns:
+      Dicionário com:
+        "rotas": nomes das rotas;
+        "modelos": modelo de cada perfil, com "" no perfil padrão (o último);
+        "produtividade": Ton/h de cada perfil em cada rota (perfis x rotas);
+        "produtividade_efetiva": Ton/h de cada perfil no conjunto de rotas;
+        "perfil": posição do perfil de cada caminhão;
+        "toneladas": produção anual de cada caminhão;
+        "caminhoes_perfis", "horas_perfis" (média) e "toneladas_perfis":
+          quantidade, horas trabalhadas e produção de cada perfil na frota;
+        "toneladas_rotas": produção anual da frota em cada rota;
+        "total": produção anual da frota.
+    """
+    todos = np.concatenate([perfis, padrao])
+    ciclo = calcular_ciclo_perfis(segmentos, todos)
+    capacidade_liquida = calcular_capacidade_liquida(todos["capacidade"], todos["fator_enchimento"])
+
+    produtividade = np.zeros_like(ciclo["tempo_ciclo"])
+    np.divide(
+        capacidade_liquida[:, None] * 60,
+        ciclo["tempo_ciclo"],
+        out=produtividade,
+        where=ciclo["valida"] & (ciclo["tempo_ciclo"] > 0),
+    )
+    n_rotas = len(ciclo["rotas"])
+    if participacao is None:
+        participacao = np.ones(n_rotas)
+    participacao = np.asarray(participacao, dtype=np.float64)
+    if participacao.sum() > 0:
+        participacao = participacao / participacao.sum()
+    _, efetiva = toneladas_por_caminhao(0.0, capacidade_liquida, segmentos, participacao, ciclo)
+
+    if horas_trabalhadas is None:
+        horas_trabalhadas = calcular_indicadores_frota(frota, catalogo)["horas_trabalhadas"]
+    horas_trabalhadas = np.maximum(np.asarray(horas_trabalhadas, dtype=np.float64), 0.0)
+    perfil = indices_perfis(frota["modelo"], perfis, len(perfis))
+    toneladas = horas_trabalhadas * efetiva[perfil]
+
+    caminhoes = np.bincount(perfil, minlength=len(todos))
+    horas = np.zeros(len(todos))
+    np.divide(
+        np.bincount(perfil, weights=horas_trabalhadas, minlength=len(todos)),
+        caminhoes,
+        out=horas,
+        where=caminhoes > 0,
+    )
+    total = float(toneladas.sum())
+    return {
+        "rotas": ciclo["rotas"],
+        "modelos": todos["modelo"],
+        "produtividade": produtividade,
+        "produtividade_efetiva": efetiva,
+        "perfil": perfil,
+        "toneladas": toneladas,
+        "caminhoes_perfis": caminhoes,
+        "horas_perfis": horas,
+        "toneladas_perfis": np.bincount(perfil, weights=toneladas, minlength=len(todos)),
+        "toneladas_rotas": total * participacao,
+        "total": total,
+    }
@@ -0,0 +1,342 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from calculos import calcular_capacidade_liquida
+from frota import TAMANHO_NOME
+from otimizacao import otimizar_frota
+from perfis_modelo import PADROES_PERFIL, calcular_produtividade_frota, criar_perfis, perfil_padrao
+from rotas import TAMANHO_ROTA, calcular_produtividade_rotas, criar_segmentos
+from painel_tarefas import acompanhar_tarefa, iniciar_tarefa
+from simulacao_eventos import simular_transporte_progressivo
+
+# Rota inicial com as três seções usadas antes do cadastro de múltiplas rotas
+SEGMENTOS_PADRAO = pd.DataFrame(
+    {
+        "rota": ["Rota 1", "Rota 1", "Rota 1"],
+        "segmento": ["Horizontal", "Subida", "Descida"],
+        "distancia": [0.0, 0.0, 0.0],
+        "velocidade_carregado": [0.0, 0.0, 0.0],
+        "velocidade_vazio": [0.0, 0.0, 0.0],
+    }
+)
+
+
+def perfis_iniciais(frota):
+    """
+    Tabela inicial dos perfis, com uma linha por modelo da frota. Capacidade
+    e fator de enchimento em branco usam os valores dos dados do caminhão.
+    Montada uma vez por sessão, para o editor manter as alterações.
+    """
+    if "perfis_modelo_iniciais" not in st.session_state:
+        modelos = [modelo for modelo in np.unique(frota["modelo"]).tolist() if modelo]
+        st.session_state.perfis_modelo_iniciais = pd.DataFrame(
+            {
+                "modelo": pd.Series(modelos, dtype=object),
+                "capacidade": pd.Series([None] * len(modelos), dtype=float),
+                "fator_enchimento": pd.Series([None] * len(modelos), dtype=float),
+                **{
+                    campo: pd.Series([padrao] * len(modelos), dtype=float)
+                    for campo, padrao in PADROES_PERFIL.items()
+                    if campo != "modelo"
+                },
+            }
+        )
+    return st.session_state.perfis_modelo_iniciais
+
+
+def secao_simulacao_filas(segmentos, rotas, capacidade_caminhao, fator_enchimento):
+    """Simula uma rota com filas nas carregadeiras e na descarga."""
+    st.header("Simulação com Filas:")
+    st.caption(
+        "A produtividade horária acima supõe que nenhum caminhão espera. A simulação "
+        "por eventos discretos inclui as filas nas carregadeiras e nos pontos de descarga."
+    )
+    rotas_validas = rotas["rotas"][rotas["valida"]].tolist()
+    if not rotas_validas:
+        st.info("Informe ao menos uma rota válida para simular.")
+        return
+
+    with st.form("simulacao_filas"):
+        rota = st.selectbox("Rota:", rotas_validas)
+        coluna_1, coluna_2, coluna_3 = st.columns(3)
+        n_caminhoes = coluna_1.number_input("Caminhões:", min_value=1, value=10)
+        n_carregadeiras = coluna_2.number_input("Carregadeiras:", min_value=1, value=1)
+        n_descargas = coluna_3.number_input("Pontos de Descarga:", min_value=1, value=1)
+        tempo_carga = coluna_1.number_input("Tempo de Carga (min):", min_value=0.0, value=3.0)
+        tempo_descarga = coluna_2.number_input("Tempo de Descarga (min):", min_value=0.0, value=1.0)
+        horas = coluna_3.number_input("Horas Simuladas:", min_value=1, max_value=8760, value=720)
+        variabilidade = st.slider("Variabilidade dos Tempos (%):", 0, 50, 10)
+        if st.form_submit_button("Simular"):
+            st.session_state.parametros_simulacao_filas = {
+                "rota": rota,
+                "n_caminhoes": int(n_caminhoes),
+                "n_carregadeiras": int(n_carregadeiras),
+                "n_descargas": int(n_descargas),
+                "tempo_carga": tempo_carga,
+                "tempo_descarga": tempo_descarga,
+                "horas": int(horas),
+                "variabilidade": variabilidade / 100,
+            }
+
+    parametros = dict(st.session_state.get("parametros_simulacao_filas", {}))
+    rota = parametros.pop("rota", None)
+    if rota not in rotas_validas:
+        return
+    segmentos_rota = tuple(
+        (float(s["distancia"]), float(s["velocidade_carregado"]), float(s["velocidade_vazio"]))
+        for s in segmentos[segmentos["rota"] == rota]
+    )
+
+    # A simulação roda em segundo plano, com os indicadores parciais do
+    # horizonte já simulado; alterar a rota ou os parâmetros a reinicia
+    entradas = (segmentos_rota, capacidade_caminhao, fator_enchimento, tuple(sorted(parametros.items())))
+    iniciar_tarefa(
+        "simulacao_filas",
+        ("simulacao_filas",) + entradas,
+        simular_transporte_progressivo,
+        capacidade_caminhao=capacidade_caminhao,
+        fator_enchimento=fator_enchimento,
+        segmentos=segmentos_rota,
+        semente=0,
+        dependencias=entradas,
+        **parametros,
+    )
+    acompanhar_tarefa(
+        "simulacao_filas", exibir_simulacao_filas, dependencias=entradas, rotulo="Simulando o transporte"
+    )
+
+
+def exibir_simulacao_filas(resultado, final):
+    """Indicadores da simulação com filas, parciais até o fim do horizonte."""
+    coluna_1, coluna_2, coluna_3 = st.columns(3)
+    coluna_1.metric(
+        "Produtividade com Filas",
+        f"{resultado['produtividade']:,.0f} Ton/h",
+        f"{resultado['produtividade'] - resultado['produtividade_sem_fila']:,.0f} Ton/h",
+    )
+    coluna_2.metric("Produtividade sem Filas", f"{resultado['produtividade_sem_fila']:,.0f} Ton/h")
+    coluna_3.metric("Fator de Acoplamento", f"{resultado['fator_acoplamento']:.2f}")
+    st.write(
+        f"Espera média por viagem: {resultado['espera_carga']:.2f} min na carga e "
+        f"{resultado['espera_descarga']:.2f} min na descarga. Ciclo médio de "
+        f"{resultado['tempo_ciclo_medio']:.2f} min (teórico: {resultado['tempo_ciclo_teorico']:.2f} min)."
+    )
+    st.write(
+        "Utilização das carregadeiras: "
+        + ", ".join(f"{u:.1f}%" for u in resultado["utilizacao_carregadeiras"])
+        + " | Utilização da descarga: "
+        + ", ".join(f"{u:.1f}%" for u in resultado["utilizacao_descargas"])
+    )
+
+
+# Cria uma nova página
+def pagina_produtividade():
+
+    # Título da aba
+    st.title("Cálculo da Produtividade Horária da Mina")
+
+    # Coleta os segmentos de todas as rotas em uma única tabela editável
+    st.header("Rotas de Transporte:")
+    st.caption(
+        "Cada linha é um segmento de uma rota. Segmentos com o mesmo nome de rota "
+        "são somados no tempo de ciclo."
+    )
+    tabela_segmentos = st.data_editor(
+        SEGMENTOS_PADRAO,
+        num_rows="dynamic",
+        hide_index=True,
+        width="stretch",
+        key="segmentos_rotas",
+        column_config={
+            "rota": st.column_config.TextColumn("Rota", required=True, max_chars=TAMANHO_ROTA),
+            "segmento": st.column_config.TextColumn("Segmento", max_chars=TAMANHO_ROTA),
+            "distancia": st.column_config.NumberColumn(
+                "Distância (metros)", min_value=0.0, required=True
+            ),
+            "velocidade_carregado": st.column_config.NumberColumn(
+                "Velocidade Carregado (km/h)", min_value=0.0, required=True
+            ),
+            "velocidade_vazio": st.column_config.NumberColumn(
+                "Velocidade Vazio (km/h)", min_value=0.0, required=True
+            ),
+        },
+    )
+
+    st.header("Dados do Caminhão:")
+    capacidade_caminhao = st.number_input(
+        "Capacidade do Caminhão (toneladas):", min_value=0.0
+    )
+    fator_enchimento = st.number_input(
+        "Fator de Enchimento (%):", min_value=0.0, max_value=100.0
+    )
+
+    # Perfis dos modelos de uma frota mista; caminhões sem perfil usam os dados acima
+    frota = st.session_state.frota.materializar(0, st.session_state.get("num_caminhoes", 1))
+    st.header("Perfis por Modelo:")
+    st.caption(
+        "Capacidade, enchimento e velocidades de cada modelo da frota. As velocidades das "
+        "rotas são multiplicadas pelo fator do modelo e limitadas pela velocidade máxima "
+        "(0 = sem limite). Em branco, capacidade e enchimento são os dados do caminhão acima."
+    )
+    tabela_perfis = st.data_editor(
+        perfis_iniciais(frota),
+        num_rows="dynamic",
+        hide_index=True,
+        width="stretch",
+        key="perfis_modelo",
+        column_config={
+            "modelo": st.column_config.TextColumn(
+                "Modelo", required=True, max_chars=TAMANHO_NOME
+            ),
+            "capacidade": st.column_config.NumberColumn("Capacidade (t)", min_value=0.0),
+            "fator_enchimento": st.column_config.NumberColumn(
+                "Enchimento (%)", min_value=0.0, max_value=100.0
+            ),
+            "fator_velocidade_carregado": st.column_config.NumberColumn(
+                "Fator Velocidade Carregado", min_value=0.0
+            ),
+            "fator_velocidade_vazio": st.column_config.NumberColumn(
+                "Fator Velocidade Vazio", min_value=0.0
+            ),
+            "velocidade_maxima_carregado": st.column_config.NumberColumn(
+                "Máxima Carregado (km/h)", min_value=0.0
+            ),
+            "velocidade_maxima_vazio": st.column_config.NumberColumn(
+                "Máxima Vazio (km/h)", min_value=0.0
+            ),
+        },
+    )
+    perfis = criar_perfis(
+        tabela_perfis.dropna(subset=["modelo"]).fillna(
+            {"capacidade": capacidade_caminhao, "fator_enchimento": fator_enchimento, **PADROES_PERFIL}
+        )
+    )
+
+    tabela_segmentos = tabela_segmentos.dropna(subset=["rota"]).fillna(
+        {"segmento": "", "distancia": 0.0, "velocidade_carregado": 0.0, "velocidade_vazio": 0.0}
+    )
+    segmentos = criar_segmentos(tabela_segmentos)
+
+    # Verifica se pelo menos uma distância ou velocidade é maior que zero
+    if not (
+        segmentos["distancia"].any()
+        or segmentos["velocidade_carregado"].any()
+        or segmentos["velocidade_vazio"].any()
+    ):
+        st.error(
+            "Pelo menos uma distância ou velocidade deve ser maior que zero. Verifique os dados de entrada."
+        )
+        return
+
+    # Calcula ciclo e produtividade de todas as rotas de uma vez
+    capacidade_liquida = calcular_capacidade_liquida(capacidade_caminhao, fator_enchimento)
+    rotas = calcular_produtividade_rotas(segmentos, capacidade_liquida)
+
+    rotas_invalidas = rotas["rotas"][~rotas["valida"]].tolist()
+    if rotas_invalidas:
+        st.error(
+            "A velocidade deve ser maior que zero. Verifique os dados de entrada das rotas: "
+            + ", ".join(rotas_invalidas)
+        )
+
+    # Exibe os resultados
+    st.header("Resultados:")
+    st.write(f"Capacidade Líquida do Caminhão: {capacidade_liquida:.2f} toneladas")
+    resultados = pd.DataFrame(
+        {
+            "Rota": rotas["rotas"],
+            "Tempo Carregado (min)": rotas["tempo_carregado"],
+            "Tempo Vazio (min)": rotas["tempo_vazio"],
+            "Tempo Total de Ciclo (min)": rotas["tempo_ciclo"],
+            "Produtividade Horária (Ton/h)": rotas["produtividade"],
+        }
+    )
+    st.dataframe(resultados, hide_index=True, width="stretch")
+    if len(resultados) > 1:
+        st.bar_chart(resultados, x="Rota", y="Produtividade Horária (Ton/h)")
+
+    # Produtividade de cada modelo em cada rota e produção anual da frota cadastrada,
+    # com a produção dividida igualmente entre as rotas válidas
+    producao = calcular_produtividade_frota(
+        frota, segmentos, perfis, perfil_padrao(capacidade_caminhao, fator_enchimento),
+        participacao=rotas["valida"],
+    )
+    nomes_perfis = [modelo or "(sem modelo)" for modelo in producao["modelos"].tolist()]
+    if len(perfis):
+        st.write("Produtividade Horária por Modelo (Ton/h):")
+        st.dataframe(
+            pd.DataFrame(producao["produtividade"], columns=producao["rotas"]).assign(
+                Modelo=nomes_perfis
+            ).set_index("Modelo"),
+            width="stretch",
+        )
+    st.header("Produção da Frota Cadastrada:")
+    st.write(
+        f"{len(frota)} caminhões: {producao['total']:,.0f} t/ano, com as horas trabalhadas "
+        "de cada caminhão e o perfil do seu modelo."
+    )
+    presentes = producao["caminhoes_perfis"] > 0
+    st.dataframe(
+        {
+            "Modelo": np.array(nomes_perfis, dtype=object)[presentes],
+            "Caminhões": producao["caminhoes_perfis"][presentes],
+            "Horas Trabalhadas (h/ano)": producao["horas_perfis"][presentes],
+            "Produtividade Efetiva (Ton/h)": producao["produtividade_efetiva"][presentes],
+            "Produção (t/ano)": producao["toneladas_perfis"][presentes],
+        },
+        hide_index=True,
+    )
+
+    # Dimensiona a frota necessária para a meta anual de produção
+    st.header("Dimensionamento da Frota:")
+    meta_toneladas = st.number_input(
+        "Meta de Produção Anual (toneladas):", min_value=0.0, step=100_000.0
+    )
+    if meta_toneladas > 0:
+        # Um tipo por perfil, com as horas trabalhadas médias dos caminhões do
+        # modelo (ou da frota, para modelos sem caminhões); o perfil padrão só
+        # entra se algum caminhão o usa ou se não há perfis
+        caminhoes = producao["caminhoes_perfis"]
+        horas_media = producao["horas_perfis"] @ caminhoes / max(caminhoes.sum(), 1)
+        horas_trabalhadas = np.where(caminhoes > 0, producao["horas_perfis"], horas_media)
+        tipos = np.append(np.ones(len(perfis), dtype=bool), caminhoes[-1] > 0 or not len(perfis))
+        toneladas = horas_trabalhadas[tipos] * producao["produtividade_efetiva"][tipos]
+        nomes_tipos = np.array(nomes_perfis, dtype=object)[tipos].tolist()
+        dimensionamento = otimizar_frota(meta_toneladas, toneladas, nomes=nomes_tipos)
+        if not dimensionamento["viavel"]:
+            st.error(
+                "Não é possível atingir a meta com as rotas informadas. Verifique a "
+                "capacidade do caminhão e as velocidades."
+            )
+        elif len(nomes_tipos) == 1:
+            st.caption(
+                "Produção dividida igualmente entre as rotas válidas, com as horas trabalhadas "
+                "do caminhão médio da frota."
+            )
+            st.write(f"Horas Trabalhadas por Caminhão: {horas_trabalhadas[tipos][0]:.2f} h/ano")
+            st.write(f"Produtividade Efetiva: {producao['produtividade_efetiva'][tipos][0]:.2f} Ton/h")
+            st.write(f"Produção por Caminhão: {toneladas[0]:,.0f} t/ano")
+            st.write(
+                f"Caminhões Necessários: {dimensionamento['quantidade_total']} "
+                f"(produção de {dimensionamento['toneladas']:,.0f} t/ano)"
+            )
+        else:
+            st.caption(
+                "Menor quantidade de caminhões entre os modelos, com a produção dividida "
+                "igualmente entre as rotas válidas e as horas trabalhadas médias de cada modelo."
+            )
+            st.dataframe(
+                {
+                    "Modelo": nomes_tipos,
+                    "Produção por Caminhão (t/ano)": toneladas,
+                    "Caminhões": [dimensionamento["composicao"][nome] for nome in nomes_tipos],
+                },
+                hide_index=True,
+            )
+            st.write(
+                f"Caminhões Necessários: {dimensionamento['quantidade_total']} "
+                f"(produção de {dimensionamento['toneladas']:,.0f} t/ano)"
+            )
+
+    secao_simulacao_filas(segmentos, rotas, capacidade_caminhao, fator_enchimento)
@@ -0,0 +1,146 @@
+import numpy as np
+
+# Tamanho máximo, em caracteres, do nome da rota e da descrição do segmento
+TAMANHO_ROTA = 64
+
+# Tabela de segmentos: cada linha é um trecho de uma rota entre carga e descarga
+DTYPE_SEGMENTO = np.dtype(
+    [
+        ("rota", f"U{TAMANHO_ROTA}"),
+        ("segmento", f"U{TAMANHO_ROTA}"),
+        ("distancia", np.float64),  # metros
+        ("velocidade_carregado", np.float64),  # km/h
+        ("velocidade_vazio", np.float64),  # km/h
+    ]
+)
+
+
+def criar_segmentos(colunas):
+    """
+    Monta a tabela de segmentos a partir de uma tabela colunar.
+
+    Args:
+      colunas: Dicionário de arrays, DataFrame ou array estruturado com as
+        colunas "rota", "distancia", "velocidade_carregado", "velocidade_vazio"
+        e, opcionalmente, "segmento".
+
+    Returns:
+      Array estruturado com dtype DTYPE_SEGMENTO.
+    """
+    if isinstance(colunas, np.ndarray):
+        nomes = colunas.dtype.names
+    else:
+        nomes = list(colunas.keys())
+    n = len(colunas["distancia"])
+    segmentos = np.zeros(n, dtype=DTYPE_SEGMENTO)
+    for campo in DTYPE_SEGMENTO.names:
+        if campo in nomes:
+            segmentos[campo] = np.asarray(colunas[campo])
+        elif campo == "segmento":
+            segmentos[campo] = [str(i + 1) for i in range(n)]
+    return segmentos
+
+
+def calcular_tempo_segmentos(distancia, velocidade):
+    """
+    Versão vetorizada de calcular_tempo_ciclo, em minutos.
+
+    Segmentos com velocidade não positiva resultam em tempo zero; a validação
+    fica a cargo de quem chama.
+    """
+    distancia = np.asarray(distancia, dtype=np.float64)
+    velocidade = np.asarray(velocidade, dtype=np.float64)
+    tempo_horas = np.zeros(np.broadcast(distancia, velocidade).shape)
+    np.divide(distancia, velocidade * 1000, out=tempo_horas, where=velocidade > 0)
+    return tempo_horas * 60
+
+
+def agrupar_rotas(segmentos):
+    """
+    Numera as rotas dos segmentos na ordem da primeira ocorrência.
+
+    Returns:
+      Tupla (nomes das rotas, índice da rota de cada segmento).
+    """
+    _, primeiros, indices = np.unique(
+        segmentos["rota"], return_index=True, return_inverse=True
+    )
+    ordem = np.argsort(primeiros)
+    posicao = np.empty_like(ordem)
+    posicao[ordem] = np.arange(len(ordem))
+    return segmentos["rota"][np.sort(primeiros)], posicao[indices].reshape(-1)
+
+
+def calcular_ciclo_rotas(segmentos):
+    """
+    Calcula o tempo de ciclo de todas as rotas de uma vez.
+
+    Os tempos de cada segmento são calculados como operações sobre arrays e
+    somados por rota com np.bincount, sem laço Python por rota ou segmento.
+    Segmentos com distância zero são ignorados; uma rota com algum segmento de
+    distância positiva e velocidade não positiva é marcada como inválida e
+    tem os tempos zerados, como a produtividade de calcular_produtividade_rotas.
+
+    Args:
+      segmentos: Array estruturado com dtype DTYPE_SEGMENTO.
+
+    Returns:
+      Dicionário com "rotas" (nomes, na ordem em que aparecem), "tempo_carregado",
+      "tempo_vazio", "tempo_ciclo" (minutos) e "valida" (booleano), um valor por rota.
+    """
+    nomes, indices = agrupar_rotas(segmentos)
+    n_rotas = len(nomes)
+
+    distancia = segmentos["distancia"]
+    tempo_carregado = calcular_tempo_segmentos(distancia, segmentos["velocidade_carregado"])
+    tempo_vazio = calcular_tempo_segmentos(distancia, segmentos["velocidade_vazio"])
+
+    invalidos = (distancia > 0) & (
+        (segmentos["velocidade_carregado"] <= 0) | (segmentos["velocidade_vazio"] <= 0)
+    )
+    valida = np.bincount(indices, weights=invalidos, minlength=n_rotas) == 0
+
+    # Sem os segmentos inválidos a soma pareceria o tempo de uma rota mais curta
+    tempo_carregado = np.where(
+        valida, np.bincount(indices, weights=tempo_carregado, minlength=n_rotas), 0.0
+    )
+    tempo_vazio = np.where(
+        valida, np.bincount(indices, weights=tempo_vazio, minlength=n_rotas), 0.0
+    )
+    return {
+        "rotas": nomes,
+        "tempo_carregado": tempo_carregado,
+        "tempo_vazio": tempo_vazio,
+        "tempo_ciclo": tempo_carregado + tempo_vazio,
+        "valida": valida,
+    }
+
+
+def calcular_produtividade_rotas(segmentos, capacidade_liquida):
+    """
+    Calcula o ciclo e a produtividade horária (Ton/h) de todas as rotas.
+
+    Args:
+      segmentos: Array estruturado com dtype DTYPE_SEGMENTO.
+      capacidade_liquida: Capacidade líquida do caminhão em toneladas (ver
+        calcular_capacidade_liquida), escalar ou um valor por rota.
+
+    Returns:
+      O dicionário de calcular_ciclo_rotas acrescido de "produtividade". Rotas
+      inválidas ou com tempo de ciclo zero têm produtividade zero.
+    """
+    ciclo = calcular_ciclo_rotas(segmentos)
+    tempo_ciclo_total = ciclo["tempo_ciclo"]
+    capacidade_liquida = np.broadcast_to(
+        np.asarray(capacidade_liquida, dtype=np.float64), tempo_ciclo_total.shape
+    )
+
+    produtividade = np.zeros_like(tempo_ciclo_total)
+    np.divide(
+        capacidade_liquida * 60,
+        tempo_ciclo_total,
+        out=produtividade,
+        where=(tempo_ciclo_total > 0) & ciclo["valida"],
+    )
+    ciclo["produtividade"] = produtividade
+    return ciclo
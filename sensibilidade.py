@@ -0,0 +1,273 @@
+import math
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from calculos import calcular_capacidade_liquida, calcular_tempo_ciclo_total
+from frota import CAMPOS_CAMINHAO, calcular_indicadores_frota
+from rotas import calcular_tempo_segmentos
+
+# Grades com mais combinações que isso usam o pool de processos, se habilitado
+LIMITE_COMBINACOES_PROCESSOS = 1_000_000
+
+# Quantidade máxima de valores (caminhões x combinações) avaliados de uma vez
+ELEMENTOS_POR_BLOCO = 2_000_000
+
+
+def avaliar_frota(frota, parametros):
+    """
+    Avalia a frota inteira para um lote de combinações de parâmetros.
+
+    Cada parâmetro (um campo de CAMPOS_CAMINHAO) substitui o valor de todos os
+    caminhões; os demais campos mantêm os valores de cada caminhão.
+
+    Args:
+      frota: Array estruturado da frota (ver frota.criar_frota).
+      parametros: Dicionário campo -> array de valores, um por combinação.
+
+    Returns:
+      Dicionário com arrays "df" e "utilizacao" médios da frota por combinação.
+    """
+    n_combinacoes = len(next(iter(parametros.values())))
+    combinacoes_por_bloco = max(1, ELEMENTOS_POR_BLOCO // max(len(frota), 1))
+    df = np.empty(n_combinacoes)
+    utilizacao = np.empty(n_combinacoes)
+
+    # Avalia em blocos para limitar a matriz caminhões x combinações em memória
+    for inicio in range(0, n_combinacoes, combinacoes_por_bloco):
+        bloco = slice(inicio, inicio + combinacoes_por_bloco)
+        colunas = {}
+        for campo in CAMPOS_CAMINHAO:
+            if campo in parametros:
+                colunas[campo] = np.asarray(parametros[campo], dtype=np.float64)[None, bloco]
+            else:
+                colunas[campo] = np.asarray(frota[campo], dtype=np.float64)[:, None]
+        indicadores = calcular_indicadores_frota(colunas)
+        df[bloco] = indicadores["df"].mean(axis=0)
+        utilizacao[bloco] = indicadores["utilizacao"].mean(axis=0)
+
+    return {"df": df, "utilizacao": utilizacao}
+
+
+# Valores usados por avaliar_produtividade para os parâmetros não varridos
+PARAMETROS_PRODUTIVIDADE = {
+    "distancia_horizontal": 0.0,
+    "velocidade_horizontal_carregado": 0.0,
+    "velocidade_horizontal_vazio": 0.0,
+    "distancia_subida": 0.0,
+    "velocidade_subida_carregado": 0.0,
+    "velocidade_subida_vazio": 0.0,
+    "distancia_descida": 0.0,
+    "velocidade_descida_carregado": 0.0,
+    "velocidade_descida_vazio": 0.0,
+    "capacidade_caminhao": 0.0,
+    "fator_enchimento": 100.0,
+}
+
+
+def avaliar_produtividade(parametros, base=None):
+    """
+    Avalia o tempo de ciclo e a produtividade horária para um lote de
+    combinações dos parâmetros de pagina_produtividade.
+
+    Como em calcular_ciclo_rotas, uma combinação com alguma seção de
+    distância positiva e velocidade não positiva é inválida, com tempo de
+    ciclo e produtividade zerados.
+
+    Args:
+      parametros: Dicionário nome -> array de valores, um por combinação.
+      base: Valores dos parâmetros não varridos. Padrão: PARAMETROS_PRODUTIVIDADE.
+
+    Returns:
+      Dicionário com arrays "tempo_ciclo" (minutos), "produtividade" (Ton/h)
+      e "valida" (booleano).
+    """
+    valores = dict(PARAMETROS_PRODUTIVIDADE if base is None else base)
+    valores.update(parametros)
+    valores = {nome: np.asarray(valor, dtype=np.float64) for nome, valor in valores.items()}
+
+    tempos = []
+    invalida = False
+    for secao in ("horizontal", "subida", "descida"):
+        distancia = valores[f"distancia_{secao}"]
+        tempo = 0.0
+        for estado in ("carregado", "vazio"):
+            velocidade = valores[f"velocidade_{secao}_{estado}"]
+            tempo = tempo + calcular_tempo_segmentos(distancia, velocidade)
+            invalida = invalida | ((distancia > 0) & (velocidade <= 0))
+        tempos.append(tempo)
+    capacidade_liquida = calcular_capacidade_liquida(
+        valores["capacidade_caminhao"], valores["fator_enchimento"]
+    )
+    forma = np.broadcast(capacidade_liquida, invalida, *tempos).shape
+
+    # Sem as seções inválidas o ciclo pareceria o de um percurso mais curto
+    valida = np.broadcast_to(~invalida, forma)
+    tempo_ciclo_total = np.where(valida, calcular_tempo_ciclo_total(*tempos), 0.0)
+    produtividade = np.zeros(forma)
+    np.divide(
+        capacidade_liquida * 60,
+        tempo_ciclo_total,
+        out=produtividade,
+        where=tempo_ciclo_total > 0,
+    )
+    return {"tempo_ciclo": tempo_ciclo_total, "produtividade": produtividade, "valida": valida.copy()}
+
+
+def _combinacoes(faixas, inicio, fim):
+    """Monta as colunas das combinações [inicio, fim) do produto cartesiano."""
+    formas = [len(valores) for valores in faixas.values()]
+    indices = np.unravel_index(np.arange(inicio, fim), formas)
+    return {
+        nome: np.asarray(valores)[indice]
+        for (nome, valores), indice in zip(faixas.items(), indices)
+    }
+
+
+def _avaliar_lote(avaliar, faixas, inicio, fim):
+    combinacoes = _combinacoes(faixas, inicio, fim)
+    return combinacoes, avaliar(combinacoes)
+
+
+def varrer_parametros(avaliar, faixas, tamanho_lote=50_000, processos=None):
+    """
+    Avalia o produto cartesiano das faixas de parâmetros em lotes vetorizados.
+
+    Os resultados são produzidos lote a lote, sem acumular a grade inteira em
+    memória. Grades muito grandes são distribuídas em um pool de processos
+    quando processos > 1.
+
+    Args:
+      avaliar: Função que recebe um dicionário nome -> array de valores e
+        retorna um dicionário de arrays, como avaliar_frota (via
+        functools.partial) ou avaliar_produtividade. Precisa ser serializável
+        para uso com processos.
+      faixas: Dicionário nome -> sequência de valores a varrer.
+      tamanho_lote: Quantidade de combinações avaliadas por lote.
+      processos: Quantidade de processos para grades grandes.
+
+    Yields:
+      Tuplas (combinacoes, resultados), ambas dicionários de arrays alinhados.
+    """
+    total = math.prod(len(valores) for valores in faixas.values())
+    lotes = [
+        (inicio, min(inicio + tamanho_lote, total))
+        for inicio in range(0, total, tamanho_lote)
+    ]
+
+    if not processos or processos <= 1 or total < LIMITE_COMBINACOES_PROCESSOS:
+        for inicio, fim in lotes:
+            yield _avaliar_lote(avaliar, faixas, inicio, fim)
+        return
+
+    # Mantém poucos lotes em andamento para não acumular resultados em memória
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        pendentes = deque()
+        for inicio, fim in lotes:
+            pendentes.append(executor.submit(_avaliar_lote, avaliar, faixas, inicio, fim))
+            if len(pendentes) >= 2 * processos:
+                yield pendentes.popleft().result()
+        while pendentes:
+            yield pendentes.popleft().result()
+
+
+def coletar_varredura(avaliar, faixas, **kwargs):
+    """Executa varrer_parametros e concatena todos os lotes em um só dicionário."""
+    combinacoes = {nome: [] for nome in faixas}
+    resultados = {}
+    for lote_combinacoes, lote_resultados in varrer_parametros(avaliar, faixas, **kwargs):
+        for nome, valores in lote_combinacoes.items():
+            combinacoes[nome].append(valores)
+        for nome, valores in lote_resultados.items():
+            resultados.setdefault(nome, []).append(valores)
+    combinacoes = {nome: np.concatenate(valores) for nome, valores in combinacoes.items()}
+    resultados = {nome: np.concatenate(valores) for nome, valores in resultados.items()}
+    return combinacoes, resultados
+
+
+def varredura_progressiva(avaliar, faixas, **kwargs):
+    """
+    coletar_varredura lote a lote, para execução em segundo plano (ver
+    tarefas.py).
+
+    Yields:
+      Tuplas (progresso, (combinacoes, resultados)) com os lotes avaliados
+      até ali concatenados; o último é o mesmo que coletar_varredura.
+    """
+    total = math.prod(len(valores) for valores in faixas.values())
+    combinacoes = {nome: [] for nome in faixas}
+    resultados = {}
+    avaliadas = 0
+    for lote_combinacoes, lote_resultados in varrer_parametros(avaliar, faixas, **kwargs):
+        for nome, valores in lote_combinacoes.items():
+            combinacoes[nome].append(valores)
+        for nome, valores in lote_resultados.items():
+            resultados.setdefault(nome, []).append(valores)
+        avaliadas += len(next(iter(lote_combinacoes.values())))
+        yield avaliadas / total, (
+            {nome: np.concatenate(valores) for nome, valores in combinacoes.items()},
+            {nome: np.concatenate(valores) for nome, valores in resultados.items()},
+        )
+
+
+def analise_tornado(avaliar, base, variacoes, indicador):
+    """
+    Análise de sensibilidade do tipo tornado.
+
+    Cada parâmetro é levado ao valor mínimo e máximo, um de cada vez, com os
+    demais no valor base. Todas as avaliações são feitas em um único lote.
+
+    Args:
+      avaliar: Função de avaliação, como em varrer_parametros.
+      base: Dicionário nome -> valor base de cada parâmetro analisado.
+      variacoes: Dicionário nome -> (valor mínimo, valor máximo).
+      indicador: Chave do resultado de avaliar a ser analisada.
+
+    Returns:
+      Lista de dicionários com "parametro", "minimo", "maximo" e "amplitude",
+      ordenada da maior para a menor amplitude.
+
+    Raises:
+      ValueError: Se uma variação não tiver valor base, não for um par
+        (mínimo, máximo) ou se avaliar não retornar o indicador.
+    """
+    nomes = list(variacoes)
+    sem_base = [nome for nome in nomes if nome not in base]
+    if sem_base:
+        raise ValueError(f"Parâmetros sem valor base: {', '.join(sem_base)}.")
+    sem_par = [nome for nome in nomes if np.shape(variacoes[nome]) != (2,)]
+    if sem_par:
+        raise ValueError(
+            f"As variações devem ser pares (mínimo, máximo): {', '.join(sem_par)}."
+        )
+    parametros = {
+        nome: np.full(2 * len(nomes), base[nome], dtype=np.float64) for nome in base
+    }
+    for i, nome in enumerate(nomes):
+        parametros[nome][2 * i] = variacoes[nome][0]
+        parametros[nome][2 * i + 1] = variacoes[nome][1]
+    resultados = avaliar(parametros)
+    if indicador not in resultados:
+        raise ValueError(
+            f"Indicador desconhecido: {indicador}. Disponíveis: {', '.join(resultados)}."
+        )
+    valores = resultados[indicador]
+
+    tornado = [
+        {
+            "parametro": nome,
+            "minimo": float(valores[2 * i]),
+            "maximo": float(valores[2 * i + 1]),
+            "amplitude": float(abs(valores[2 * i + 1] - valores[2 * i])),
+        }
+        for i, nome in enumerate(nomes)
+    ]
+    tornado.sort(key=lambda item: item["amplitude"], reverse=True)
+    return tornado
+
+
+def avaliador_frota(frota):
+    """Retorna avaliar_frota com a frota fixada, serializável para processos."""
+    return partial(avaliar_frota, frota)
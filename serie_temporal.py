@@ -0,0 +1,179 @@
+import numpy as np
+
+from catalogo_paradas import CATALOGO
+from frota import calcular_indicadores_frota
+
+HORAS_ANO = 365 * 24
+
+# Duração de cada serviço preventivo (horas) e intervalo nominal pelo horímetro,
+# das manutenções do catálogo de paradas
+TEMPOS_PREVENTIVAS = {parada["campo"]: parada["horas"] for parada in CATALOGO.manutencoes}
+INTERVALOS_PREVENTIVAS = {parada["campo"]: parada["intervalo"] for parada in CATALOGO.manutencoes}
+
+# Duração de cada período em horas; o mês é 1/12 do ano de 365 dias usado em calculos.py
+HORAS_PERIODO = {"semana": 7 * 24, "mes": HORAS_ANO / 12}
+
+
+def limites_periodos(anos, periodo="mes"):
+    """
+    Calcula os limites dos períodos do horizonte, em horas desde o início.
+
+    Args:
+      anos: Horizonte em anos de 365 dias.
+      periodo: "semana" ou "mes". A última semana do ano pode ser parcial.
+
+    Returns:
+      Array com os limites (um a mais que a quantidade de períodos).
+    """
+    total = anos * HORAS_ANO
+    passo = HORAS_PERIODO[periodo]
+    n_periodos = int(np.ceil(total / passo - 1e-9))
+    limites = np.arange(n_periodos + 1) * passo
+    limites[-1] = total
+    return limites
+
+
+def calcular_series_frota(frota, anos=1, periodo="mes", horimetro_inicial=None, intervalos_nominais=False):
+    """
+    Calcula DF e utilização por período para toda a frota em uma passada vetorizada.
+
+    Os serviços preventivos acontecem quando o horímetro de cada caminhão cruza
+    múltiplos do intervalo do serviço. O horímetro avança à taxa média anual de
+    horas trabalhadas (calcular_utilizacao), e o intervalo é escolhido para que
+    em um ano ocorram exatamente as quantidades informadas em qtd_250h etc.;
+    assim o agregado de um ano reproduz a DF anual de calcular_df. As demais
+    paradas e perdas, definidas por ano ou por dia, são distribuídas
+    proporcionalmente às horas de cada período.
+
+    Uma parada que não cabe no período continua no período seguinte, e as
+    perdas de um período ficam limitadas às horas disponíveis nele; a parada
+    que passa do fim do horizonte fica em "pendente". O agregado "total" não
+    tem esses cortes: inclui a parada pendente e as perdas inteiras, e num
+    horizonte de um ano reproduz calcular_indicadores_frota.
+
+    Args:
+      frota: Array estruturado da frota (ver frota.py).
+      anos: Horizonte em anos.
+      periodo: "semana" ou "mes".
+      horimetro_inicial: Leitura do horímetro de cada caminhão no início do
+        horizonte, que define em que ponto do ciclo de serviços ele está.
+        Padrão: zero (todos os serviços a cumprir inteiros).
+      intervalos_nominais: Se True, usa os intervalos nominais de
+        INTERVALOS_PREVENTIVAS (250 h, 500 h...) em vez dos derivados das
+        quantidades anuais.
+
+    Returns:
+      Dicionário com "limites" (horas) e arrays (caminhões x períodos)
+      "horas_periodo", "tempo_parado", "df", "horas_disponiveis",
+      "horas_nao_utilizadas", "horas_trabalhadas", "utilizacao" e
+      "servicos" (campo -> quantidade de serviços no período), "pendente"
+      (horas de parada que passam do fim do horizonte, por caminhão) e
+      "total" com os mesmos indicadores agregados no horizonte, por caminhão.
+    """
+    n = len(frota)
+    limites = limites_periodos(anos, periodo)
+    horas_periodo = np.broadcast_to(np.diff(limites), (n, len(limites) - 1))
+
+    anual = calcular_indicadores_frota(frota)
+    horas_trabalhadas_ano = np.maximum(anual["horas_trabalhadas"], 0.0)
+    if horimetro_inicial is None:
+        horimetro_inicial = np.zeros(n)
+    horimetro_inicial = np.broadcast_to(np.asarray(horimetro_inicial, dtype=np.float64), (n,))
+
+    # Horímetro em cada limite de período (caminhões x limites)
+    taxa_horimetro = horas_trabalhadas_ano / HORAS_ANO
+    horimetro = horimetro_inicial[:, None] + taxa_horimetro[:, None] * limites[None, :]
+
+    fator_corretiva = 1 + np.asarray(frota[CATALOGO.campo_corretiva], dtype=np.float64)
+    tempo_parado = np.zeros(horas_periodo.shape)
+    servicos = {}
+    for campo, tempo_servico in TEMPOS_PREVENTIVAS.items():
+        quantidade = np.asarray(frota[campo], dtype=np.float64)
+        if intervalos_nominais:
+            intervalo = np.full(n, float(INTERVALOS_PREVENTIVAS[campo]))
+        else:
+            intervalo = np.full(n, np.inf)
+            np.divide(
+                horas_trabalhadas_ano,
+                quantidade,
+                out=intervalo,
+                where=(quantidade > 0) & (horas_trabalhadas_ano > 0),
+            )
+        ciclos = np.zeros_like(horimetro)
+        finitos = np.isfinite(intervalo)
+        ciclos[finitos] = np.floor(horimetro[finitos] / intervalo[finitos, None] + 1e-9)
+        if not intervalos_nominais:
+            # Sem horas trabalhadas o horímetro não anda: distribui as quantidades no calendário
+            parados = (horas_trabalhadas_ano <= 0) & (quantidade > 0)
+            ciclos[parados] = np.floor(
+                quantidade[parados, None] * limites[None, :] / HORAS_ANO + 1e-9
+            )
+        servicos[campo] = np.diff(ciclos, axis=1)
+        tempo_parado += servicos[campo] * tempo_servico
+    tempo_parado *= fator_corretiva[:, None]
+
+    # Paradas mais longas que o período (a 16000h em uma semana) continuam no seguinte
+    pendente = np.zeros(n)
+    if (tempo_parado > horas_periodo).any():
+        for p in range(tempo_parado.shape[1]):
+            demanda = tempo_parado[:, p] + pendente
+            tempo_parado[:, p] = np.minimum(demanda, horas_periodo[:, p])
+            pendente = demanda - tempo_parado[:, p]
+
+    horas_disponiveis = horas_periodo - tempo_parado
+    df = horas_disponiveis / horas_periodo * 100
+    perdas = anual["horas_nao_utilizadas"][:, None] * horas_periodo / HORAS_ANO
+    horas_nao_utilizadas = np.minimum(perdas, horas_disponiveis)
+    horas_trabalhadas = horas_disponiveis - horas_nao_utilizadas
+    utilizacao = np.zeros_like(horas_disponiveis)
+    np.divide(horas_trabalhadas, horas_disponiveis, out=utilizacao, where=horas_disponiveis != 0)
+    utilizacao *= 100
+
+    total_horas = horas_periodo.sum(axis=1)
+    total_parado = tempo_parado.sum(axis=1) + pendente
+    total_disponiveis = total_horas - total_parado
+    total_nao_utilizadas = perdas.sum(axis=1)
+    total_trabalhadas = total_disponiveis - total_nao_utilizadas
+    total_utilizacao = np.zeros(n)
+    np.divide(total_trabalhadas, total_disponiveis, out=total_utilizacao, where=total_disponiveis != 0)
+
+    return {
+        "limites": limites,
+        "horas_periodo": horas_periodo,
+        "tempo_parado": tempo_parado,
+        "df": df,
+        "horas_disponiveis": horas_disponiveis,
+        "horas_nao_utilizadas": horas_nao_utilizadas,
+        "horas_trabalhadas": horas_trabalhadas,
+        "utilizacao": utilizacao,
+        "servicos": servicos,
+        "pendente": pendente,
+        "total": {
+            "tempo_parado": total_parado,
+            "df": total_disponiveis / total_horas * 100,
+            "horas_disponiveis": total_disponiveis,
+            "horas_nao_utilizadas": total_nao_utilizadas,
+            "horas_trabalhadas": total_trabalhadas,
+            "utilizacao": total_utilizacao * 100,
+        },
+    }
+
+
+def curvas_frota(series):
+    """
+    Agrega as séries por caminhão em curvas da frota.
+
+    A DF e a utilização de cada período são as razões das horas somadas de
+    todos os caminhões, como no agregado anual.
+
+    Returns:
+      Dicionário com "df", "utilizacao" e "horas_trabalhadas", um valor por período.
+    """
+    horas = series["horas_periodo"].sum(axis=0)
+    disponiveis = series["horas_disponiveis"].sum(axis=0)
+    trabalhadas = series["horas_trabalhadas"].sum(axis=0)
+    utilizacao = np.zeros_like(disponiveis)
+    np.divide(trabalhadas, disponiveis, out=utilizacao, where=disponiveis != 0)
+    df = np.zeros_like(disponiveis)
+    np.divide(disponiveis, horas, out=df, where=horas != 0)
+    return {"df": df * 100, "utilizacao": utilizacao * 100, "horas_trabalhadas": trabalhadas}
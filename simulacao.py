@@ -0,0 +1,184 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from frota import CAMPOS_CAMINHAO, calcular_indicadores_frota
+
+# Distribuições aplicadas a cada campo de dados_caminhao. Os parâmetros são
+# relativos ao valor informado para o caminhão (valor nominal):
+#   ("poisson",)                           contagem com média igual ao nominal
+#   ("normal", desvio_relativo)            nominal * N(1, desvio), truncada em zero
+#   ("triangular", minimo, maximo)         nominal * Tri(minimo, 1, maximo)
+#   ("uniforme", minimo, maximo)           nominal * U(minimo, maximo)
+DISTRIBUICOES_PADRAO = {
+    "qtd_250h": ("poisson",),
+    "qtd_500h": ("poisson",),
+    "qtd_1000h": ("poisson",),
+    "qtd_16000h": ("poisson",),
+    "taxa_corretiva": ("triangular", 0.5, 2.0),
+}
+
+# Quantidade máxima de valores (caminhões x simulações) amostrados por bloco
+ELEMENTOS_POR_BLOCO = 2_000_000
+
+
+def _amostrar(rng, distribuicao, nominal, n_simulacoes):
+    """
+    Amostra um campo para todos os caminhões de uma vez.
+
+    Returns:
+      Array (caminhões, simulações) com os valores amostrados.
+    """
+    tipo, *parametros = distribuicao
+    forma = (len(nominal), n_simulacoes)
+    nominal = nominal[:, None]
+
+    if tipo == "poisson":
+        return rng.poisson(nominal, size=forma)
+    if tipo == "normal":
+        (desvio,) = parametros
+        return nominal * np.maximum(rng.normal(1.0, desvio, size=forma), 0.0)
+    if tipo == "triangular":
+        minimo, maximo = parametros
+        return nominal * rng.triangular(minimo, 1.0, maximo, size=forma)
+    if tipo == "uniforme":
+        minimo, maximo = parametros
+        return nominal * rng.uniform(minimo, maximo, size=forma)
+    raise ValueError(f"Distribuição desconhecida: {tipo}")
+
+
+def _simular_bloco(frota, n_simulacoes, distribuicoes, semente, percentis):
+    """Simula um bloco de caminhões e resume os resultados por percentis."""
+    rng = np.random.default_rng(semente)
+
+    amostras = {}
+    for campo in CAMPOS_CAMINHAO:
+        nominal = np.asarray(frota[campo], dtype=np.float64)
+        if campo in distribuicoes:
+            amostras[campo] = _amostrar(rng, distribuicoes[campo], nominal, n_simulacoes)
+        else:
+            # Campos fixos ficam com forma (caminhões, 1) e são propagados por broadcasting
+            amostras[campo] = nominal[:, None]
+
+    indicadores = calcular_indicadores_frota(amostras)
+    df = indicadores["df"]
+    utilizacao = indicadores["utilizacao"]
+
+    return {
+        "df": np.percentile(df, percentis, axis=1).T,
+        "utilizacao": np.percentile(utilizacao, percentis, axis=1).T,
+        "soma_df": df.sum(axis=0),
+        "soma_utilizacao": utilizacao.sum(axis=0),
+    }
+
+
+def _argumentos_blocos(frota, n_simulacoes, distribuicoes, semente, percentis):
+    """Divide a frota em blocos de caminhões, cada um com sua semente derivada."""
+    caminhoes_por_bloco = max(1, ELEMENTOS_POR_BLOCO // max(n_simulacoes, 1))
+    inicios = range(0, len(frota), caminhoes_por_bloco)
+
+    # Uma semente derivada por bloco torna o resultado independente dos processos
+    sementes = np.random.SeedSequence(semente).spawn(len(inicios))
+    return [
+        (frota[inicio:inicio + caminhoes_por_bloco], n_simulacoes, distribuicoes, s, percentis)
+        for inicio, s in zip(inicios, sementes)
+    ]
+
+
+def _resumir(frota, percentis, blocos):
+    """
+    Junta os blocos simulados no resultado de simular_disponibilidade. Com só
+    parte dos blocos, traz os caminhões deles e os percentis da frota em NaN.
+    """
+    n_caminhoes = sum(len(bloco["df"]) for bloco in blocos)
+    resultado = {
+        "caminhoes": frota["caminhao"][:n_caminhoes].tolist(),
+        "percentis": percentis,
+        "df": np.empty((0, len(percentis))),
+        "utilizacao": np.empty((0, len(percentis))),
+        "frota_df": np.full(len(percentis), np.nan),
+        "frota_utilizacao": np.full(len(percentis), np.nan),
+    }
+    if not blocos:
+        return resultado
+
+    resultado["df"] = np.concatenate([bloco["df"] for bloco in blocos])
+    resultado["utilizacao"] = np.concatenate([bloco["utilizacao"] for bloco in blocos])
+    if n_caminhoes == len(frota):
+        media_df = sum(bloco["soma_df"] for bloco in blocos) / n_caminhoes
+        media_utilizacao = sum(bloco["soma_utilizacao"] for bloco in blocos) / n_caminhoes
+        resultado["frota_df"] = np.percentile(media_df, percentis)
+        resultado["frota_utilizacao"] = np.percentile(media_utilizacao, percentis)
+    return resultado
+
+
+def simular_disponibilidade(
+    frota,
+    n_simulacoes=10_000,
+    distribuicoes=None,
+    semente=None,
+    processos=None,
+    percentis=(10, 50, 90),
+):
+    """
+    Simulação de Monte Carlo da DF e da utilização da frota.
+
+    Amostra os campos de dados_caminhao conforme as distribuições configuradas e
+    calcula os indicadores de todas as simulações de forma vetorizada, sem laço
+    Python por simulação.
+
+    Args:
+      frota: Array estruturado da frota (ver frota.criar_frota).
+      n_simulacoes: Quantidade de simulações por caminhão.
+      distribuicoes: Dicionário campo -> distribuição. Padrão: DISTRIBUICOES_PADRAO.
+      semente: Semente do gerador aleatório, para resultados reprodutíveis.
+      processos: Quantidade de processos; None ou 1 executa no processo atual.
+        O resultado não depende da quantidade de processos.
+      percentis: Percentis calculados para cada indicador.
+
+    Returns:
+      Dicionário com "caminhoes", "percentis", "df" e "utilizacao"
+      (arrays caminhões x percentis) e "frota_df" e "frota_utilizacao" (percentis
+      da média da frota em cada simulação).
+    """
+    if distribuicoes is None:
+        distribuicoes = DISTRIBUICOES_PADRAO
+    percentis = list(percentis)
+    argumentos = _argumentos_blocos(frota, n_simulacoes, distribuicoes, semente, percentis)
+
+    if processos and processos > 1 and len(argumentos) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as executor:
+            blocos = list(executor.map(_simular_bloco, *zip(*argumentos)))
+    else:
+        blocos = [_simular_bloco(*args) for args in argumentos]
+    return _resumir(frota, percentis, blocos)
+
+
+def simular_disponibilidade_progressiva(
+    frota,
+    n_simulacoes=10_000,
+    distribuicoes=None,
+    semente=None,
+    percentis=(10, 50, 90),
+):
+    """
+    simular_disponibilidade bloco a bloco, para execução em segundo plano
+    (ver tarefas.py). O resultado final é o mesmo, com a mesma semente.
+
+    Yields:
+      Tuplas (progresso, resultado parcial) a cada bloco de caminhões: o
+      parcial traz os caminhões já simulados e os percentis da frota em NaN.
+
+    Returns:
+      O resultado completo, como em simular_disponibilidade.
+    """
+    if distribuicoes is None:
+        distribuicoes = DISTRIBUICOES_PADRAO
+    percentis = list(percentis)
+    argumentos = _argumentos_blocos(frota, n_simulacoes, distribuicoes, semente, percentis)
+
+    blocos = []
+    for args in argumentos:
+        blocos.append(_simular_bloco(*args))
+        yield len(blocos) / len(argumentos), _resumir(frota, percentis, blocos)
+    return _resumir(frota, percentis, blocos)
@@ -0,0 +1,308 @@
+import heapq
+from collections import deque
+from itertools import chain, repeat
+
+import numpy as np
+
+from calculos import (
+    calcular_capacidade_liquida,
+    calcular_produtividade_horaria,
+    calcular_tempo_ciclo,
+)
+
+HORAS_ANO = 365 * 24
+
+# Fatores aleatórios sorteados de uma vez pelo NumPy e consumidos um a um
+FATORES_POR_BLOCO = 65_536
+
+# Etapas do horizonte simulado em que simular_transporte_progressivo informa
+# o progresso e o resultado parcial
+ETAPAS_PROGRESSO = 20
+
+# Estados do caminhão; cada um define o que acontece no próximo evento dele
+VIAJANDO_CARGA = 0
+CARREGANDO = 1
+VIAJANDO_DESCARGA = 2
+DESCARREGANDO = 3
+
+
+class Caminhao:
+    __slots__ = (
+        "indice",
+        "estado",
+        "recurso",
+        "chegada",
+        "viagens",
+        "toneladas",
+        "espera_carga",
+        "espera_descarga",
+    )
+
+    def __init__(self, indice):
+        self.indice = indice
+        self.estado = VIAJANDO_CARGA
+        self.recurso = None
+        self.chegada = 0.0
+        self.viagens = 0
+        self.toneladas = 0.0
+        self.espera_carga = 0.0
+        self.espera_descarga = 0.0
+
+
+class Recurso:
+    """Carregadeira ou ponto de descarga: atende um caminhão por vez, em fila FIFO."""
+
+    __slots__ = ("nome", "ocupado", "fila", "tempo_ocupado", "atendimentos")
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.ocupado = False
+        self.fila = deque()
+        self.tempo_ocupado = 0.0
+        self.atendimentos = 0
+
+
+class GrupoRecursos:
+    """Recursos equivalentes (as carregadeiras ou os pontos de descarga)."""
+
+    __slots__ = ("recursos", "livres", "tempo_atendimento")
+
+    def __init__(self, nome, quantidade, tempo_atendimento):
+        self.recursos = [Recurso(f"{nome} {k + 1}") for k in range(quantidade)]
+        # Pilha dos recursos livres: a escolha não percorre o grupo
+        self.livres = self.recursos[::-1]
+        self.tempo_atendimento = tempo_atendimento
+
+    def escolher(self):
+        """Escolhe um recurso livre ou, se todos estiverem ocupados, o de menor fila."""
+        if self.livres:
+            return self.livres.pop()
+        return min(self.recursos, key=lambda recurso: len(recurso.fila))
+
+
+def _fatores(variabilidade, semente):
+    """Gera indefinidamente fatores multiplicativos ~ Normal(1, variabilidade), no mínimo 0,1."""
+    if variabilidade <= 0:
+        return repeat(1.0)
+    rng = np.random.default_rng(semente)
+    return chain.from_iterable(
+        np.maximum(rng.normal(1.0, variabilidade, FATORES_POR_BLOCO), 0.1).tolist()
+        for _ in repeat(None)
+    )
+
+
+def tempos_viagem(segmentos):
+    """
+    Calcula os tempos de ida (carregado) e volta (vazio) de uma rota, em minutos,
+    com calcular_tempo_ciclo. Segmentos com distância zero são ignorados.
+
+    Args:
+      segmentos: Sequência de (distância em metros, velocidade carregado,
+        velocidade vazio em km/h), ou linhas de uma tabela DTYPE_SEGMENTO.
+    """
+    ida = 0.0
+    volta = 0.0
+    for segmento in segmentos:
+        if hasattr(segmento, "dtype"):
+            segmento = (
+                segmento["distancia"],
+                segmento["velocidade_carregado"],
+                segmento["velocidade_vazio"],
+            )
+        distancia, velocidade_carregado, velocidade_vazio = (float(v) for v in segmento)
+        if distancia > 0:
+            ida += calcular_tempo_ciclo(distancia, velocidade_carregado)
+            volta += calcular_tempo_ciclo(distancia, velocidade_vazio)
+    return ida, volta
+
+
+def simular_transporte(*args, **kwargs):
+    """
+    Simula por eventos discretos o ciclo dos caminhões entre carregadeiras e
+    pontos de descarga, com filas em ambos.
+
+    Cada caminhão tem sempre exatamente um evento futuro (chegada ou fim de
+    atendimento), então a fila de eventos é um heap de (tempo, caminhão) com
+    no máximo n_caminhoes entradas. Os caminhões escolhem o recurso livre ou o
+    de menor fila ao chegar.
+
+    Args:
+      Os de simular_transporte_progressivo, exceto etapas.
+
+    Returns:
+      Dicionário com "toneladas", "viagens", "produtividade" (Ton/h simulada),
+      "produtividade_sem_fila" (soma de calcular_produtividade_horaria dos
+      caminhões, sem espera), "fator_acoplamento" (match factor),
+      "espera_carga" e "espera_descarga" (minutos médios por viagem),
+      "tempo_ciclo_teorico" e "tempo_ciclo_medio" (minutos),
+      "utilizacao_carregadeiras" e "utilizacao_descargas" (%, por recurso).
+    """
+    simulacao = simular_transporte_progressivo(*args, etapas=1, **kwargs)
+    while True:
+        try:
+            next(simulacao)
+        except StopIteration as fim:
+            return fim.value
+
+
+def simular_transporte_progressivo(
+    n_caminhoes,
+    capacidade_caminhao,
+    fator_enchimento,
+    segmentos,
+    tempo_carga,
+    tempo_descarga,
+    n_carregadeiras=1,
+    n_descargas=1,
+    horas=HORAS_ANO,
+    variabilidade=0.1,
+    semente=None,
+    etapas=ETAPAS_PROGRESSO,
+):
+    """
+    simular_transporte em etapas do horizonte, para execução em segundo
+    plano (ver tarefas.py). Os eventos são os mesmos, só pausados entre as
+    etapas, então o resultado final é o de simular_transporte.
+
+    Args:
+      n_caminhoes: Quantidade de caminhões em operação.
+      capacidade_caminhao: Capacidade do caminhão em toneladas.
+      fator_enchimento: Fator de enchimento em porcentagem.
+      segmentos: Segmentos da rota (ver tempos_viagem).
+      tempo_carga: Tempo de carregamento de um caminhão, em minutos.
+      tempo_descarga: Tempo de descarga (basculamento), em minutos.
+      n_carregadeiras: Quantidade de carregadeiras.
+      n_descargas: Quantidade de pontos de descarga (britador, pilha...).
+      horas: Horas de operação simuladas.
+      variabilidade: Coeficiente de variação dos tempos de carga, viagem e
+        descarga (0 para tempos determinísticos).
+      semente: Semente do gerador aleatório.
+      etapas: Quantidade de etapas do horizonte.
+
+    Yields:
+      Tuplas (progresso, resultado parcial) ao fim de cada etapa, com os
+      indicadores do tempo simulado até ali.
+
+    Returns:
+      O resultado completo, como em simular_transporte.
+    """
+    capacidade_liquida = calcular_capacidade_liquida(capacidade_caminhao, fator_enchimento)
+    ida, volta = tempos_viagem(segmentos)
+    duracao = horas * 60
+    fator = _fatores(variabilidade, semente).__next__
+
+    caminhoes = [Caminhao(k) for k in range(n_caminhoes)]
+    grupos = {
+        VIAJANDO_CARGA: GrupoRecursos("Carregadeira", n_carregadeiras, tempo_carga),
+        VIAJANDO_DESCARGA: GrupoRecursos("Descarga", n_descargas, tempo_descarga),
+    }
+    # Estado seguinte ao fim de cada atendimento e tempo da viagem correspondente
+    apos_atendimento = {CARREGANDO: (VIAJANDO_DESCARGA, ida), DESCARREGANDO: (VIAJANDO_CARGA, volta)}
+
+    # Todos os caminhões chegam às carregadeiras no início do turno
+    eventos = [(0.0, k) for k in range(n_caminhoes)]
+
+    for etapa in range(1, etapas + 1):
+        limite = duracao if etapa == etapas else duracao * etapa / etapas
+        _avancar(eventos, limite, caminhoes, grupos, apos_atendimento, fator, capacidade_liquida)
+        if etapa < etapas:
+            yield etapa / etapas, _resumir(
+                caminhoes, grupos, capacidade_liquida, ida, volta, tempo_carga, tempo_descarga,
+                n_carregadeiras, limite,
+            )
+    return _resumir(
+        caminhoes, grupos, capacidade_liquida, ida, volta, tempo_carga, tempo_descarga,
+        n_carregadeiras, duracao,
+    )
+
+
+def _avancar(eventos, limite, caminhoes, grupos, apos_atendimento, fator, capacidade_liquida):
+    """Processa os eventos da simulação anteriores ao instante limite (minutos)."""
+    heappush, heappop = heapq.heappush, heapq.heappop
+    while eventos and eventos[0][0] < limite:
+        agora, k = heappop(eventos)
+        caminhao = caminhoes[k]
+        estado = caminhao.estado
+
+        if estado == VIAJANDO_CARGA or estado == VIAJANDO_DESCARGA:
+            grupo = grupos[estado]
+            recurso = grupo.escolher()
+            caminhao.recurso = recurso
+            if recurso.ocupado:
+                caminhao.chegada = agora
+                recurso.fila.append(caminhao)
+                continue
+            recurso.ocupado = True
+            atendimento = grupo.tempo_atendimento * fator()
+            recurso.tempo_ocupado += atendimento
+            recurso.atendimentos += 1
+            caminhao.estado = estado + 1
+            heappush(eventos, (agora + atendimento, k))
+            continue
+
+        # Fim de atendimento: libera o recurso para o próximo da fila
+        recurso = caminhao.recurso
+        proximo_estado, viagem = apos_atendimento[estado]
+        if recurso.fila:
+            proximo = recurso.fila.popleft()
+            if estado == CARREGANDO:
+                proximo.espera_carga += agora - proximo.chegada
+            else:
+                proximo.espera_descarga += agora - proximo.chegada
+            atendimento = grupos[estado - 1].tempo_atendimento * fator()
+            recurso.tempo_ocupado += atendimento
+            recurso.atendimentos += 1
+            proximo.estado = estado
+            heappush(eventos, (agora + atendimento, proximo.indice))
+        else:
+            recurso.ocupado = False
+            grupos[estado - 1].livres.append(recurso)
+
+        if estado == DESCARREGANDO:
+            caminhao.viagens += 1
+            caminhao.toneladas += capacidade_liquida
+        caminhao.estado = proximo_estado
+        heappush(eventos, (agora + viagem * fator(), k))
+
+
+def _resumir(
+    caminhoes, grupos, capacidade_liquida, ida, volta, tempo_carga, tempo_descarga,
+    n_carregadeiras, duracao,
+):
+    """Indicadores de simular_transporte para os primeiros duracao minutos."""
+    n_caminhoes = len(caminhoes)
+    horas = duracao / 60
+    viagens = sum(caminhao.viagens for caminhao in caminhoes)
+    toneladas = sum(caminhao.toneladas for caminhao in caminhoes)
+    tempo_ciclo_teorico = tempo_carga + ida + tempo_descarga + volta
+    produtividade_sem_fila = (
+        n_caminhoes * calcular_produtividade_horaria(capacidade_liquida, tempo_ciclo_teorico)
+        if tempo_ciclo_teorico > 0
+        else 0.0
+    )
+    # Fator de acoplamento (match factor): capacidade de transporte / capacidade de carga
+    fator_acoplamento = (
+        n_caminhoes * tempo_carga / (n_carregadeiras * tempo_ciclo_teorico)
+        if tempo_ciclo_teorico > 0
+        else 0.0
+    )
+
+    return {
+        "toneladas": toneladas,
+        "viagens": viagens,
+        "produtividade": toneladas / horas if horas > 0 else 0.0,
+        "produtividade_sem_fila": produtividade_sem_fila,
+        "fator_acoplamento": fator_acoplamento,
+        "espera_carga": sum(c.espera_carga for c in caminhoes) / viagens if viagens else 0.0,
+        "espera_descarga": sum(c.espera_descarga for c in caminhoes) / viagens if viagens else 0.0,
+        "tempo_ciclo_teorico": tempo_ciclo_teorico,
+        "tempo_ciclo_medio": n_caminhoes * duracao / viagens if viagens else 0.0,
+        "utilizacao_carregadeiras": [
+            min(recurso.tempo_ocupado / duracao, 1.0) * 100
+            for recurso in grupos[VIAJANDO_CARGA].recursos
+        ],
+        "utilizacao_descargas": [
+            min(recurso.tempo_ocupado / duracao, 1.0) * 100
+            for recurso in grupos[VIAJANDO_DESCARGA].recursos
+        ],
+    }
@@ -0,0 +1,201 @@
+import threading
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+# Execução de análises demoradas em segundo plano. Não depende do Streamlit:
+# painel_tarefas.py guarda o executor em st.cache_resource e acompanha as
+# tarefas de cada sessão.
+#
+# Uma tarefa é uma função geradora que produz tuplas (progresso, parcial), com
+# o progresso entre 0 e 1 e o resultado parcial até ali, e retorna o resultado
+# final (ou None para usar o último parcial). Uma função comum também é aceita:
+# o retorno dela é o resultado, sem progresso intermediário.
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+CANCELADA = "cancelada"
+ERRO = "erro"
+
+ENCERRADOS = (CONCLUIDA, CANCELADA, ERRO)
+
+
+class TarefaCancelada(Exception):
+    """Interrompe uma tarefa cujo cancelamento foi pedido."""
+
+
+class Tarefa:
+    """
+    Estado de uma análise submetida ao ExecutorTarefas.
+
+    Os atributos são gravados pela thread da tarefa e lidos pelas sessões;
+    use situacao() para ler todos de uma vez, de forma consistente.
+    """
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.estado = PENDENTE
+        self.progresso = 0.0
+        self.parcial = None
+        self.resultado = None
+        self.erro = None
+        self.inicio = None
+        self.fim = None
+        # Sessões interessadas no resultado; a tarefa só é cancelada sem nenhuma
+        self.assinantes = 0
+        self._cancelamento = threading.Event()
+        self._trava = threading.Lock()
+
+    def concluida(self):
+        return self.estado in ENCERRADOS
+
+    def cancelar(self):
+        """Pede o cancelamento, atendido no próximo progresso informado."""
+        self._cancelamento.set()
+
+    def cancelamento_pedido(self):
+        return self._cancelamento.is_set()
+
+    def situacao(self):
+        """
+        Returns:
+          Dicionário com "estado", "progresso", "parcial", "resultado", "erro"
+          e "segundos" (duração até agora ou total).
+        """
+        with self._trava:
+            inicio = self.inicio
+            return {
+                "estado": self.estado,
+                "progresso": self.progresso,
+                "parcial": self.parcial,
+                "resultado": self.resultado,
+                "erro": self.erro,
+                "segundos": ((self.fim or time.perf_counter()) - inicio) if inicio else 0.0,
+            }
+
+    def _encerrar(self, estado, resultado=None, erro=None):
+        with self._trava:
+            self.estado = estado
+            self.resultado = resultado
+            self.erro = erro
+            self.fim = time.perf_counter()
+            if estado == CONCLUIDA:
+                self.progresso = 1.0
+
+    def executar(self, funcao, args, kwargs):
+        """Executa a função da tarefa na thread atual, registrando o progresso."""
+        if self.cancelamento_pedido():
+            self._encerrar(CANCELADA)
+            return
+        with self._trava:
+            self.estado = EXECUTANDO
+            self.inicio = time.perf_counter()
+
+        try:
+            gerador = funcao(*args, **kwargs)
+            if not isinstance(gerador, types.GeneratorType):
+                resultado = gerador
+            else:
+                while True:
+                    try:
+                        progresso, parcial = next(gerador)
+                    except StopIteration as fim:
+                        resultado = fim.value if fim.value is not None else self.parcial
+                        break
+                    with self._trava:
+                        self.progresso = min(max(float(progresso), 0.0), 1.0)
+                        self.parcial = parcial
+                    if self.cancelamento_pedido():
+                        gerador.close()
+                        raise TarefaCancelada
+        except TarefaCancelada:
+            self._encerrar(CANCELADA)
+        except Exception as erro:
+            self._encerrar(ERRO, erro=erro)
+        else:
+            self._encerrar(CONCLUIDA, resultado=resultado)
+
+
+class ExecutorTarefas:
+    """
+    Pool de threads para as análises em segundo plano, compartilhado pelas
+    sessões.
+
+    Pedidos com a mesma chave enquanto a primeira tarefa ainda não terminou
+    recebem a mesma Tarefa (deduplicação); por isso a chave deve identificar
+    todas as entradas da análise. Cada pedido é um assinante, e liberar() só
+    cancela a tarefa quando nenhum assinante resta.
+
+    As threads só rodam em paralelo com as sessões nas operações do NumPy,
+    que liberam o GIL. As análises em Python puro, como
+    simular_transporte_progressivo (simulacao_eventos.py), disputam o GIL com
+    as sessões. A página continua respondendo porque o interpretador alterna
+    as threads (sys.getswitchinterval), mas fica mais lenta enquanto elas
+    rodam; max_workers limita quantas disputam ao mesmo tempo.
+
+    Args:
+      max_workers: Quantidade de tarefas executadas ao mesmo tempo.
+    """
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tarefa")
+        self._em_andamento = {}
+        self._trava = threading.Lock()
+        self.submetidas = 0
+        self.deduplicadas = 0
+
+    def submeter(self, chave, funcao, *args, **kwargs):
+        """
+        Submete uma análise ou reaproveita a que está em andamento com a mesma chave.
+
+        Args:
+          chave: Identificação hashable das entradas da análise.
+          funcao: Função geradora da tarefa (ver o início do módulo).
+          *args, **kwargs: Argumentos de funcao.
+
+        Returns:
+          Tarefa, com um assinante a mais.
+        """
+        with self._trava:
+            tarefa = self._em_andamento.get(chave)
+            if tarefa is not None and not tarefa.cancelamento_pedido():
+                tarefa.assinantes += 1
+                self.deduplicadas += 1
+                return tarefa
+            tarefa = Tarefa(chave)
+            tarefa.assinantes = 1
+            self._em_andamento[chave] = tarefa
+            self.submetidas += 1
+        self._executor.submit(self._executar, tarefa, funcao, args, kwargs)
+        return tarefa
+
+    def _executar(self, tarefa, funcao, args, kwargs):
+        try:
+            tarefa.executar(funcao, args, kwargs)
+        finally:
+            with self._trava:
+                if self._em_andamento.get(tarefa.chave) is tarefa:
+                    del self._em_andamento[tarefa.chave]
+
+    def liberar(self, tarefa):
+        """
+        Retira um assinante da tarefa (as entradas dele mudaram ou ele
+        cancelou); sem assinantes, a tarefa em andamento é cancelada.
+        """
+        with self._trava:
+            tarefa.assinantes -= 1
+            if tarefa.assinantes > 0 or tarefa.concluida():
+                return
+            tarefa.cancelar()
+            if self._em_andamento.get(tarefa.chave) is tarefa:
+                del self._em_andamento[tarefa.chave]
+
+    def estatisticas(self):
+        """Dicionário com "em_andamento", "submetidas" e "deduplicadas"."""
+        with self._trava:
+            return {
+                "em_andamento": len(self._em_andamento),
+                "submetidas": self.submetidas,
+                "deduplicadas": self.deduplicadas,
+            }